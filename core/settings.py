@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 
 import os
+import socket
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -120,16 +122,131 @@ CACHES = {
     }
 }
 
+RQ_REDIS = {
+    'HOST': os.environ.get("REDIS_HOST", default="redis"),
+    'PORT': os.environ.get("REDIS_PORT", default=6379),
+    'DB': os.environ.get("REDIS_DB", default=0),
+    'REDIS_CLIENT_KWARGS': {},
+}
+
+# high: ingest and posters, seconds per job.
+# live: encodes that follow a resumable upload while it arrives.
+# short/long: encodes, split by HLS_LONG_QUEUE_MIN_DURATION so that long
+# sources run on their own workers and cannot starve short clips.
+# low: background re-encodes of two-tier encoding, listed last by workers.
 RQ_QUEUES = {
-    'default': {
-        'HOST': os.environ.get("REDIS_HOST", default="redis"),
-        'PORT': os.environ.get("REDIS_PORT", default=6379),
-        'DB': os.environ.get("REDIS_DB", default=0),
-        'DEFAULT_TIMEOUT': 900,
-        'REDIS_CLIENT_KWARGS': {},
-    },
+    'high': {**RQ_REDIS, 'DEFAULT_TIMEOUT': 300},
+    'live': {**RQ_REDIS, 'DEFAULT_TIMEOUT': 6 * 60 * 60},
+    'default': {**RQ_REDIS, 'DEFAULT_TIMEOUT': 900},
+    'short': {**RQ_REDIS, 'DEFAULT_TIMEOUT': 900},
+    'long': {**RQ_REDIS, 'DEFAULT_TIMEOUT': 3600},
+    'low': {**RQ_REDIS, 'DEFAULT_TIMEOUT': 3600},
 }
 
+HLS_LONG_QUEUE_MIN_DURATION = int(
+    os.environ.get("HLS_LONG_QUEUE_MIN_DURATION", 300))
+
+# Largest source accepted by the resumable upload API (bytes).
+VIDEO_UPLOAD_MAX_SIZE = int(
+    os.environ.get("VIDEO_UPLOAD_MAX_SIZE", 50 * 1024 ** 3))
+
+# ingest_video hashes the whole source before probing it: enough time for
+# the largest allowed upload at 50 MB/s, instead of the 300s of "high".
+VIDEO_INGEST_TIMEOUT = int(os.environ.get(
+    "VIDEO_INGEST_TIMEOUT", 300 + VIDEO_UPLOAD_MAX_SIZE // (50 * 1024 ** 2)))
+
+# Pipe-through ingest: a worker on the "live" queue encodes resumable
+# uploads of streamable sources (fragmented/faststart MP4, MPEG-TS, MKV)
+# while the chunks are still arriving.
+VIDEO_UPLOAD_PIPE_THROUGH = os.environ.get(
+    "VIDEO_UPLOAD_PIPE_THROUGH", "False") == "True"
+VIDEO_UPLOAD_PIPE_TIMEOUT = int(
+    os.environ.get("VIDEO_UPLOAD_PIPE_TIMEOUT", 6 * 60 * 60))
+VIDEO_UPLOAD_STALL_TIMEOUT = int(
+    os.environ.get("VIDEO_UPLOAD_STALL_TIMEOUT", 600))
+
+# Sources at least this long (seconds) are split into keyframe-aligned
+# chunks that are encoded as separate RQ jobs and stitched afterwards.
+HLS_SPLIT_MIN_DURATION = int(os.environ.get("HLS_SPLIT_MIN_DURATION", 600))
+HLS_CHUNK_DURATION = int(os.environ.get("HLS_CHUNK_DURATION", 120))
+
+# Transcode job timeout: source seconds * factor, but at least the minimum.
+HLS_JOB_TIMEOUT_MIN = int(os.environ.get("HLS_JOB_TIMEOUT_MIN", 900))
+HLS_JOB_TIMEOUT_FACTOR = float(os.environ.get("HLS_JOB_TIMEOUT_FACTOR", 4))
+HLS_JOB_RETRIES = int(os.environ.get("HLS_JOB_RETRIES", 2))
+
+# "mpegts": one .ts file per segment. "fmp4": CMAF, one media.mp4 per
+# rendition with EXT-X-BYTERANGE playlists and a DASH manifest.
+HLS_SEGMENT_TYPE = os.environ.get("HLS_SEGMENT_TYPE", "mpegts")
+
+# Just-in-time renditions: only the lowest rung is encoded with the
+# upload. Higher rungs are encoded on their first playlist request or
+# once a video reaches HLS_LAZY_VIEW_THRESHOLD plays, and the
+# evict_renditions command removes them after HLS_LAZY_EVICT_DAYS unused.
+HLS_LAZY_RENDITIONS = os.environ.get("HLS_LAZY_RENDITIONS", "False") == "True"
+HLS_LAZY_VIEW_THRESHOLD = int(os.environ.get("HLS_LAZY_VIEW_THRESHOLD", 20))
+HLS_LAZY_EVICT_DAYS = int(os.environ.get("HLS_LAZY_EVICT_DAYS", 30))
+
+# Progressive publishing: the lowest rendition of an encode is playable
+# (EVENT playlist) from its first segments on. MPEG-TS segments only.
+HLS_PROGRESSIVE_PUBLISH = os.environ.get(
+    "HLS_PROGRESSIVE_PUBLISH", "True") == "True"
+
+# A replaced output version is kept this long for players that loaded
+# its playlists before the switch (single-file fMP4 byte ranges).
+HLS_VERSION_GRACE_PERIOD = int(
+    os.environ.get("HLS_VERSION_GRACE_PERIOD", 6 * 60 * 60))
+
+# Encoding profile (video_app/profiles.py) for videos without their own.
+HLS_ENCODING_PROFILE = os.environ.get("HLS_ENCODING_PROFILE", "balanced")
+
+# Per-title encoding: a complexity analysis on a low-resolution proxy
+# picks CRF and bitrate cap per rung for every video, aiming at
+# HLS_PER_TITLE_CRF and never above HLS_PER_TITLE_MAX_CRF.
+HLS_PER_TITLE_ENCODING = os.environ.get(
+    "HLS_PER_TITLE_ENCODING", "False") == "True"
+HLS_PER_TITLE_CRF = int(os.environ.get("HLS_PER_TITLE_CRF", 23))
+HLS_PER_TITLE_MAX_CRF = int(os.environ.get("HLS_PER_TITLE_MAX_CRF", 28))
+
+# Two-tier encoding: the first encode uses HLS_FIRST_PASS_PROFILE (e.g.
+# "ultrafast") and a job on the "low" queue re-encodes the video with
+# its own profile once the workers are idle. Empty = single encode.
+HLS_FIRST_PASS_PROFILE = os.environ.get("HLS_FIRST_PASS_PROFILE", "")
+
+# Bulk re-transcodes (admin action, retranscode_videos command) wait in
+# a Redis backlog; at most RETRANSCODE_MAX_IN_FLIGHT of them are queued
+# or running at a time.
+RETRANSCODE_MAX_IN_FLIGHT = int(os.environ.get("RETRANSCODE_MAX_IN_FLIGHT", 2))
+
+# CPU scheduler: every encode holds FFMPEG_SLOTS_PER_JOB threads of the
+# node's budget (FFMPEG_CPU_BUDGET, 0 = detect cores and cgroup limit).
+# Workers with the same FFMPEG_SCHEDULER_NODE share one budget through
+# Redis. FFMPEG_SLOTS_PER_JOB=0 turns the scheduler off.
+FFMPEG_SLOTS_PER_JOB = int(os.environ.get("FFMPEG_SLOTS_PER_JOB", 4))
+FFMPEG_CPU_BUDGET = int(os.environ.get("FFMPEG_CPU_BUDGET", 0))
+FFMPEG_SCHEDULER_NODE = os.environ.get(
+    "FFMPEG_SCHEDULER_NODE", socket.gethostname())
+
+# Trickplay: one preview tile every TRICKPLAY_INTERVAL seconds, packed
+# into COLUMNS x ROWS sprite sheets and indexed by thumbnails.vtt.
+TRICKPLAY_INTERVAL = int(os.environ.get("TRICKPLAY_INTERVAL", 10))
+TRICKPLAY_WIDTH = int(os.environ.get("TRICKPLAY_WIDTH", 160))
+TRICKPLAY_COLUMNS = int(os.environ.get("TRICKPLAY_COLUMNS", 5))
+TRICKPLAY_ROWS = int(os.environ.get("TRICKPLAY_ROWS", 5))
+
+# Hover previews: a silent PREVIEW_CLIP_DURATION second MP4 stitched from
+# PREVIEW_CLIP_EXCERPTS excerpts, PREVIEW_CLIP_SHORT_SIDE pixels high (or
+# wide) at PREVIEW_CLIP_BITRATE kbit/s.
+PREVIEW_CLIP_DURATION = int(os.environ.get("PREVIEW_CLIP_DURATION", 8))
+PREVIEW_CLIP_EXCERPTS = int(os.environ.get("PREVIEW_CLIP_EXCERPTS", 4))
+PREVIEW_CLIP_SHORT_SIDE = int(os.environ.get("PREVIEW_CLIP_SHORT_SIDE", 240))
+PREVIEW_CLIP_BITRATE = int(os.environ.get("PREVIEW_CLIP_BITRATE", 300))
+
+# Transcodes write into this (fast, local) directory and are published
+# into MEDIA_ROOT/hls with an atomic rename once every stage succeeded.
+HLS_SCRATCH_ROOT = os.environ.get(
+    "HLS_SCRATCH_ROOT", os.path.join(tempfile.gettempdir(), "videoflix-hls"))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -1,5 +1,15 @@
+from datetime import timedelta
+from django.conf import settings
 from django.contrib import admin
-from .models import Video
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from .jobstats import summarize_nodes, summarize_renditions, summarize_stages
+from .models import TranscodeJob, Video, VideoUpload
+from .tasks import request_retranscode
+
+# Default period of the transcode analytics.
+ANALYTICS_DAYS = 7
 
 
 @admin.register(Video)
@@ -7,7 +17,21 @@ class VideoAdmin(admin.ModelAdmin):
     list_display = ("id", "title", "category", "created_at", "thumbnail_url")
     list_filter = ("category", "created_at")
     search_fields = ("title", "description")
-    readonly_fields = ("created_at", "thumbnail_url")
+    actions = ("retranscode",)
+    readonly_fields = (
+        "created_at",
+        "thumbnail_url",
+        "preview_url",
+        "width",
+        "height",
+        "frame_rate",
+        "duration",
+        "video_codec",
+        "audio_codec",
+        "content_hash",
+        "encoding_ladder",
+        "view_count",
+    )
 
     fieldsets = (
         (
@@ -18,6 +42,7 @@ class VideoAdmin(admin.ModelAdmin):
                     "description",
                     "category",
                     "video_file",
+                    "encoding_profile",
                 )
             },
         ),
@@ -26,6 +51,13 @@ class VideoAdmin(admin.ModelAdmin):
             {
                 "fields": (
                     "thumbnail_url",
+                    "preview_url",
+                    ("width", "height"),
+                    ("frame_rate", "duration"),
+                    ("video_codec", "audio_codec"),
+                    "content_hash",
+                    "encoding_ladder",
+                    "view_count",
                 )
             }
         ),
@@ -34,3 +66,88 @@ class VideoAdmin(admin.ModelAdmin):
             {"fields": ("created_at",)},
         ),
     )
+
+    @admin.action(description="Re-transcode selected videos")
+    def retranscode(self, request, queryset):
+        count = request_retranscode(
+            queryset.exclude(video_file__isnull=True)
+            .exclude(video_file="")
+            .values_list("id", flat=True)
+        )
+        self.message_user(
+            request,
+            f"{count} videos added to the re-transcode backlog; at most "
+            f"{settings.RETRANSCODE_MAX_IN_FLIGHT} are processed at a time.",
+        )
+
+
+@admin.register(VideoUpload)
+class VideoUploadAdmin(admin.ModelAdmin):
+    list_display = ("id", "title", "offset", "length", "created_at", "completed_at")
+    readonly_fields = (
+        "file_name",
+        "length",
+        "offset",
+        "video",
+        "created_by",
+        "created_at",
+        "completed_at",
+    )
+
+
+@admin.register(TranscodeJob)
+class TranscodeJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "started_at",
+        "stage",
+        "part",
+        "status",
+        "content_hash",
+        "node",
+        "wall_seconds",
+        "cpu_seconds",
+        "peak_rss_kb",
+        "output_bytes",
+    )
+    list_filter = ("stage", "status", "node", "started_at")
+    search_fields = ("content_hash", "job_id", "video__title")
+    date_hierarchy = "started_at"
+    change_list_template = "admin/video_app/transcodejob/change_list.html"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "analytics/",
+                self.admin_site.admin_view(self.analytics_view),
+                name="video_app_transcodejob_analytics",
+            ),
+            *super().get_urls(),
+        ]
+
+    def analytics_view(self, request):
+        try:
+            days = max(1, int(request.GET.get("days", ANALYTICS_DAYS)))
+        except ValueError:
+            days = ANALYTICS_DAYS
+        jobs = TranscodeJob.objects.filter(
+            started_at__gte=timezone.now() - timedelta(days=days)
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": f"Transcode analytics, last {days} days",
+            "days": days,
+            "stages": summarize_stages(jobs),
+            "renditions": summarize_renditions(jobs),
+            "nodes": summarize_nodes(jobs),
+            "running": jobs.filter(status="running").count(),
+        }
+        return TemplateResponse(
+            request, "admin/video_app/transcodejob/analytics.html", context
+        )
@@ -15,5 +15,6 @@ class VideoSerializer(serializers.ModelSerializer):
             "title",
             "description",
             "thumbnail_url",
+            "preview_url",
             "category",
         ]
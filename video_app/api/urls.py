@@ -1,19 +1,79 @@
 from django.urls import path, re_path
-from .views import VideoListAPIView, serve_hls_playlist, serve_hls_segment
+from .views import (
+    VideoListAPIView,
+    VideoStatusAPIView,
+    VideoUploadAPIView,
+    VideoUploadCreateAPIView,
+    serve_dash_manifest,
+    serve_hls_master,
+    serve_hls_media,
+    serve_hls_playlist,
+    serve_hls_segment,
+    serve_trickplay_sprite,
+    serve_trickplay_track,
+)
 
 urlpatterns = [
 
     path("", VideoListAPIView.as_view()),
 
+    path(
+        "uploads/",
+        VideoUploadCreateAPIView.as_view(),
+        name="video_upload_create"
+    ),
+
+    path(
+        "uploads/<uuid:upload_id>/",
+        VideoUploadAPIView.as_view(),
+        name="video_upload"
+    ),
+
+    path(
+        "<int:video_id>/status/",
+        VideoStatusAPIView.as_view(),
+        name="video_status"
+    ),
+
     re_path(
-        r"^(?P<video_id>\d+)/(?P<resolution>[0-9]{3,4}p)/index\.m3u8$",
+        r"^(?P<video_id>\d+)/master\.m3u8$",
+        serve_hls_master,
+        name="hls_master"
+    ),
+
+    re_path(
+        r"^(?P<video_id>\d+)/(?P<resolution>[0-9]{3,4}p|audio)/index\.m3u8$",
         serve_hls_playlist,
         name="hls_playlist"
     ),
 
     re_path(
-        r"^(?P<video_id>\d+)/(?P<resolution>[0-9]{3,4}p)/(?P<segment>[0-9]{4})\.ts$",
+        r"^(?P<video_id>\d+)/(?P<resolution>[0-9]{3,4}p|audio)/(?P<segment>[0-9]{4})\.ts$",
         serve_hls_segment,
         name="hls_segment"
     ),
+
+    re_path(
+        r"^(?P<video_id>\d+)/(?P<resolution>[0-9]{3,4}p|audio)/media\.mp4$",
+        serve_hls_media,
+        name="hls_media"
+    ),
+
+    re_path(
+        r"^(?P<video_id>\d+)/manifest\.mpd$",
+        serve_dash_manifest,
+        name="dash_manifest"
+    ),
+
+    re_path(
+        r"^(?P<video_id>\d+)/thumbnails\.vtt$",
+        serve_trickplay_track,
+        name="trickplay_track"
+    ),
+
+    re_path(
+        r"^(?P<video_id>\d+)/trickplay/(?P<sprite>sprite(?:-[0-9]{4})?-[0-9]{3})\.jpg$",
+        serve_trickplay_sprite,
+        name="trickplay_sprite"
+    ),
 ]
@@ -1,6 +1,11 @@
 from video_app.models import Video
 import os
-from django.http import FileResponse, Http404
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
 
 
 def get_all_videos():
@@ -52,3 +57,77 @@ def load_hls_segment(movie_id, resolution, segment):
         open(file_path, "rb"),
         content_type="video/MP2T"
     )
+
+
+def parse_range_header(header: str, size: int):
+    """
+    Parse a single 'bytes=start-end' range (RFC 9110). Returns
+    (start, end) with an inclusive end, None if the header is absent or
+    not a single byte range, or raises ValueError if it cannot be
+    satisfied for a file of `size` bytes.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+
+    start, sep, end = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if start:
+            start, end = int(start), int(end) if end else size - 1
+        else:
+            # suffix range: the last <end> bytes
+            start, end = max(size - int(end), 0), size - 1
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+
+    return start, min(end, size - 1)
+
+
+def serve_file_range(request, file_path: str, content_type: str):
+    """
+    Return a file as FileResponse, honouring a single byte Range header
+    with 206 Partial Content (416 if it lies outside the file). Players
+    fetch single-file fMP4 renditions and .ts seeks this way.
+    """
+    size = os.path.getsize(file_path)
+    try:
+        byte_range = parse_range_header(
+            request.headers.get("Range", ""), size
+        )
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    f = open(file_path, "rb")
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+    else:
+        start, end = byte_range
+        f.seek(start)
+        response = StreamingHttpResponse(
+            iter_file_range(f, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def iter_file_range(f, length: int, block_size: int = 64 * 1024):
+    with f:
+        while length > 0:
+            block = f.read(min(block_size, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
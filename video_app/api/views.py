@@ -1,8 +1,35 @@
 import os
-from django.http import FileResponse, Http404, JsonResponse
+import re
+from datetime import timedelta
+from django.db.models import F
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+)
 from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.permissions import IsAdminUser
 from rest_framework.views import APIView
-from video_app.models import Video
+from video_app.api.utils import serve_file_range
+from video_app import tasks
+from video_app.models import RenditionUsage, Video, VideoUpload
+from video_app.progress import get_status
+from video_app.storage import find_media_version, has_content_output
+from video_app.uploads import (
+    UploadOffsetMismatch,
+    UploadTooLarge,
+    append_chunk,
+    create_upload,
+)
+
+TUS_VERSION = "1.0.0"
+
+# Last-use timestamps of lazy renditions are refreshed at most this often.
+USAGE_RESOLUTION = timedelta(hours=1)
 
 
 class VideoListAPIView(APIView):
@@ -23,16 +50,217 @@ class VideoListAPIView(APIView):
                 "category": v.category,
                 "created_at": v.created_at.isoformat(),
                 "thumbnail_url": request.build_absolute_uri(v.thumbnail_url),
+                "preview_url": (
+                    request.build_absolute_uri(v.preview_url)
+                    if v.preview_url else None
+                ),
                 "video_file": v.video_file.url if v.video_file else None,
             })
 
         return JsonResponse(data, safe=False)
 
 
+class VideoStatusAPIView(APIView):
+    """
+    GET /api/video/<id>/status/
+    Returns the processing state of a video with percent, fps and ETA
+    of the running transcode.
+    """
+
+    def get(self, request, video_id):
+        if not Video.objects.filter(id=video_id).exists():
+            raise Http404("Video not found")
+
+        data = get_status(video_id)
+
+        if data is None:
+            master_path = os.path.join(
+                settings.MEDIA_ROOT, "hls", str(video_id), "master.m3u8"
+            )
+            data = {
+                "status": "ready" if os.path.exists(master_path) else "unknown"
+            }
+
+        data["id"] = video_id
+        return JsonResponse(data)
+
+
+def tus_response(status: int, **headers) -> HttpResponse:
+    response = HttpResponse(status=status)
+    response["Tus-Resumable"] = TUS_VERSION
+    for name, value in headers.items():
+        response[name.replace("_", "-")] = str(value)
+    return response
+
+
+class VideoUploadCreateAPIView(APIView):
+    """
+    POST /api/video/uploads/
+    Starts a resumable upload (tus-style). The size is sent in the
+    Upload-Length header, title, description, category and filename in
+    the JSON body. Returns the upload URL in the Location header.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        try:
+            length = int(request.headers["Upload-Length"])
+        except (KeyError, ValueError):
+            return JsonResponse(
+                {"detail": "Upload-Length header required."}, status=400
+            )
+        if not 0 < length <= settings.VIDEO_UPLOAD_MAX_SIZE:
+            return tus_response(413, Tus_Max_Size=settings.VIDEO_UPLOAD_MAX_SIZE)
+
+        missing = [
+            field for field in ("title", "category", "filename")
+            if not request.data.get(field)
+        ]
+        if missing:
+            return JsonResponse(
+                {"detail": f"Missing fields: {', '.join(missing)}"}, status=400
+            )
+
+        upload = create_upload(
+            request.user,
+            request.data["filename"],
+            length,
+            request.data["title"],
+            request.data.get("description", ""),
+            request.data["category"],
+        )
+
+        return tus_response(
+            201,
+            Location=request.build_absolute_uri(f"{upload.id}/"),
+            Upload_Offset=0,
+        )
+
+
+class VideoUploadAPIView(APIView):
+    """
+    HEAD  /api/video/uploads/<id>/  current Upload-Offset, for resuming
+    PATCH /api/video/uploads/<id>/  append the body at Upload-Offset
+
+    The PATCH body (application/offset+octet-stream) is streamed to the
+    target file in blocks, never held in memory. When the last byte
+    arrives, the video is created and processing starts.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def head(self, request, upload_id):
+        upload = VideoUpload.objects.filter(id=upload_id).first()
+        if upload is None:
+            return tus_response(404)
+
+        return tus_response(
+            200,
+            Upload_Offset=upload.offset,
+            Upload_Length=upload.length,
+            Cache_Control="no-store",
+        )
+
+    def patch(self, request, upload_id):
+        if request.content_type != "application/offset+octet-stream":
+            return tus_response(415)
+        try:
+            offset = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            return tus_response(400)
+
+        try:
+            upload = append_chunk(upload_id, request, offset)
+        except VideoUpload.DoesNotExist:
+            return tus_response(404)
+        except UploadOffsetMismatch as e:
+            return tus_response(409, Upload_Offset=e.args[0])
+        except UploadTooLarge:
+            return tus_response(413)
+
+        headers = {"Upload_Offset": upload.offset}
+        if upload.video_id:
+            headers["Location"] = request.build_absolute_uri(
+                f"/api/video/{upload.video_id}/status/"
+            )
+        return tus_response(204, **headers)
+
+
+def serve_hls_master(request, video_id):
+    """
+    Serves the multi-variant playlist from:
+    MEDIA_ROOT/hls/<id>/master.m3u8
+    """
+
+    master_path = os.path.join(
+        settings.MEDIA_ROOT,
+        "hls",
+        str(video_id),
+        "master.m3u8"
+    )
+
+    if not os.path.exists(master_path):
+        raise Http404("Playlist not found")
+
+    if settings.HLS_LAZY_RENDITIONS:
+        count_view(video_id)
+
+    return FileResponse(open(master_path, "rb"), content_type="application/x-mpegURL")
+
+
+def count_view(video_id):
+    """
+    Count a playback; at HLS_LAZY_VIEW_THRESHOLD views every rendition
+    of the ladder is encoded, without waiting for players to ask.
+    """
+    Video.objects.filter(id=video_id).update(view_count=F("view_count") + 1)
+    video = Video.objects.get(id=video_id)
+    if video.view_count == settings.HLS_LAZY_VIEW_THRESHOLD:
+        tasks.request_missing_renditions(video)
+
+
+def serve_lazy_rendition(video_id, resolution):
+    """
+    A rendition of the ladder that is not encoded yet: enqueue it and
+    send the player to the lowest rendition meanwhile.
+    """
+    video = Video.objects.filter(id=video_id).first()
+    if video is None or not has_content_output(video.content_hash):
+        raise Http404("Playlist not found")
+
+    renditions = list(tasks.build_ladder(video.width, video.height))
+    if resolution not in renditions[1:]:
+        raise Http404("Playlist not found")
+
+    tasks.request_rendition(video, resolution)
+
+    response = HttpResponseRedirect(reverse(
+        "hls_playlist",
+        kwargs={"video_id": video_id, "resolution": renditions[0]},
+    ))
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def touch_rendition(video_id, resolution):
+    content_hash = (
+        Video.objects.filter(id=video_id)
+        .values_list("content_hash", flat=True).first()
+    )
+    now = timezone.now()
+    RenditionUsage.objects.filter(
+        content_hash=content_hash,
+        name=resolution,
+        last_used_at__lt=now - USAGE_RESOLUTION,
+    ).update(last_used_at=now)
+
+
 def serve_hls_playlist(request, video_id, resolution):
     """
     Serves HLS master/playlists from:
     MEDIA_ROOT/hls/<id>/<resolution>/index.m3u8
+    With HLS_LAZY_RENDITIONS, a missing rendition is encoded on demand.
     """
 
     playlist_path = os.path.join(
@@ -43,6 +271,11 @@ def serve_hls_playlist(request, video_id, resolution):
         "index.m3u8"
     )
 
+    if settings.HLS_LAZY_RENDITIONS:
+        if not os.path.exists(playlist_path):
+            return serve_lazy_rendition(video_id, resolution)
+        touch_rendition(video_id, resolution)
+
     if not os.path.exists(playlist_path):
         raise Http404("Playlist not found")
 
@@ -66,4 +299,96 @@ def serve_hls_segment(request, video_id, resolution, segment):
     if not os.path.exists(segment_path):
         raise Http404("Segment not found")
 
-    return FileResponse(open(segment_path, "rb"), content_type="video/mp2t")
+    return serve_file_range(request, segment_path, "video/mp2t")
+
+
+def serve_hls_media(request, video_id, resolution):
+    """
+    Serves single-file fMP4 renditions (HLS_SEGMENT_TYPE=fmp4) from:
+    MEDIA_ROOT/hls/<id>/<resolution>/media.mp4
+    HLS and DASH players request the segments as byte ranges. The
+    playlists ask for ?v=<version>, so a player that loaded them before
+    a re-encode keeps getting the version its byte ranges belong to.
+    """
+
+    media_path = os.path.join(
+        settings.MEDIA_ROOT,
+        "hls",
+        str(video_id),
+        resolution,
+        "media.mp4"
+    )
+
+    version_id = request.GET.get("v")
+    if version_id is not None:
+        # after the grace period, the old byte ranges are gone
+        version_dir = (
+            find_media_version(video_id, version_id)
+            if re.fullmatch(r"[0-9a-f]{12}", version_id) else None
+        )
+        if version_dir is None:
+            raise Http404("Media version not found")
+        media_path = os.path.join(version_dir, resolution, "media.mp4")
+
+    if not os.path.exists(media_path):
+        raise Http404("Media not found")
+
+    return serve_file_range(request, media_path, "video/mp4")
+
+
+def serve_dash_manifest(request, video_id):
+    """
+    Serves the DASH manifest of fMP4 encodes from:
+    MEDIA_ROOT/hls/<id>/manifest.mpd
+    """
+
+    manifest_path = os.path.join(
+        settings.MEDIA_ROOT,
+        "hls",
+        str(video_id),
+        "manifest.mpd"
+    )
+
+    if not os.path.exists(manifest_path):
+        raise Http404("Manifest not found")
+
+    return FileResponse(open(manifest_path, "rb"), content_type="application/dash+xml")
+
+
+def serve_trickplay_track(request, video_id):
+    """
+    Serves the WebVTT thumbnail track for scrub previews from:
+    MEDIA_ROOT/hls/<id>/thumbnails.vtt
+    """
+
+    track_path = os.path.join(
+        settings.MEDIA_ROOT,
+        "hls",
+        str(video_id),
+        "thumbnails.vtt"
+    )
+
+    if not os.path.exists(track_path):
+        raise Http404("Thumbnail track not found")
+
+    return FileResponse(open(track_path, "rb"), content_type="text/vtt")
+
+
+def serve_trickplay_sprite(request, video_id, sprite):
+    """
+    Serves trickplay sprite sheets from:
+    MEDIA_ROOT/hls/<id>/trickplay/<sprite>.jpg
+    """
+
+    sprite_path = os.path.join(
+        settings.MEDIA_ROOT,
+        "hls",
+        str(video_id),
+        "trickplay",
+        f"{sprite}.jpg"
+    )
+
+    if not os.path.exists(sprite_path):
+        raise Http404("Sprite not found")
+
+    return FileResponse(open(sprite_path, "rb"), content_type="image/jpeg")
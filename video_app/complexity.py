@@ -0,0 +1,143 @@
+import math
+from django.conf import settings
+
+# Short side of the proxy the complexity analysis encodes.
+PROXY_SHORT_SIDE = 240
+PROXY_PRESET = "veryfast"
+
+# The analysis encodes SAMPLE_COUNT windows of SAMPLE_DURATION seconds
+# spread over the source instead of the whole title.
+SAMPLE_COUNT = 5
+SAMPLE_DURATION = 4
+
+# Highest bitrate (kbit/s) per rung, whatever the content.
+RUNG_CAPS = {
+    "480p": 1400,
+    "720p": 2800,
+    "1080p": 5000,
+}
+
+# Bits per pixel fall with resolution; bitrate grows roughly with
+# pixels ** 0.75 at constant quality.
+PIXEL_EXPONENT = 0.75
+
+# VBV cap above the predicted average, for scenes harder than the samples.
+HEADROOM = 1.5
+
+# x264 halves the bitrate for roughly every 6 CRF steps.
+CRF_STEPS_PER_HALVING = 6
+
+
+def get_proxy_size(width: int, height: int) -> tuple:
+    factor = min(1.0, PROXY_SHORT_SIDE / min(width, height))
+    return (
+        max(2, round(width * factor / 2) * 2),
+        max(2, round(height * factor / 2) * 2),
+    )
+
+
+def get_sample_windows(duration: float) -> list:
+    """
+    (start, duration) of the analysed windows, evenly spread over the
+    source. Short sources are analysed as a whole.
+    """
+    duration = duration or 0
+    if duration <= SAMPLE_COUNT * SAMPLE_DURATION:
+        return [(0.0, duration or SAMPLE_DURATION)]
+
+    return [
+        (round(duration * (i + 0.5) / SAMPLE_COUNT - SAMPLE_DURATION / 2, 3),
+         SAMPLE_DURATION)
+        for i in range(SAMPLE_COUNT)
+    ]
+
+
+def build_analysis_command(
+    input_path: str, output_path: str, start: float, duration: float,
+    proxy_size: tuple,
+) -> list:
+    """
+    Encode one window of the source as a low-resolution proxy at the
+    target CRF. Input seeking (-ss before -i) jumps to the nearest
+    keyframe, so only the window itself is decoded.
+    """
+    width, height = proxy_size
+    return [
+        "ffmpeg",
+        "-y",
+        "-ss", str(start),
+        "-t", str(duration),
+        "-i", input_path,
+        "-an",
+        "-vf", f"scale={width}:{height},format=yuv420p",
+        "-c:v", "h264",
+        "-preset", PROXY_PRESET,
+        "-crf", str(settings.HLS_PER_TITLE_CRF),
+        "-f", "h264",
+        output_path,
+    ]
+
+
+def predict_bitrate(
+    complexity: float, proxy_pixels: int, size: str, frame_rate: float
+) -> float:
+    """
+    Average bitrate (kbit/s) of a rendition of `size` at the target CRF,
+    from the bits per pixel measured on the proxy.
+    """
+    width, height = (int(v) for v in size.split("x"))
+    pixels = width * height
+    bits_per_frame = (
+        complexity * proxy_pixels * (pixels / proxy_pixels) ** PIXEL_EXPONENT
+    )
+    return bits_per_frame * frame_rate / 1000
+
+
+def get_rung_cap(name: str, size: str) -> int:
+    """
+    Bitrate cap of a rung; rungs outside RUNG_CAPS (small sources)
+    scale the lowest cap by their pixel count.
+    """
+    if name in RUNG_CAPS:
+        return RUNG_CAPS[name]
+    width, height = (int(v) for v in size.split("x"))
+    return max(200, int(RUNG_CAPS["480p"] * width * height / (854 * 480)))
+
+
+def build_title_ladder(
+    complexity: float, proxy_pixels: int, renditions: dict,
+    frame_rate: float,
+) -> dict:
+    """
+    Per-title rate control for every rung: the target CRF with a VBV
+    cap just above the predicted bitrate. Rungs that would exceed their
+    cap at the target quality get a higher CRF instead, up to
+    HLS_PER_TITLE_MAX_CRF.
+    """
+    target_crf = settings.HLS_PER_TITLE_CRF
+    ladder = {}
+
+    for name, size in renditions.items():
+        predicted = predict_bitrate(
+            complexity, proxy_pixels, size, frame_rate or 25
+        )
+        cap = get_rung_cap(name, size)
+
+        if predicted <= cap:
+            crf = target_crf
+            bitrate = min(predicted * HEADROOM, cap)
+        else:
+            crf = min(
+                settings.HLS_PER_TITLE_MAX_CRF,
+                target_crf + math.ceil(
+                    CRF_STEPS_PER_HALVING * math.log2(predicted / cap)
+                ),
+            )
+            bitrate = cap
+
+        ladder[name] = {
+            "crf": crf,
+            "bitrate": max(100, int(bitrate)),
+            "predicted": int(predicted),
+        }
+    return ladder
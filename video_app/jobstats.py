@@ -0,0 +1,198 @@
+import contextlib
+import os
+import resource
+import time
+from django.conf import settings
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from rq import get_current_job
+from video_app.models import TranscodeJob
+from video_app.storage import get_dir_size
+
+ERROR_TAIL_CHARS = 4000
+
+# Stages running in this process, innermost last. Child processes
+# report their peak memory to all of them.
+_running = []
+
+
+def measure_outputs(output_dir: str, names) -> dict:
+    """
+    Bytes written per rendition directory of an output.
+    """
+    return {
+        name: get_dir_size(os.path.join(output_dir, name))
+        for name in names
+        if os.path.isdir(os.path.join(output_dir, name))
+    }
+
+
+def record_child_usage(usage) -> None:
+    """
+    Called with the rusage of every finished ffmpeg process.
+    ru_maxrss is in kilobytes on Linux.
+    """
+    for record in _running:
+        record.peak_rss_kb = max(record.peak_rss_kb or 0, usage.ru_maxrss)
+
+
+def get_children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextlib.contextmanager
+def track_stage(
+    stage: str, video_id: int = None, content_hash: str = "",
+    part: str = "", source_seconds: float = None,
+):
+    """
+    Record a processing stage as a TranscodeJob row: wall time, CPU time
+    of the child processes (from getrusage, so ffprobe and ffmpeg), peak
+    RSS of the largest ffmpeg process and, on failure, the error tail.
+    The caller can set output_bytes/outputs on the yielded record.
+    """
+    job = get_current_job()
+    record = TranscodeJob.objects.create(
+        video_id=video_id,
+        content_hash=content_hash,
+        job_id=job.id if job else "",
+        node=settings.FFMPEG_SCHEDULER_NODE,
+        stage=stage,
+        part=part,
+        source_seconds=source_seconds,
+    )
+    started = time.monotonic()
+    cpu_before = get_children_cpu()
+    _running.append(record)
+
+    try:
+        yield record
+        record.status = "succeeded"
+    except BaseException as exc:
+        record.status = "failed"
+        record.error = str(exc)[-ERROR_TAIL_CHARS:]
+        raise
+    finally:
+        _running.remove(record)
+        record.finished_at = timezone.now()
+        record.wall_seconds = round(time.monotonic() - started, 3)
+        record.cpu_seconds = round(get_children_cpu() - cpu_before, 3)
+        if record.outputs and record.output_bytes is None:
+            record.output_bytes = sum(record.outputs.values())
+        record.save()
+
+
+def summarize_stages(jobs) -> list:
+    """
+    Throughput and failure rate per stage of the finished jobs in
+    `jobs`. "Seconds per source minute" is the wall time a stage needs
+    for one minute of video; "cores" the average number of CPU cores
+    its child processes kept busy.
+    """
+    rows = (
+        jobs.exclude(status="running")
+        .values("stage")
+        .annotate(
+            count=Count("id"),
+            failed=Count("id", filter=Q(status="failed")),
+            wall=Sum("wall_seconds"),
+            cpu=Sum("cpu_seconds"),
+            source=Sum("source_seconds", filter=Q(status="succeeded")),
+            source_wall=Sum("wall_seconds", filter=Q(
+                status="succeeded", source_seconds__gt=0
+            )),
+            peak_rss_kb=Max("peak_rss_kb"),
+            output_bytes=Sum("output_bytes"),
+        )
+        .order_by("-wall")
+    )
+
+    summary = []
+    for row in rows:
+        wall = row["wall"] or 0
+        summary.append({
+            "stage": row["stage"],
+            "count": row["count"],
+            "failed": row["failed"],
+            "failure_rate": round(100 * row["failed"] / row["count"], 1),
+            "wall_hours": round(wall / 3600, 2),
+            "avg_wall": round(wall / row["count"], 1),
+            "seconds_per_minute": (
+                round(60 * row["source_wall"] / row["source"], 1)
+                if row["source"] and row["source_wall"] else None
+            ),
+            "cores": round((row["cpu"] or 0) / wall, 2) if wall else None,
+            "peak_rss_mb": (
+                round(row["peak_rss_kb"] / 1024)
+                if row["peak_rss_kb"] else None
+            ),
+            "output_mb": round((row["output_bytes"] or 0) / 1024 ** 2, 1),
+        })
+    return summary
+
+
+def summarize_renditions(jobs) -> list:
+    """
+    Output bitrate per rendition over all successful encodes, and the
+    wall time per source minute of the single-rendition (just-in-time)
+    encodes, which show which rung is the most expensive.
+    """
+    totals = {}
+    for stage, outputs, source, wall in (
+        jobs.filter(status="succeeded", outputs__isnull=False)
+        .values_list("stage", "outputs", "source_seconds", "wall_seconds")
+    ):
+        for name, size in outputs.items():
+            entry = totals.setdefault(
+                name, {"bytes": 0, "source": 0, "single_wall": 0,
+                       "single_source": 0}
+            )
+            if source:
+                entry["bytes"] += size
+                entry["source"] += source
+            if stage == "rendition" and source and wall:
+                entry["single_wall"] += wall
+                entry["single_source"] += source
+
+    return [
+        {
+            "rendition": name,
+            "kbps": (
+                round(entry["bytes"] * 8 / entry["source"] / 1000)
+                if entry["source"] else None
+            ),
+            "seconds_per_minute": (
+                round(60 * entry["single_wall"] / entry["single_source"], 1)
+                if entry["single_source"] else None
+            ),
+        }
+        for name, entry in sorted(totals.items())
+    ]
+
+
+def summarize_nodes(jobs) -> list:
+    """
+    Busy time per worker node.
+    """
+    rows = (
+        jobs.exclude(status="running")
+        .values("node")
+        .annotate(
+            count=Count("id"),
+            failed=Count("id", filter=Q(status="failed")),
+            wall=Sum("wall_seconds"),
+            cpu=Sum("cpu_seconds"),
+        )
+        .order_by("node")
+    )
+    return [
+        {
+            "node": row["node"],
+            "count": row["count"],
+            "failure_rate": round(100 * row["failed"] / row["count"], 1),
+            "wall_hours": round((row["wall"] or 0) / 3600, 2),
+            "cpu_hours": round((row["cpu"] or 0) / 3600, 2),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,171 @@
+import csv
+import os
+import platform
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand, CommandError
+from video_app.profiles import ENCODING_PROFILES
+from video_app.storage import get_dir_size
+from video_app.tasks import (
+    build_hls_command,
+    build_ladder,
+    get_trickplay_size,
+    prepare_output_dirs,
+    run_ffmpeg_command,
+)
+from video_app.trickplay import TRICKPLAY_DIR
+
+RESULT_FIELDS = [
+    "timestamp",
+    "host",
+    "cpus",
+    "source",
+    "duration",
+    "profile",
+    "wall_seconds",
+    "encode_fps",
+    "speed",
+    "output_bytes",
+    "bitrate_kbps",
+]
+
+
+def build_source_command(
+    path: str, size: str, rate: int, duration: int, pattern: str
+) -> list:
+    """
+    Synthetic source: a lavfi test pattern with a sine tone, stored
+    nearly lossless so decoding it costs about what a camera file does.
+    """
+    return [
+        "ffmpeg", "-y",
+        "-f", "lavfi",
+        "-i", f"{pattern}=size={size}:rate={rate}:duration={duration}",
+        "-f", "lavfi",
+        "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-qp", "10",
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        "-shortest",
+        path,
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode synthetic lavfi sources with every encoding profile and "
+        "append wall time, encode fps and output size to a CSV file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles", nargs="+", default=list(ENCODING_PROFILES),
+            help="Profiles to measure (default: all).",
+        )
+        parser.add_argument(
+            "--sizes", nargs="+", default=["1280x720", "1920x1080"],
+            help="Source resolutions as WxH.",
+        )
+        parser.add_argument("--duration", type=int, default=30)
+        parser.add_argument("--rate", type=int, default=30)
+        parser.add_argument(
+            "--pattern", default="testsrc2",
+            help="lavfi source filter (testsrc, testsrc2, mandelbrot, ...).",
+        )
+        parser.add_argument("--repeat", type=int, default=1)
+        parser.add_argument("--output", default="encoding-benchmark.csv")
+
+    def handle(self, *args, **options):
+        unknown = set(options["profiles"]) - set(ENCODING_PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+        work_dir = tempfile.mkdtemp(prefix="videoflix-benchmark-")
+        try:
+            results = self.run_benchmarks(work_dir, options)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        self.write_results(options["output"], results)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(results)} results appended to {options['output']}"
+        ))
+
+    def run_benchmarks(self, work_dir: str, options: dict) -> list:
+        results = []
+        duration = options["duration"]
+
+        for size in options["sizes"]:
+            source = os.path.join(work_dir, f"{options['pattern']}-{size}.mp4")
+            run_ffmpeg_command(build_source_command(
+                source, size, options["rate"], duration, options["pattern"]
+            ))
+
+            width, height = (int(v) for v in size.split("x"))
+            renditions = build_ladder(width, height)
+
+            for profile in options["profiles"]:
+                for _ in range(options["repeat"]):
+                    result = self.encode(
+                        source, work_dir, renditions, profile, options
+                    )
+                    result["source"] = os.path.basename(source)
+                    results.append(result)
+                    self.stdout.write(
+                        f"{size} {profile}: {result['wall_seconds']}s, "
+                        f"{result['encode_fps']} fps, "
+                        f"{result['bitrate_kbps']} kbit/s"
+                    )
+
+        return results
+
+    def encode(
+        self,
+        source: str,
+        work_dir: str,
+        renditions: dict,
+        profile: str,
+        options: dict,
+    ) -> dict:
+        """
+        Run the production single-pass command (all renditions, audio and
+        trickplay) for one profile and measure it.
+        """
+        output_dir = os.path.join(work_dir, "output")
+        shutil.rmtree(output_dir, ignore_errors=True)
+        prepare_output_dirs(output_dir, renditions, with_audio=True)
+        os.makedirs(os.path.join(output_dir, TRICKPLAY_DIR))
+
+        command = build_hls_command(
+            source, output_dir, renditions, True,
+            get_trickplay_size(renditions), profile,
+        )
+
+        started = time.monotonic()
+        run_ffmpeg_command(command)
+        wall = time.monotonic() - started
+
+        duration = options["duration"]
+        output_bytes = get_dir_size(output_dir)
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "host": platform.node(),
+            "cpus": os.cpu_count(),
+            "duration": duration,
+            "profile": profile,
+            "wall_seconds": round(wall, 2),
+            "encode_fps": round(duration * options["rate"] / wall, 1),
+            "speed": round(duration / wall, 2),
+            "output_bytes": output_bytes,
+            "bitrate_kbps": round(output_bytes * 8 / duration / 1000),
+        }
+
+    def write_results(self, path: str, results: list) -> None:
+        new_file = not os.path.exists(path)
+        with open(path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            if new_file:
+                writer.writeheader()
+            writer.writerows(results)
@@ -0,0 +1,48 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from video_app.models import RenditionUsage, Video
+from video_app.storage import has_rendition
+from video_app.tasks import evict_rendition
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete just-in-time renditions that were not requested for "
+        "HLS_LAZY_EVICT_DAYS days. They are encoded again on demand."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.HLS_LAZY_EVICT_DAYS,
+            help="Evict renditions unused for this many days.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only list the renditions that would be evicted.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        unused = RenditionUsage.objects.filter(last_used_at__lt=cutoff)
+        evicted = 0
+
+        for usage in unused.order_by("last_used_at"):
+            video = Video.objects.filter(
+                content_hash=usage.content_hash
+            ).first()
+            if video is None or not has_rendition(usage.content_hash, usage.name):
+                usage.delete()
+                continue
+
+            self.stdout.write(
+                f"{usage.content_hash[:12]} {usage.name}: last used "
+                f"{usage.last_used_at:%Y-%m-%d}"
+            )
+            if not options["dry_run"]:
+                evict_rendition(video, usage.name)
+            evicted += 1
+
+        verb = "Would evict" if options["dry_run"] else "Evicted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {evicted} renditions"))
@@ -0,0 +1,236 @@
+import csv
+import os
+import shutil
+import time
+import django_rq
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rq import Queue
+from rq.job import Job
+from video_app.models import Video
+from video_app.progress import set_status_many
+
+VIDEO_EXTENSIONS = {".mp4", ".m4v", ".mov", ".mkv", ".webm", ".avi"}
+UPLOAD_DIR = "videos"
+
+
+def title_from_path(path: str) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem.replace("_", " ").replace("-", " ").strip().title()
+
+
+def scan_directory(directory: str, category: str) -> list:
+    entries = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS:
+                path = os.path.join(root, name)
+                entries.append({
+                    "path": path,
+                    "root": directory,
+                    "title": title_from_path(path),
+                    "description": "",
+                    "category": category,
+                })
+    entries.sort(key=lambda entry: entry["path"])
+    return entries
+
+
+def read_manifest(manifest_path: str, category: str) -> list:
+    """
+    Read a CSV manifest with a `file` column (absolute, or relative to
+    the manifest) and optional title, description and category columns.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = []
+    with open(manifest_path, newline="") as f:
+        for row in csv.DictReader(f):
+            path = os.path.join(base_dir, row["file"])
+            entries.append({
+                "path": path,
+                "root": base_dir,
+                "title": row.get("title") or title_from_path(path),
+                "description": row.get("description") or "",
+                "category": row.get("category") or category,
+            })
+    return entries
+
+
+def is_inside(path: str, directory: str) -> bool:
+    return os.path.commonpath([directory, path]) == directory
+
+
+def get_storage_name(path: str, root: str) -> str:
+    """
+    Name of the file relative to MEDIA_ROOT, as stored in video_file.
+    Files outside MEDIA_ROOT are imported into the upload directory,
+    keeping their path below the scanned directory (or manifest) so
+    same-named files of different folders do not collide.
+    """
+    media_root = os.path.abspath(settings.MEDIA_ROOT)
+    abs_path = os.path.abspath(path)
+    if is_inside(abs_path, media_root):
+        return os.path.relpath(abs_path, media_root)
+    abs_root = os.path.abspath(root)
+    if is_inside(abs_path, abs_root):
+        return os.path.join(UPLOAD_DIR, os.path.relpath(abs_path, abs_root))
+    return os.path.join(UPLOAD_DIR, os.path.basename(path))
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a directory or CSV manifest of videos: create the rows in "
+        "batches and enqueue their processing jobs at a limited rate. "
+        "Re-running the command skips videos that were already imported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Directory or manifest .csv")
+        parser.add_argument("--category", default="uncategorized")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--rate", type=float, default=20,
+            help="Maximum videos enqueued per second (0 = unlimited).",
+        )
+        parser.add_argument(
+            "--queue", default="default",
+            help="Queue for the ingest jobs. The default keeps a bulk "
+                 "import behind new uploads on the 'high' queue.",
+        )
+        parser.add_argument(
+            "--link", action="store_true",
+            help="Hard-link files from outside MEDIA_ROOT instead of copying.",
+        )
+
+    def handle(self, *args, **options):
+        source = options["source"]
+        if os.path.isdir(source):
+            entries = scan_directory(source, options["category"])
+        elif source.lower().endswith(".csv") and os.path.isfile(source):
+            entries = read_manifest(source, options["category"])
+        else:
+            raise CommandError(f"Not a directory or .csv manifest: {source}")
+
+        queue = django_rq.get_queue(options["queue"])
+        batch_size = options["batch_size"]
+        created = enqueued = 0
+        started = time.monotonic()
+        entries = self.drop_duplicates(entries)
+
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            new_ids, pending_ids = self.create_batch(batch, options["link"])
+            job_count = self.enqueue_batch(queue, new_ids + pending_ids)
+
+            created += len(new_ids)
+            enqueued += job_count
+            self.stdout.write(
+                f"{start + len(batch)}/{len(entries)} files: "
+                f"{created} created, {enqueued} enqueued"
+            )
+
+            if options["rate"]:
+                ahead = enqueued / options["rate"] - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {created} videos created, {enqueued} jobs enqueued"
+        ))
+
+    def drop_duplicates(self, entries: list) -> list:
+        """
+        Keep the first of several files that would be stored under the
+        same name (e.g. a manifest listing same-named files of different
+        directories) and report the others.
+        """
+        unique = {}
+        for entry in entries:
+            entry["name"] = get_storage_name(entry["path"], entry["root"])
+            if entry["name"] in unique:
+                self.stderr.write(self.style.WARNING(
+                    f"Skipped {entry['path']}: stored name {entry['name']} "
+                    f"is taken by {unique[entry['name']]['path']}"
+                ))
+                continue
+            unique[entry["name"]] = entry
+        return list(unique.values())
+
+    def create_batch(self, batch: list, link: bool) -> tuple:
+        """
+        Create rows for files that are not imported yet. Returns the new
+        ids and the ids of rows an interrupted run created but never
+        finished processing.
+        """
+        names = {entry["name"]: entry for entry in batch}
+        existing = dict(
+            Video.objects.filter(video_file__in=names)
+            .values_list("video_file", "content_hash")
+        )
+
+        videos = []
+        for name, entry in names.items():
+            if name in existing:
+                continue
+            self.import_file(entry["path"], name, link)
+            videos.append(Video(
+                title=entry["title"],
+                description=entry["description"],
+                category=entry["category"],
+                video_file=name,
+            ))
+
+        # bulk_create does not send post_save, the jobs are enqueued below
+        new_ids = [video.id for video in Video.objects.bulk_create(videos)]
+        pending_ids = list(
+            Video.objects.filter(
+                video_file__in=[n for n, h in existing.items() if not h]
+            ).values_list("id", flat=True)
+        )
+        return new_ids, pending_ids
+
+    def import_file(self, path: str, name: str, link: bool) -> None:
+        target = os.path.join(settings.MEDIA_ROOT, name)
+        if os.path.abspath(path) == os.path.abspath(target):
+            return
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if link:
+            try:
+                os.link(path, target)
+                return
+            except OSError:
+                pass  # other filesystem
+        shutil.copy2(path, target)
+
+    def enqueue_batch(self, queue, video_ids: list) -> int:
+        """
+        Enqueue ingest jobs for all videos of a batch in one pipelined
+        round trip. Videos whose ingest job still exists (queued, running
+        or failed) are left alone.
+        """
+        job_ids = [f"ingest-{video_id}" for video_id in video_ids]
+        existing_jobs = Job.fetch_many(job_ids, connection=queue.connection)
+        files = dict(
+            Video.objects.filter(id__in=video_ids)
+            .values_list("id", "video_file")
+        )
+
+        job_datas = [
+            Queue.prepare_data(
+                "video_app.tasks.ingest_video",
+                (video_id, files[video_id]),
+                timeout=settings.VIDEO_INGEST_TIMEOUT,
+                job_id=job_id,
+            )
+            for video_id, job_id, job in zip(video_ids, job_ids, existing_jobs)
+            if job is None
+        ]
+        if not job_datas:
+            return 0
+
+        queue.enqueue_many(job_datas)
+        set_status_many(
+            [data.args[0] for data in job_datas], "queued", stage="bulk ingest"
+        )
+        return len(job_datas)
@@ -0,0 +1,92 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from video_app.models import Video
+from video_app.tasks import (
+    clear_retranscode_backlog,
+    feed_retranscodes,
+    get_retranscode_backlog,
+    request_retranscode,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the processing of selected videos again, e.g. after a ladder "
+        "or profile change. Videos wait in a backlog and at most "
+        "RETRANSCODE_MAX_IN_FLIGHT are queued or running at a time, on "
+        "the 'low' queue behind new uploads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="Video ids.")
+        parser.add_argument("--category", help="Only videos of this category.")
+        parser.add_argument(
+            "--profile",
+            help="Only videos with this encoding profile ('' = default).",
+        )
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Select the whole catalog when no ids are given.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only count the videos that would be re-transcoded.",
+        )
+        parser.add_argument(
+            "--clear", action="store_true",
+            help="Drop the videos still waiting in the backlog and exit.",
+        )
+        parser.add_argument(
+            "--wait", action="store_true",
+            help="Stay in the foreground and report progress until the "
+                 "backlog is done.",
+        )
+        parser.add_argument("--interval", type=float, default=30)
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            dropped = clear_retranscode_backlog()
+            self.stdout.write(self.style.SUCCESS(
+                f"Dropped {dropped} waiting videos"
+            ))
+            return
+
+        videos = self.select_videos(options)
+        count = videos.count()
+        if options["dry_run"]:
+            self.stdout.write(f"Would re-transcode {count} videos")
+            return
+
+        request_retranscode(videos.values_list("id", flat=True).iterator())
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} videos added to the backlog, at most "
+            f"{settings.RETRANSCODE_MAX_IN_FLIGHT} in flight"
+        ))
+
+        while options["wait"]:
+            # also restarts the backlog if a worker died with its callback
+            feed_retranscodes()
+            waiting, in_flight = get_retranscode_backlog()
+            self.stdout.write(f"{waiting} waiting, {in_flight} in flight")
+            if not waiting and not in_flight:
+                break
+            time.sleep(options["interval"])
+
+    def select_videos(self, options):
+        if not options["ids"] and not (
+            options["all"] or options["category"]
+            or options["profile"] is not None
+        ):
+            raise CommandError("Pass video ids, a filter or --all.")
+
+        videos = Video.objects.exclude(video_file__isnull=True).exclude(
+            video_file=""
+        )
+        if options["ids"]:
+            videos = videos.filter(id__in=options["ids"])
+        if options["category"]:
+            videos = videos.filter(category=options["category"])
+        if options["profile"] is not None:
+            videos = videos.filter(encoding_profile=options["profile"])
+        return videos.order_by("id")
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:43
+
+import video_app.profiles
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0007_video_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='encoding_profile',
+            field=models.CharField(blank=True, choices=video_app.profiles.profile_choices, help_text='x264 profile for this video; empty uses the default.', max_length=50),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:48
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0008_video_encoding_profile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(max_length=100)),
+                ('file_name', models.CharField(help_text='Target path relative to MEDIA_ROOT.', max_length=255)),
+                ('length', models.BigIntegerField(help_text='Total size in bytes.')),
+                ('offset', models.BigIntegerField(default=0, help_text='Bytes received so far.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('video', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='video_app.video')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0009_video_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoupload',
+            name='live_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('encoding', 'Encoding'), ('done', 'Done'), ('failed', 'Failed')], help_text='State of the encode that follows the upload while it is still arriving (pipe-through ingest).', max_length=20),
+        ),
+    ]
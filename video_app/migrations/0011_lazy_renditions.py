@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0010_videoupload_live_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0, help_text='Master playlist requests, counted with HLS_LAZY_RENDITIONS.'),
+        ),
+        migrations.CreateModel(
+            name='RenditionUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('name', models.CharField(max_length=10)),
+                ('last_used_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('content_hash', 'name'), name='unique_rendition_usage')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0011_lazy_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='encoding_ladder',
+            field=models.JSONField(blank=True, help_text='Per-title complexity and CRF/bitrate cap per rendition.', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0012_video_encoding_ladder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='preview_url',
+            field=models.URLField(blank=True, help_text='Silent hover preview clip, set by the FFmpeg worker.', null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0013_video_preview_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscodeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('job_id', models.CharField(blank=True, help_text='RQ job the stage ran in.', max_length=255)),
+                ('node', models.CharField(blank=True, max_length=255)),
+                ('stage', models.CharField(choices=[('probe', 'Probe'), ('analysis', 'Complexity analysis'), ('encode', 'Encode'), ('live_encode', 'Live encode'), ('split', 'Split'), ('chunk', 'Chunk'), ('stitch', 'Stitch'), ('rendition', 'Rendition'), ('reencode', 'Re-encode'), ('retranscode', 'Re-transcode'), ('thumbnail', 'Thumbnail'), ('preview_clip', 'Preview clip')], max_length=20)),
+                ('part', models.CharField(blank=True, help_text='Rendition or chunk the stage worked on.', max_length=100)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('started_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('source_seconds', models.FloatField(blank=True, help_text='Seconds of source material the stage processed.', null=True)),
+                ('wall_seconds', models.FloatField(blank=True, null=True)),
+                ('cpu_seconds', models.FloatField(blank=True, help_text='User and system time of the child processes (ffmpeg).', null=True)),
+                ('peak_rss_kb', models.PositiveIntegerField(blank=True, help_text='Peak resident memory of the largest child process.', null=True)),
+                ('output_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('outputs', models.JSONField(blank=True, help_text='Output bytes per rendition.', null=True)),
+                ('error', models.TextField(blank=True)),
+                ('video', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transcode_jobs', to='video_app.video')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
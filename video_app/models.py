@@ -1,4 +1,7 @@
+import uuid
+from django.conf import settings
 from django.db import models
+from video_app.profiles import profile_choices
 
 
 class Video(models.Model):
@@ -13,6 +16,11 @@ class Video(models.Model):
         null=True,
         help_text="Wird vom FFmpeg-Worker automatisch gesetzt."
     )
+    preview_url = models.URLField(
+        blank=True,
+        null=True,
+        help_text="Silent hover preview clip, set by the FFmpeg worker.",
+    )
     category = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
     video_file = models.FileField(
@@ -22,8 +30,212 @@ class Video(models.Model):
         help_text="Optional source MP4 file for background conversion.",
     )
 
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    frame_rate = models.FloatField(blank=True, null=True)
+    duration = models.FloatField(
+        blank=True,
+        null=True,
+        help_text="Source duration in seconds, set by the ffprobe stage.",
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="SHA-256 of the source file; HLS output is stored under it.",
+    )
+    video_codec = models.CharField(max_length=50, blank=True)
+    audio_codec = models.CharField(max_length=50, blank=True)
+    encoding_profile = models.CharField(
+        max_length=50,
+        blank=True,
+        choices=profile_choices,
+        help_text="x264 profile for this video; empty uses the default.",
+    )
+    encoding_ladder = models.JSONField(
+        blank=True,
+        null=True,
+        help_text="Per-title complexity and CRF/bitrate cap per rendition.",
+    )
+    view_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Master playlist requests, counted with HLS_LAZY_RENDITIONS.",
+    )
+
     class Meta:
         ordering = ["-created_at"]
 
     def __str__(self) -> str:
         return f"{self.title} ({self.id})"
+
+    @property
+    def has_audio(self) -> bool:
+        return bool(self.audio_codec)
+
+
+class VideoUpload(models.Model):
+    """
+    A resumable upload of a source file. Chunks are appended to
+    `file_name` below MEDIA_ROOT until `offset` reaches `length`; then
+    the Video is created and processing starts.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    category = models.CharField(max_length=100)
+    file_name = models.CharField(
+        max_length=255,
+        help_text="Target path relative to MEDIA_ROOT.",
+    )
+    length = models.BigIntegerField(help_text="Total size in bytes.")
+    offset = models.BigIntegerField(
+        default=0,
+        help_text="Bytes received so far.",
+    )
+    video = models.OneToOneField(
+        Video,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="upload",
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    live_status = models.CharField(
+        max_length=20,
+        blank=True,
+        choices=[
+            ("pending", "Pending"),
+            ("encoding", "Encoding"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        help_text="State of the encode that follows the upload while it "
+                  "is still arriving (pipe-through ingest).",
+    )
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.file_name} ({self.offset}/{self.length})"
+
+    @property
+    def is_complete(self) -> bool:
+        return self.offset >= self.length
+
+
+class RenditionUsage(models.Model):
+    """
+    Last playlist request of a just-in-time rendition of some content.
+    Rows are created when the rendition is published and removed when
+    evict_renditions deletes it again.
+    """
+
+    content_hash = models.CharField(max_length=64)
+    name = models.CharField(max_length=10)
+    last_used_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_hash", "name"], name="unique_rendition_usage"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.content_hash[:12]} {self.name}"
+
+
+class TranscodeJob(models.Model):
+    """
+    One processing stage of a video (probe, encode, a chunk, a
+    rendition, the thumbnail, ...) with the resources it used. Rows are
+    written by the workers and aggregated in the admin for capacity
+    planning.
+    """
+
+    video = models.ForeignKey(
+        Video,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="transcode_jobs",
+    )
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    job_id = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="RQ job the stage ran in.",
+    )
+    node = models.CharField(max_length=255, blank=True)
+    stage = models.CharField(
+        max_length=20,
+        choices=[
+            ("probe", "Probe"),
+            ("analysis", "Complexity analysis"),
+            ("encode", "Encode"),
+            ("live_encode", "Live encode"),
+            ("split", "Split"),
+            ("chunk", "Chunk"),
+            ("stitch", "Stitch"),
+            ("rendition", "Rendition"),
+            ("reencode", "Re-encode"),
+            ("retranscode", "Re-transcode"),
+            ("thumbnail", "Thumbnail"),
+            ("preview_clip", "Preview clip"),
+        ],
+    )
+    part = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Rendition or chunk the stage worked on.",
+    )
+    status = models.CharField(
+        max_length=20,
+        default="running",
+        choices=[
+            ("running", "Running"),
+            ("succeeded", "Succeeded"),
+            ("failed", "Failed"),
+        ],
+    )
+    started_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    source_seconds = models.FloatField(
+        blank=True,
+        null=True,
+        help_text="Seconds of source material the stage processed.",
+    )
+    wall_seconds = models.FloatField(blank=True, null=True)
+    cpu_seconds = models.FloatField(
+        blank=True,
+        null=True,
+        help_text="User and system time of the child processes (ffmpeg).",
+    )
+    peak_rss_kb = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text="Peak resident memory of the largest child process.",
+    )
+    output_bytes = models.BigIntegerField(blank=True, null=True)
+    outputs = models.JSONField(
+        blank=True,
+        null=True,
+        help_text="Output bytes per rendition.",
+    )
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self) -> str:
+        part = f" {self.part}" if self.part else ""
+        return f"{self.stage}{part} of {self.content_hash[:12]} ({self.status})"
@@ -0,0 +1,395 @@
+import os
+import xml.etree.ElementTree as ET
+from video_app.probe import first_stream, parse_frame_rate, run_ffprobe
+
+MASTER_PLAYLIST = "master.m3u8"
+MEDIA_PLAYLIST = "index.m3u8"
+DASH_MANIFEST = "manifest.mpd"
+
+# ffprobe profile name -> profile_idc + constraint flags (RFC 6381)
+AVC_PROFILES = {
+    "Constrained Baseline": "42e0",
+    "Baseline": "4200",
+    "Main": "4d40",
+    "Extended": "5800",
+    "High": "6400",
+}
+
+AAC_PROFILES = {
+    "LC": "mp4a.40.2",
+    "HE-AAC": "mp4a.40.5",
+    "HE-AACv2": "mp4a.40.29",
+}
+
+
+def parse_byterange(value: str, next_offset: int) -> tuple:
+    """
+    Parse '<length>[@<offset>]'. Without an offset the range starts where
+    the previous one of the same file ended.
+    """
+    length, _, offset = value.partition("@")
+    return (int(offset) if offset else next_offset), int(length)
+
+
+def read_media_playlist(playlist_path: str) -> dict:
+    """
+    Parse a media playlist into its init section (EXT-X-MAP, fMP4 only)
+    and its segments. Each segment is a dict with duration, uri and, for
+    single-file renditions, the byte offset and length inside that file.
+    URIs are file names: the ?v= version query of a published playlist
+    is dropped.
+    """
+    init = None
+    segments = []
+    duration = None
+    byterange = None
+    next_offset = 0
+
+    with open(playlist_path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXT-X-MAP:"):
+                attributes = dict(
+                    item.split("=", 1)
+                    for item in line[len("#EXT-X-MAP:"):].split(",")
+                )
+                init = {"uri": attributes["URI"].strip('"').partition("?")[0]}
+                if "BYTERANGE" in attributes:
+                    offset, length = parse_byterange(
+                        attributes["BYTERANGE"].strip('"'), 0
+                    )
+                    init.update(offset=offset, length=length)
+            elif line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            elif line.startswith("#EXT-X-BYTERANGE:"):
+                byterange = parse_byterange(
+                    line[len("#EXT-X-BYTERANGE:"):], next_offset
+                )
+            elif line and not line.startswith("#") and duration is not None:
+                segment = {"duration": duration, "uri": line.partition("?")[0]}
+                if byterange:
+                    offset, length = byterange
+                    segment.update(offset=offset, length=length)
+                    next_offset = offset + length
+                segments.append(segment)
+                duration = None
+                byterange = None
+
+    return {"init": init, "segments": segments}
+
+
+def read_segments(playlist_path: str) -> list:
+    return read_media_playlist(playlist_path)["segments"]
+
+
+def measure_bandwidth(rendition_dir: str) -> tuple:
+    """
+    Measure peak and average bitrate (bits/s) of an encoded rendition
+    from its segment sizes and durations.
+    """
+    segments = read_segments(os.path.join(rendition_dir, MEDIA_PLAYLIST))
+    peak = 0
+    total_bits = 0
+    total_duration = 0.0
+
+    for segment in segments:
+        if "length" in segment:
+            size = segment["length"]
+        else:
+            size = os.path.getsize(os.path.join(rendition_dir, segment["uri"]))
+        bits = size * 8
+        total_bits += bits
+        total_duration += segment["duration"]
+        if segment["duration"] > 0:
+            peak = max(peak, bits / segment["duration"])
+
+    average = total_bits / total_duration if total_duration else 0
+    return int(peak), int(average)
+
+
+# H.264 levels (level_idc) with their maximum frame size in macroblocks
+# and macroblocks per second (ITU-T H.264 table A-1).
+AVC_LEVELS = [
+    (30, 1620, 40500),
+    (31, 3600, 108000),
+    (32, 5120, 216000),
+    (40, 8192, 245760),
+    (42, 8704, 522240),
+    (50, 22080, 589824),
+    (51, 36864, 983040),
+    (52, 36864, 2073600),
+]
+
+
+def get_avc_level(width: int, height: int, frame_rate: float = None) -> int:
+    """
+    Lowest H.264 level for the frame size and rate, as x264 picks it.
+    """
+    frame_size = -(-width // 16) * -(-height // 16)
+    mb_rate = frame_size * (frame_rate or 30)
+    for level, max_frame_size, max_mb_rate in AVC_LEVELS:
+        if frame_size <= max_frame_size and mb_rate <= max_mb_rate:
+            return level
+    return AVC_LEVELS[-1][0]
+
+
+def avc_codec_string(stream: dict) -> str:
+    profile = AVC_PROFILES.get(stream.get("profile"), "6400")
+    level = int(stream.get("level", 40))
+    return f"avc1.{profile}{level:02x}"
+
+
+def aac_codec_string(stream: dict) -> str:
+    return AAC_PROFILES.get(stream.get("profile"), "mp4a.40.2")
+
+
+def probe_rendition(rendition_dir: str) -> dict:
+    """
+    Probe the first segment of a rendition for its codec and size.
+    """
+    segments = read_segments(os.path.join(rendition_dir, MEDIA_PLAYLIST))
+    first_segment = os.path.join(rendition_dir, segments[0]["uri"])
+    streams = run_ffprobe(first_segment).get("streams", [])
+
+    video = first_stream(streams, "video")
+    if video:
+        return {
+            "codecs": avc_codec_string(video),
+            "resolution": f"{video['width']}x{video['height']}",
+            "frame_rate": parse_frame_rate(video.get("avg_frame_rate", "")),
+        }
+
+    return {"codecs": aac_codec_string(first_stream(streams, "audio"))}
+
+
+def build_master_playlist(
+    variants: list, audio: dict = None, version: int = 3
+) -> str:
+    """
+    Render a multi-variant playlist. Each variant (and the optional audio
+    rendition) is a dict with name, bandwidth, average_bandwidth and the
+    probe_rendition() values. fMP4 renditions need version 7.
+    """
+    lines = ["#EXTM3U", f"#EXT-X-VERSION:{version}"]
+
+    if audio:
+        lines.append(
+            f'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="{audio["name"]}",'
+            f'NAME="Default",DEFAULT=YES,AUTOSELECT=YES,'
+            f'URI="{audio["name"]}/{MEDIA_PLAYLIST}"'
+        )
+
+    for variant in sorted(variants, key=lambda v: v["bandwidth"]):
+        bandwidth = variant["bandwidth"]
+        average = variant["average_bandwidth"]
+        codecs = variant["codecs"]
+        if audio:
+            bandwidth += audio["bandwidth"]
+            average += audio["average_bandwidth"]
+            codecs += f",{audio['codecs']}"
+
+        attributes = [
+            f"BANDWIDTH={bandwidth}",
+            f"AVERAGE-BANDWIDTH={average}",
+            f"RESOLUTION={variant['resolution']}",
+        ]
+        if variant.get("frame_rate"):
+            attributes.append(f"FRAME-RATE={variant['frame_rate']:.3f}")
+        attributes.append(f'CODECS="{codecs}"')
+        if audio:
+            attributes.append(f'AUDIO="{audio["name"]}"')
+
+        lines.append(f"#EXT-X-STREAM-INF:{','.join(attributes)}")
+        lines.append(f"{variant['name']}/{MEDIA_PLAYLIST}")
+
+    return "\n".join(lines) + "\n"
+
+
+def describe_rendition(output_dir: str, name: str) -> dict:
+    rendition_dir = os.path.join(output_dir, name)
+    peak, average = measure_bandwidth(rendition_dir)
+    return {
+        "name": name,
+        "bandwidth": peak,
+        "average_bandwidth": average,
+        "playlist": read_media_playlist(
+            os.path.join(rendition_dir, MEDIA_PLAYLIST)
+        ),
+        **probe_rendition(rendition_dir),
+    }
+
+
+def write_manifest(path: str, text: str) -> None:
+    """
+    Replace a manifest with a rename instead of rewriting it in place;
+    the old file may be a hard link into a published version.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def estimate_variant(reference: dict, name: str, resolution: str) -> dict:
+    """
+    Stand-in for a rendition that is not encoded yet: the measured
+    bandwidth of `reference` scaled by the pixel count, and its codec
+    with the AVC level the larger frame needs.
+    """
+    width, height = (int(v) for v in resolution.split("x"))
+    ref_width, ref_height = (int(v) for v in reference["resolution"].split("x"))
+    factor = width * height / (ref_width * ref_height)
+
+    codecs = reference["codecs"]
+    if codecs.startswith("avc1.") and len(codecs) == 11:
+        level = max(
+            int(codecs[-2:], 16),
+            get_avc_level(width, height, reference.get("frame_rate")),
+        )
+        codecs = f"{codecs[:-2]}{level:02x}"
+
+    return {
+        **reference,
+        "name": name,
+        "resolution": resolution,
+        "codecs": codecs,
+        "bandwidth": int(reference["bandwidth"] * factor),
+        "average_bandwidth": int(reference["average_bandwidth"] * factor),
+    }
+
+
+def write_master_playlist(
+    output_dir: str, names: list, audio_name: str = None, pending: dict = None
+) -> str:
+    """
+    Measure the encoded renditions in output_dir and write master.m3u8
+    next to them. Returns the path of the written playlist.
+
+    `pending` (name -> "WxH") lists renditions that are encoded on
+    demand; they get an estimated entry so players can request them.
+    """
+    variants = [describe_rendition(output_dir, name) for name in names]
+    reference = min(variants, key=lambda v: v["bandwidth"])
+    variants += [
+        estimate_variant(reference, name, resolution)
+        for name, resolution in (pending or {}).items()
+    ]
+    audio = describe_rendition(output_dir, audio_name) if audio_name else None
+    version = 7 if variants[0]["playlist"]["init"] else 3
+
+    master_path = os.path.join(output_dir, MASTER_PLAYLIST)
+    write_manifest(master_path, build_master_playlist(variants, audio, version))
+
+    return master_path
+
+
+def format_duration(seconds: float) -> str:
+    return f"PT{seconds:.3f}S"
+
+
+def build_segment_list(playlist: dict) -> ET.Element:
+    """
+    Describe a single-file fMP4 rendition as a DASH SegmentList with the
+    same byte ranges its HLS playlist uses.
+    """
+    segment_list = ET.Element("SegmentList", timescale="1000")
+
+    init = playlist["init"]
+    ET.SubElement(
+        segment_list, "Initialization",
+        range=f"{init['offset']}-{init['offset'] + init['length'] - 1}",
+    )
+
+    timeline = ET.SubElement(segment_list, "SegmentTimeline")
+    for index, segment in enumerate(playlist["segments"]):
+        attributes = {"d": str(round(segment["duration"] * 1000))}
+        if index == 0:
+            attributes["t"] = "0"
+        ET.SubElement(timeline, "S", attributes)
+
+    for segment in playlist["segments"]:
+        end = segment["offset"] + segment["length"] - 1
+        ET.SubElement(
+            segment_list, "SegmentURL",
+            mediaRange=f"{segment['offset']}-{end}",
+        )
+
+    return segment_list
+
+
+def add_representation(adaptation_set: ET.Element, rendition: dict) -> None:
+    attributes = {
+        "id": rendition["name"],
+        "bandwidth": str(rendition["bandwidth"]),
+        "codecs": rendition["codecs"],
+    }
+    if "resolution" in rendition:
+        width, height = rendition["resolution"].split("x")
+        attributes.update(width=width, height=height)
+    if rendition.get("frame_rate"):
+        attributes["frameRate"] = f"{rendition['frame_rate']:g}"
+
+    representation = ET.SubElement(
+        adaptation_set, "Representation", attributes
+    )
+    playlist = rendition["playlist"]
+    ET.SubElement(representation, "BaseURL").text = (
+        f"{rendition['name']}/{playlist['init']['uri']}"
+    )
+    representation.append(build_segment_list(playlist))
+
+
+def build_dash_manifest(variants: list, audio: dict = None) -> str:
+    """
+    Render a static DASH MPD that points at the same single-file fMP4
+    renditions as the HLS playlists, so both protocols share one copy of
+    the media.
+    """
+    duration = sum(
+        segment["duration"] for segment in variants[0]["playlist"]["segments"]
+    )
+
+    mpd = ET.Element(
+        "MPD",
+        xmlns="urn:mpeg:dash:schema:mpd:2011",
+        type="static",
+        profiles="urn:mpeg:dash:profile:isoff-main:2011",
+        minBufferTime="PT4S",
+        mediaPresentationDuration=format_duration(duration),
+    )
+    period = ET.SubElement(mpd, "Period", id="0", start="PT0S")
+
+    video_set = ET.SubElement(
+        period, "AdaptationSet",
+        id="0", contentType="video", mimeType="video/mp4",
+        segmentAlignment="true", startWithSAP="1",
+    )
+    for variant in sorted(variants, key=lambda v: v["bandwidth"]):
+        add_representation(video_set, variant)
+
+    if audio:
+        audio_set = ET.SubElement(
+            period, "AdaptationSet",
+            id="1", contentType="audio", mimeType="audio/mp4",
+            segmentAlignment="true", startWithSAP="1",
+        )
+        add_representation(audio_set, audio)
+
+    ET.indent(mpd)
+    return ET.tostring(mpd, encoding="unicode", xml_declaration=True) + "\n"
+
+
+def write_dash_manifest(
+    output_dir: str, names: list, audio_name: str = None
+) -> str:
+    """
+    Write manifest.mpd for single-file fMP4 renditions in output_dir.
+    Returns the path of the written manifest.
+    """
+    variants = [describe_rendition(output_dir, name) for name in names]
+    audio = describe_rendition(output_dir, audio_name) if audio_name else None
+
+    manifest_path = os.path.join(output_dir, DASH_MANIFEST)
+    write_manifest(manifest_path, build_dash_manifest(variants, audio))
+
+    return manifest_path
@@ -0,0 +1,117 @@
+import os
+
+# Candidate frames, evenly spread between 10% and 90% of the video so
+# fade-ins and credits are skipped.
+CANDIDATE_COUNT = 6
+FIRST_CANDIDATE = 0.1
+LAST_CANDIDATE = 0.9
+
+# Candidates are scored on a small grayscale copy.
+SCORE_SIZE = (160, 90)
+
+# Mean luma below BLACK_LEVEL (or above WHITE_LEVEL) and a luma standard
+# deviation below FLAT_LEVEL mark fades, black frames and title cards.
+BLACK_LEVEL = 24
+WHITE_LEVEL = 235
+FLAT_LEVEL = 12
+
+
+def get_candidate_times(duration: float) -> list:
+    if not duration:
+        return [0.0]
+    step = (LAST_CANDIDATE - FIRST_CANDIDATE) / (CANDIDATE_COUNT - 1)
+    return [
+        round(duration * (FIRST_CANDIDATE + i * step), 3)
+        for i in range(CANDIDATE_COUNT)
+    ]
+
+
+def get_candidate_paths(work_dir: str, index: int) -> tuple:
+    return (
+        os.path.join(work_dir, f"candidate-{index}.jpg"),
+        os.path.join(work_dir, f"candidate-{index}.gray"),
+    )
+
+
+def build_poster_command(input_path: str, work_dir: str, times: list) -> list:
+    """
+    Grab one frame at every candidate time in a single ffmpeg run. Each
+    -ss comes before its -i (input seeking), so ffmpeg jumps to the
+    nearest keyframe instead of decoding from the start. Every frame is
+    written as a full size JPEG and a small raw grayscale copy for
+    scoring.
+    """
+    width, height = SCORE_SIZE
+    command = ["ffmpeg", "-y"]
+    for time in times:
+        command += ["-ss", str(time), "-i", input_path]
+
+    filters = [
+        f"[{i}:v]split[p{i}][s{i}];"
+        f"[s{i}]scale={width}:{height},format=gray[g{i}]"
+        for i in range(len(times))
+    ]
+    command += ["-filter_complex", ";".join(filters)]
+
+    for i in range(len(times)):
+        jpg_path, gray_path = get_candidate_paths(work_dir, i)
+        command += ["-map", f"[p{i}]", "-frames:v", "1", "-q:v", "2", jpg_path]
+        command += [
+            "-map", f"[g{i}]", "-frames:v", "1",
+            "-f", "rawvideo", "-pix_fmt", "gray", gray_path,
+        ]
+    return command
+
+
+def measure_frame(pixels: bytes) -> dict:
+    """
+    Mean and standard deviation of the luma, and sharpness as the mean
+    absolute difference between neighbouring pixels.
+    """
+    width, height = SCORE_SIZE
+    count = len(pixels)
+    mean = sum(pixels) / count
+    deviation = (sum((p - mean) ** 2 for p in pixels) / count) ** 0.5
+
+    gradient = 0
+    for y in range(height - 1):
+        row = y * width
+        for x in range(width - 1):
+            value = pixels[row + x]
+            gradient += abs(value - pixels[row + x + 1])
+            gradient += abs(value - pixels[row + width + x])
+    sharpness = gradient / (2 * (width - 1) * (height - 1))
+
+    return {"mean": mean, "deviation": deviation, "sharpness": sharpness}
+
+
+def score_candidates(frames: list) -> list:
+    """
+    Score raw grayscale frames (SCORE_SIZE). Black, white and flat
+    frames score 0. The others score by sharpness and contrast, minus
+    their distance from the average candidate, which favours a frame
+    typical of the video over an outlier.
+    """
+    if not frames:
+        return []
+
+    count = len(frames[0])
+    average = [
+        sum(frame[i] for frame in frames) / len(frames) for i in range(count)
+    ]
+
+    scores = []
+    for frame in frames:
+        stats = measure_frame(frame)
+        if (
+            stats["mean"] < BLACK_LEVEL
+            or stats["mean"] > WHITE_LEVEL
+            or stats["deviation"] < FLAT_LEVEL
+        ):
+            scores.append(0.0)
+            continue
+        distance = sum(abs(p - a) for p, a in zip(frame, average)) / count
+        scores.append(max(
+            0.01, 2 * stats["sharpness"] + stats["deviation"] - distance / 2
+        ))
+    return scores
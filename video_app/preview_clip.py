@@ -0,0 +1,78 @@
+from django.conf import settings
+
+# Excerpts are taken between 10% and 90% of the video, like the poster
+# candidates, so intros and credits stay out of the loop.
+FIRST_EXCERPT = 0.1
+LAST_EXCERPT = 0.9
+
+CLIP_FPS = 24
+CLIP_PRESET = "veryfast"
+
+
+def get_clip_size(width: int, height: int) -> tuple:
+    short_side = settings.PREVIEW_CLIP_SHORT_SIDE
+    factor = min(1.0, short_side / min(width, height))
+    return (
+        max(2, round(width * factor / 2) * 2),
+        max(2, round(height * factor / 2) * 2),
+    )
+
+
+def get_excerpt_windows(duration: float) -> list:
+    """
+    (start, duration) of the excerpts that make up the clip, evenly
+    spread over the video. Videos shorter than the clip are used whole.
+    """
+    clip_duration = settings.PREVIEW_CLIP_DURATION
+    count = settings.PREVIEW_CLIP_EXCERPTS
+    if not duration or duration <= clip_duration:
+        return [(0.0, duration or clip_duration)]
+
+    length = round(clip_duration / count, 3)
+    span = duration * (LAST_EXCERPT - FIRST_EXCERPT) - length
+    step = span / (count - 1) if count > 1 else 0
+    return [
+        (round(duration * FIRST_EXCERPT + i * step, 3), length)
+        for i in range(count)
+    ]
+
+
+def build_preview_clip_command(
+    input_path: str, output_path: str, windows: list, clip_size: tuple
+) -> list:
+    """
+    Cut every excerpt with input seeking (-ss/-t before -i, so only the
+    excerpt itself is decoded), scale it down and concatenate the
+    excerpts into one silent, capped-bitrate MP4. faststart puts the
+    index in front so browsers can start the loop before the download
+    finished.
+    """
+    width, height = clip_size
+    bitrate = settings.PREVIEW_CLIP_BITRATE
+    command = ["ffmpeg", "-y"]
+    for start, duration in windows:
+        command += ["-ss", str(start), "-t", str(duration), "-i", input_path]
+
+    filters = [
+        f"[{i}:v]fps={CLIP_FPS},scale={width}:{height},setsar=1,"
+        f"setpts=PTS-STARTPTS[v{i}]"
+        for i in range(len(windows))
+    ]
+    inputs = "".join(f"[v{i}]" for i in range(len(windows)))
+    filters.append(f"{inputs}concat=n={len(windows)}:v=1:a=0[clip]")
+
+    return command + [
+        "-filter_complex", ";".join(filters),
+        "-map", "[clip]",
+        "-an",
+        "-c:v", "h264",
+        "-preset", CLIP_PRESET,
+        "-profile:v", "main",
+        "-pix_fmt", "yuv420p",
+        "-b:v", f"{bitrate}k",
+        "-maxrate", f"{bitrate}k",
+        "-bufsize", f"{bitrate * 2}k",
+        "-movflags", "+faststart",
+        "-f", "mp4",
+        output_path,
+    ]
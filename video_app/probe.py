@@ -0,0 +1,91 @@
+import json
+import subprocess
+
+
+def run_ffprobe(input_path: str) -> dict:
+    """
+    Run ffprobe on a media file and return its parsed JSON output.
+    """
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            "-print_format", "json",
+            "-show_format",
+            "-show_streams",
+            input_path,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"FFprobe failed: {input_path}\nError: {result.stderr.decode()}"
+        )
+
+    return json.loads(result.stdout.decode() or "{}")
+
+
+def parse_frame_rate(value: str) -> float:
+    """
+    Convert an ffprobe rate like '30000/1001' to frames per second.
+    """
+    try:
+        num, _, den = value.partition("/")
+        return round(float(num) / float(den or 1), 3)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def get_rotation(stream: dict) -> int:
+    """
+    Return the display rotation of a video stream in degrees.
+    Phones store it either as display matrix side data or as a tag.
+    """
+    for side_data in stream.get("side_data_list", []):
+        if "rotation" in side_data:
+            return int(side_data["rotation"])
+    return int(stream.get("tags", {}).get("rotate", 0))
+
+
+def first_stream(streams: list, codec_type: str) -> dict:
+    for stream in streams:
+        if stream.get("codec_type") == codec_type:
+            return stream
+    return {}
+
+
+def probe_video(input_path: str) -> dict:
+    """
+    Read resolution, frame rate, duration and codecs of a source file.
+
+    Width and height are the display size, i.e. after the rotation ffmpeg
+    applies automatically while decoding.
+    """
+    data = run_ffprobe(input_path)
+    streams = data.get("streams", [])
+    video = first_stream(streams, "video")
+    audio = first_stream(streams, "audio")
+
+    if not video:
+        raise RuntimeError(f"No video stream found: {input_path}")
+
+    width = int(video.get("width", 0))
+    height = int(video.get("height", 0))
+    if get_rotation(video) % 180 != 0:
+        width, height = height, width
+
+    try:
+        duration = float(data.get("format", {}).get("duration", 0))
+    except ValueError:
+        duration = 0.0
+
+    return {
+        "width": width,
+        "height": height,
+        "frame_rate": parse_frame_rate(video.get("avg_frame_rate", "")),
+        "duration": duration,
+        "video_codec": video.get("codec_name", ""),
+        "audio_codec": audio.get("codec_name", ""),
+    }
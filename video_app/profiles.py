@@ -0,0 +1,142 @@
+from django.conf import settings
+
+# Named x264 settings. `crf` gives constant quality; `bitrate` (kbit/s)
+# alone gives average bitrate, together with `crf` it caps the quality
+# mode. `gop` is the keyframe interval in seconds, `threads` 0 lets x264
+# decide. `renditions` overrides single values per rendition name.
+ENCODING_PROFILES = {
+    "ultrafast": {
+        "preset": "ultrafast",
+        "crf": 23,
+        "gop": 2,
+        "threads": 0,
+    },
+    "fast": {
+        "preset": "veryfast",
+        "crf": 23,
+        "gop": 2,
+        "threads": 0,
+    },
+    "balanced": {
+        "preset": "medium",
+        "crf": 23,
+        "gop": 2,
+        "threads": 0,
+    },
+    "quality": {
+        "preset": "slow",
+        "crf": 20,
+        "gop": 2,
+        "threads": 0,
+        "renditions": {
+            "480p": {"crf": 22},
+        },
+    },
+    "efficient": {
+        "preset": "slower",
+        "crf": 23,
+        "gop": 2,
+        "threads": 0,
+    },
+    "capped": {
+        "preset": "medium",
+        "crf": 23,
+        "gop": 2,
+        "threads": 0,
+        "renditions": {
+            "480p": {"bitrate": 1400},
+            "720p": {"bitrate": 2800},
+            "1080p": {"bitrate": 5000},
+        },
+    },
+}
+
+
+def profile_choices() -> list:
+    return [(name, name) for name in ENCODING_PROFILES]
+
+
+def get_profile(name: str = None) -> dict:
+    """
+    Return an encoding profile by name; an empty name selects
+    HLS_ENCODING_PROFILE.
+    """
+    name = name or settings.HLS_ENCODING_PROFILE
+    try:
+        return ENCODING_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown encoding profile: {name}")
+
+
+def resolve_profile_name(name: str = None) -> str:
+    return name or settings.HLS_ENCODING_PROFILE
+
+
+def get_first_pass_profile(name: str = None) -> str:
+    """
+    Profile for the first encode of a video with profile `name`. With
+    two-tier encoding (HLS_FIRST_PASS_PROFILE set) that is a fast
+    profile, and reencode_video replaces the output later.
+    """
+    return settings.HLS_FIRST_PASS_PROFILE or resolve_profile_name(name)
+
+
+def resolve_rendition_options(
+    profile: dict, res_name: str, overrides: dict = None
+) -> dict:
+    """
+    Options of one rendition: profile defaults, the profile's values for
+    the rendition, then per-title `overrides` (name -> crf/bitrate).
+    """
+    options = {k: v for k, v in profile.items() if k != "renditions"}
+    options.update(profile.get("renditions", {}).get(res_name, {}))
+    options.update((overrides or {}).get(res_name, {}))
+    return options
+
+
+def build_x264_args(options: dict, specifier: str = "") -> list:
+    """
+    Translate resolved profile options into ffmpeg arguments. With a
+    stream specifier like ':v:1' they apply to one output stream only.
+    """
+    args = [f"-c{specifier}", "h264", f"-preset{specifier}", options["preset"]]
+
+    bitrate = options.get("bitrate")
+    if "crf" in options:
+        args += [f"-crf{specifier}", str(options["crf"])]
+    elif bitrate:
+        args += [f"-b{specifier}", f"{bitrate}k"]
+    if bitrate:
+        args += [
+            f"-maxrate{specifier}", f"{bitrate}k",
+            f"-bufsize{specifier}", f"{bitrate * 2}k",
+        ]
+
+    # keyframes on a fixed time grid keep segment boundaries aligned
+    # across renditions
+    args += [
+        f"-force_key_frames{specifier}",
+        f"expr:gte(t,n_forced*{options['gop']})",
+        f"-threads{specifier}", str(options["threads"]),
+    ]
+    return args
+
+
+def build_rendition_codec_args(
+    names: list, profile_name: str = None, threads: int = None,
+    overrides: dict = None,
+) -> list:
+    """
+    Per-stream video codec arguments for a multi-rendition output whose
+    video streams are mapped in the order of `names`. A thread budget
+    (from the CPU scheduler) is shared between the encoders and replaces
+    the profile's thread count.
+    """
+    profile = get_profile(profile_name)
+    args = []
+    for i, res_name in enumerate(names):
+        options = resolve_rendition_options(profile, res_name, overrides)
+        if threads:
+            options["threads"] = max(1, threads // len(names))
+        args += build_x264_args(options, f":v:{i}")
+    return args
@@ -0,0 +1,118 @@
+import time
+from django.core.cache import cache
+
+STATUS_TIMEOUT = 60 * 60 * 24
+REPORT_INTERVAL = 1.0
+
+
+def status_key(video_id: int) -> str:
+    return f"video-status-{video_id}"
+
+
+def progress_key(video_id: int, part: str) -> str:
+    return f"video-progress-{video_id}-{part}"
+
+
+def set_status(video_id: int, status: str, **fields) -> None:
+    """
+    Store the processing state of a video (queued, processing, ready,
+    failed). `parts` lists the ffmpeg runs whose progress is aggregated
+    into the percent value of the status endpoint.
+    """
+    record = {"status": status, "updated_at": time.time(), **fields}
+    cache.set(status_key(video_id), record, STATUS_TIMEOUT)
+
+
+def set_status_many(video_ids: list, status: str, **fields) -> None:
+    """
+    set_status for many videos in one cache round trip.
+    """
+    record = {"status": status, "updated_at": time.time(), **fields}
+    cache.set_many(
+        {status_key(video_id): record for video_id in video_ids},
+        STATUS_TIMEOUT,
+    )
+
+
+def get_status(video_id: int) -> dict | None:
+    """
+    Return the status record of a video merged with the progress of all
+    its running parts, or None if nothing was reported.
+    """
+    record = cache.get(status_key(video_id))
+    if record is None:
+        return None
+
+    parts = record.pop("parts", [])
+    if not parts:
+        return record
+
+    progress = cache.get_many([progress_key(video_id, p) for p in parts])
+    running = list(progress.values())
+
+    record["percent"] = round(
+        sum(p["percent"] for p in running) / len(parts), 1
+    )
+    record["fps"] = round(sum(p["fps"] for p in running), 1)
+    etas = [p["eta"] for p in running if p["eta"] is not None]
+    record["eta"] = max(etas) if len(running) == len(parts) and etas else None
+    return record
+
+
+def parse_speed(value: str) -> float:
+    """
+    Convert an ffmpeg speed value like '2.35x' to a float (0 if unknown).
+    """
+    try:
+        return float(value.rstrip("x"))
+    except ValueError:
+        return 0.0
+
+
+class ProgressReporter:
+    """
+    Callback for run_ffmpeg_command: turns ffmpeg -progress blocks into
+    percent, fps and ETA and stores them in the cache (Redis), at most
+    once per REPORT_INTERVAL seconds.
+    """
+
+    def __init__(self, video_id: int, part: str, duration: float):
+        self.key = progress_key(video_id, part)
+        self.duration = duration
+        self.out_time = 0.0
+        self.last_report = 0.0
+
+    def __call__(self, values: dict) -> None:
+        finished = values.get("progress") == "end"
+        now = time.monotonic()
+        if not finished and now - self.last_report < REPORT_INTERVAL:
+            return
+        self.last_report = now
+
+        cache.set(self.key, self.build_record(values, finished), STATUS_TIMEOUT)
+
+    def build_record(self, values: dict, finished: bool) -> dict:
+        # ffmpeg reports out_time_us=N/A while flushing; keep the last value
+        try:
+            self.out_time = max(int(values["out_time_us"]), 0) / 1_000_000
+        except (KeyError, ValueError):
+            pass
+        out_time = self.out_time
+        try:
+            fps = float(values.get("fps", 0))
+        except ValueError:
+            fps = 0.0
+
+        if finished or not self.duration:
+            percent = 100.0 if finished else 0.0
+        else:
+            percent = min(out_time / self.duration * 100, 100.0)
+
+        speed = parse_speed(values.get("speed", ""))
+        eta = None
+        if finished:
+            eta = 0
+        elif speed > 0 and self.duration:
+            eta = round(max(self.duration - out_time, 0) / speed)
+
+        return {"percent": round(percent, 1), "fps": fps, "eta": eta}
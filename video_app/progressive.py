@@ -0,0 +1,103 @@
+import os
+import shutil
+from video_app.playlists import (
+    MEDIA_PLAYLIST,
+    read_segments,
+    write_master_playlist,
+)
+from video_app.storage import get_preview_dir, publish_preview_dir
+
+
+class ProgressivePublisher:
+    """
+    Callback for run_ffmpeg_command that makes a video playable while
+    it is encoded.
+
+    On every progress block, the segments ffmpeg finished for the lowest
+    rendition (and the audio) are copied from scratch into the preview
+    version of the content, followed by their EVENT playlists. As soon
+    as every rendition has a segment, a master playlist with just these
+    renditions is written and the preview is published; `on_playable`
+    is called once then. Players keep reloading the EVENT playlists
+    until the complete output replaces the preview, with EXT-X-ENDLIST.
+
+    Copy errors stop the preview, never the encode; they are kept in
+    `error`. A master playlist that cannot be written yet (ffprobe
+    reading a segment ffmpeg is still writing) is retried on the next
+    progress block.
+    """
+
+    def __init__(
+        self,
+        content_hash: str,
+        output_dir: str,
+        rendition: str,
+        audio_name: str = None,
+        on_playable=None,
+    ):
+        self.content_hash = content_hash
+        self.output_dir = output_dir
+        self.preview_dir = get_preview_dir(content_hash)
+        self.rendition = rendition
+        self.audio_name = audio_name
+        self.names = [rendition] + ([audio_name] if audio_name else [])
+        self.on_playable = on_playable
+        self.copied = set()
+        self.published = False
+        self.error = None
+
+    def __call__(self, values: dict) -> None:
+        if self.error is not None:
+            return
+        try:
+            self.sync()
+        except OSError as exc:
+            self.error = exc
+        except (RuntimeError, ValueError, KeyError) as exc:
+            print(f"[PREVIEW] Master playlist not written yet: {exc}", flush=True)
+
+    def sync(self) -> None:
+        staged = {}
+        for name in self.names:
+            playlist_path = os.path.join(self.output_dir, name, MEDIA_PLAYLIST)
+            if not os.path.exists(playlist_path):
+                return
+            # a snapshot, so the playlist cannot list segments not copied
+            os.makedirs(os.path.join(self.preview_dir, name), exist_ok=True)
+            snapshot_path = os.path.join(
+                self.preview_dir, name, f"{MEDIA_PLAYLIST}.next"
+            )
+            shutil.copyfile(playlist_path, snapshot_path)
+            staged[name] = snapshot_path
+
+        segments = {name: read_segments(path) for name, path in staged.items()}
+        if not self.published and not all(segments.values()):
+            return
+
+        for name, snapshot_path in staged.items():
+            for segment in segments[name]:
+                self.copy_segment(name, segment["uri"])
+            os.replace(
+                snapshot_path,
+                os.path.join(self.preview_dir, name, MEDIA_PLAYLIST),
+            )
+
+        if not self.published:
+            write_master_playlist(
+                self.preview_dir, [self.rendition], self.audio_name
+            )
+            publish_preview_dir(self.content_hash)
+            self.published = True
+            if self.on_playable:
+                self.on_playable()
+
+    def copy_segment(self, name: str, uri: str) -> None:
+        rel_path = os.path.join(name, uri)
+        if rel_path in self.copied:
+            return
+
+        target = os.path.join(self.preview_dir, rel_path)
+        tmp_target = f"{target}.tmp"
+        shutil.copyfile(os.path.join(self.output_dir, rel_path), tmp_target)
+        os.replace(tmp_target, target)
+        self.copied.add(rel_path)
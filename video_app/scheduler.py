@@ -0,0 +1,170 @@
+import contextlib
+import math
+import os
+import threading
+import time
+import uuid
+import django_rq
+from django.conf import settings
+
+LEASE_TTL = 60
+POLL_INTERVAL = 2.0
+
+
+def read_cgroup_quota() -> float | None:
+    """
+    CPU limit of the container in cores, from cgroup v2 cpu.max or the
+    cgroup v1 CFS quota. None if the cgroup is unlimited.
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 else None
+
+
+def get_cpu_budget() -> int:
+    """
+    Number of ffmpeg threads the node can run at once: FFMPEG_CPU_BUDGET
+    if set, otherwise the usable cores capped by the cgroup CPU limit.
+    """
+    if settings.FFMPEG_CPU_BUDGET:
+        return settings.FFMPEG_CPU_BUDGET
+
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    quota = read_cgroup_quota()
+    if quota:
+        cpus = min(cpus, max(1, math.floor(quota)))
+    return cpus
+
+
+class CpuSlotLease:
+    """
+    A share of the node's CPU budget, held in Redis.
+
+    Leases live in a hash (lease id -> slots) next to a sorted set of
+    expiry times. A background thread renews the expiry while the lease
+    is held, so the slots of a killed worker are freed after LEASE_TTL.
+    """
+
+    def __init__(self, slots: int, budget: int):
+        self.slots = slots
+        self.budget = budget
+        self.lease_id = uuid.uuid4().hex
+        self.connection = django_rq.get_connection("high")
+
+        node = settings.FFMPEG_SCHEDULER_NODE
+        self.leases_key = f"videoflix:cpu-slots:{node}"
+        self.expiry_key = f"videoflix:cpu-slots-expiry:{node}"
+        self.lock_key = f"videoflix:cpu-slots-lock:{node}"
+
+        self.stopped = threading.Event()
+        self.renewer = threading.Thread(target=self.renew, daemon=True)
+
+    def try_acquire(self) -> bool:
+        with self.connection.lock(self.lock_key, timeout=10):
+            now = time.time()
+            expired = self.connection.zrangebyscore(self.expiry_key, "-inf", now)
+            if expired:
+                self.connection.hdel(self.leases_key, *expired)
+                self.connection.zrem(self.expiry_key, *expired)
+
+            used = sum(
+                int(v) for v in self.connection.hvals(self.leases_key)
+            )
+            if used + self.slots > self.budget:
+                return False
+
+            self.connection.hset(self.leases_key, self.lease_id, self.slots)
+            self.connection.zadd(
+                self.expiry_key, {self.lease_id: now + LEASE_TTL}
+            )
+            return True
+
+    def acquire(self, on_wait=None) -> None:
+        waiting = False
+        while not self.try_acquire():
+            if not waiting and on_wait:
+                on_wait()
+            waiting = True
+            time.sleep(POLL_INTERVAL)
+        self.renewer.start()
+
+    def renew(self) -> None:
+        while not self.stopped.wait(LEASE_TTL / 3):
+            self.connection.zadd(
+                self.expiry_key,
+                {self.lease_id: time.time() + LEASE_TTL},
+                xx=True,
+            )
+
+    def drop(self) -> None:
+        self.connection.hdel(self.leases_key, self.lease_id)
+        self.connection.zrem(self.expiry_key, self.lease_id)
+
+    def release(self) -> None:
+        self.stopped.set()
+        self.drop()
+
+    @contextlib.contextmanager
+    def paused(self):
+        """
+        Give the slots back while the block runs, e.g. while ffmpeg waits
+        for input, and take them again afterwards. The renewer keeps
+        running; it only extends leases that exist.
+        """
+        self.drop()
+        try:
+            yield
+        finally:
+            while not self.stopped.is_set() and not self.try_acquire():
+                time.sleep(POLL_INTERVAL)
+
+
+@contextlib.contextmanager
+def cpu_slot_lease(on_wait=None):
+    """
+    Like cpu_slots, but yields the held CpuSlotLease (or None), for
+    encodes that pause it while they are idle.
+    """
+    if not settings.FFMPEG_SLOTS_PER_JOB:
+        yield None
+        return
+
+    budget = get_cpu_budget()
+    lease = CpuSlotLease(min(settings.FFMPEG_SLOTS_PER_JOB, budget), budget)
+    lease.acquire(on_wait)
+    try:
+        yield lease
+    finally:
+        lease.release()
+
+
+@contextlib.contextmanager
+def cpu_slots(on_wait=None):
+    """
+    Hold FFMPEG_SLOTS_PER_JOB threads of the node's CPU budget while the
+    block runs and yield the thread count the encode should use. Blocks
+    (calling on_wait once) until enough slots are free, so concurrent
+    encodes share the CPU instead of oversubscribing it.
+
+    Yields None without touching Redis if FFMPEG_SLOTS_PER_JOB is 0.
+    """
+    with cpu_slot_lease(on_wait) as lease:
+        yield lease.slots if lease else None
@@ -1,31 +1,60 @@
 import os
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.conf import settings
 import django_rq
 from video_app.models import Video
+from video_app.progress import set_status
+
+
+@receiver(pre_save, sender=Video)
+def remember_video_file(sender, instance, update_fields=None, **kwargs):
+    """
+    Merkt sich die bisherige Quelldatei, damit post_save einen Wechsel
+    erkennt.
+    """
+    if update_fields is not None and "video_file" not in update_fields:
+        # the worker's metadata updates cannot change the file
+        instance._previous_video_file = instance.video_file.name
+        return
+
+    instance._previous_video_file = (
+        Video.objects.filter(pk=instance.pk)
+        .values_list("video_file", flat=True)
+        .first()
+        if instance.pk else None
+    )
 
 
 @receiver(post_save, sender=Video)
 def handle_video_upload(sender, instance, created, **kwargs):
     """
-    Startet HLS-Konvertierung NUR wenn das Video NEU erstellt wurde.
+    Startet HLS-Konvertierung, wenn das Video NEU erstellt oder seine
+    Quelldatei ausgetauscht wurde.
     """
 
     if not instance.video_file:
         return
 
-    if not created:
+    file_path = instance.video_file.name
+    previous_file = getattr(instance, "_previous_video_file", None)
+
+    if not created and file_path == previous_file:
         return
 
-    file_path = instance.video_file.name
     abs_path = os.path.join(settings.MEDIA_ROOT, file_path)
 
     if not os.path.exists(abs_path):
         return
 
-    queue = django_rq.get_queue("default")
-    queue.enqueue("video_app.tasks.convert_video_to_hls",
-                  instance.id, file_path)
+    if not created:
+        # new content: the per-title ladder of the old file does not apply
+        Video.objects.filter(id=instance.id).update(encoding_ladder=None)
+
+    queue = django_rq.get_queue("high")
+    queue.enqueue("video_app.tasks.ingest_video",
+                  instance.id, file_path, job_id=f"ingest-{instance.id}",
+                  job_timeout=settings.VIDEO_INGEST_TIMEOUT)
+    set_status(instance.id, "queued")
 
     print(f"[SIGNAL] Queued HLS job for video ID {instance.id}")
@@ -0,0 +1,363 @@
+import hashlib
+import os
+import re
+import shutil
+import time
+import uuid
+from django.conf import settings
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Marks a published version that is still being encoded.
+PARTIAL_MARKER = ".partial"
+
+# Name of the encoding profile an output was encoded with.
+PROFILE_FILE = ".profile"
+
+# Replaced versions wait here for HLS_VERSION_GRACE_PERIOD seconds.
+RETIRED_DIR = ".retired"
+
+# Single-file fMP4 references in playlists and the DASH manifest, with
+# the version query publish_output_dir adds.
+MEDIA_FILE_URI = re.compile(r"media\.mp4(?:\?v=[0-9a-f]+)?")
+
+
+def hash_file(path: str) -> str:
+    """
+    Return the SHA-256 hex digest of a file, read in 1 MiB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def get_hls_root() -> str:
+    return os.path.join(settings.MEDIA_ROOT, "hls")
+
+
+def get_video_hls_dir(video_id: int) -> str:
+    """
+    Served location of a video: MEDIA_ROOT/hls/<id>. It is a symlink
+    into the content store, so identical uploads share one encode.
+    """
+    return os.path.join(get_hls_root(), str(video_id))
+
+
+def get_store_root() -> str:
+    return os.path.join(get_hls_root(), "store")
+
+
+def get_content_dir(content_hash: str) -> str:
+    """
+    Encoded HLS output of one source file: MEDIA_ROOT/hls/store/<hash>,
+    a symlink to the currently published version of the output.
+    """
+    return os.path.join(get_store_root(), content_hash)
+
+
+def get_scratch_dir(content_hash: str) -> str:
+    """
+    Staging directory on fast local storage (HLS_SCRATCH_ROOT) where a
+    transcode writes its output before it is published.
+    """
+    return os.path.join(settings.HLS_SCRATCH_ROOT, content_hash)
+
+
+def get_work_dir(content_hash: str) -> str:
+    """
+    Shared scratch space for split transcoding. It lives below
+    MEDIA_ROOT so every worker mounting the media volume can reach it.
+    """
+    return os.path.join(settings.MEDIA_ROOT, "hls_work", content_hash)
+
+
+def get_thumbnail_path(content_hash: str) -> str:
+    """
+    Thumbnail path relative to MEDIA_ROOT.
+    """
+    return f"thumbnails/{content_hash}.jpg"
+
+
+def has_thumbnail(content_hash: str) -> bool:
+    return os.path.exists(
+        os.path.join(settings.MEDIA_ROOT, get_thumbnail_path(content_hash))
+    )
+
+
+def get_preview_clip_path(content_hash: str) -> str:
+    """
+    Hover preview clip path relative to MEDIA_ROOT.
+    """
+    return f"previews/{content_hash}.mp4"
+
+
+def has_preview_clip(content_hash: str) -> bool:
+    return os.path.exists(
+        os.path.join(settings.MEDIA_ROOT, get_preview_clip_path(content_hash))
+    )
+
+
+def has_content_output(content_hash: str) -> bool:
+    """
+    True once a complete encode (master playlist) exists for the content.
+    A progressive preview of a running encode does not count.
+    """
+    content_dir = get_content_dir(content_hash)
+    return (
+        os.path.exists(os.path.join(content_dir, "master.m3u8"))
+        and not os.path.exists(os.path.join(content_dir, PARTIAL_MARKER))
+    )
+
+
+def get_preview_dir(content_hash: str) -> str:
+    """
+    Version directory that a running encode publishes progressively;
+    publish_output_dir replaces (and removes) it with the full output.
+    """
+    return os.path.join(get_store_root(), "versions", f"{content_hash}.partial")
+
+
+def has_rendition(content_hash: str, name: str) -> bool:
+    return os.path.exists(
+        os.path.join(get_content_dir(content_hash), name, "index.m3u8")
+    )
+
+
+def write_output_profile(output_dir: str, profile_name: str) -> None:
+    # replaced, not rewritten: it may be linked into a published version
+    path = os.path.join(output_dir, PROFILE_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        f.write(profile_name)
+    os.replace(f"{path}.tmp", path)
+
+
+def get_output_profile(content_hash: str) -> str | None:
+    """
+    Profile of the published output, None for outputs of releases
+    before two-tier encoding.
+    """
+    try:
+        with open(os.path.join(get_content_dir(content_hash), PROFILE_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def replace_symlink(link_path: str, target: str) -> None:
+    """
+    Create or retarget a symlink with a single atomic rename.
+    """
+    tmp_link = f"{link_path}.tmp"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link_path)
+
+
+def tag_media_uris(output_dir: str, version_id: str) -> None:
+    """
+    Point the single-file fMP4 references of an output at its version
+    (media.mp4?v=<id>), so a player that loaded these playlists keeps
+    reading the same bytes after a re-encode replaced the output.
+    Files are replaced, not rewritten: they may be hard links into the
+    previous version.
+    """
+    paths = [os.path.join(output_dir, "manifest.mpd")] + [
+        os.path.join(output_dir, name, "index.m3u8")
+        for name in os.listdir(output_dir)
+    ]
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        with open(path) as f:
+            text = f.read()
+        tagged = MEDIA_FILE_URI.sub(f"media.mp4?v={version_id}", text)
+        if tagged != text:
+            with open(f"{path}.tmp", "w") as f:
+                f.write(tagged)
+            os.replace(f"{path}.tmp", path)
+
+
+def find_media_version(video_id: int, version_id: str) -> str | None:
+    """
+    Version directory `version_id` of the content a video is linked to,
+    current or retired. None once it was removed.
+    """
+    current = os.path.basename(os.path.realpath(get_video_hls_dir(video_id)))
+    name = f"{current.rsplit('.', 1)[0]}.{version_id}"
+    versions_dir = os.path.join(get_store_root(), "versions")
+    for path in (
+        os.path.join(versions_dir, name),
+        os.path.join(versions_dir, RETIRED_DIR, name),
+    ):
+        if os.path.isdir(path):
+            return path
+    return None
+
+
+def retire_version(version_dir: str) -> None:
+    """
+    Keep a replaced version for HLS_VERSION_GRACE_PERIOD seconds, for
+    players still reading it, and remove the versions whose grace
+    period is over.
+    """
+    retired_dir = os.path.join(get_store_root(), "versions", RETIRED_DIR)
+    os.makedirs(retired_dir, exist_ok=True)
+    if version_dir:
+        target = os.path.join(retired_dir, os.path.basename(version_dir))
+        os.rename(version_dir, target)
+        os.utime(target)
+
+    expired = time.time() - settings.HLS_VERSION_GRACE_PERIOD
+    for entry in os.scandir(retired_dir):
+        if entry.stat(follow_symlinks=False).st_mtime < expired:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def publish_output_dir(staging_dir: str, content_hash: str) -> None:
+    """
+    Move a finished output tree into the store and make it the served
+    version of the content.
+
+    The tree is first moved (or, across filesystems, copied) to
+    hls/store/versions/<hash>.<id>. Switching hls/store/<hash> to it is
+    one atomic rename, so readers see either the old or the new tree,
+    never a partial one. The replaced version is retired, not removed:
+    its single-file fMP4 media stays reachable for the grace period.
+    A preview is removed right away; its MPEG-TS segments keep their
+    names in the full output.
+    """
+    versions_dir = os.path.join(get_store_root(), "versions")
+    os.makedirs(versions_dir, exist_ok=True)
+
+    version_id = uuid.uuid4().hex[:12]
+    version = f"{content_hash}.{version_id}"
+    version_dir = os.path.join(versions_dir, version)
+    tag_media_uris(staging_dir, version_id)
+
+    if os.stat(staging_dir).st_dev == os.stat(versions_dir).st_dev:
+        os.rename(staging_dir, version_dir)
+    else:
+        incoming_dir = os.path.join(versions_dir, f".incoming-{version}")
+        shutil.copytree(staging_dir, incoming_dir)
+        os.rename(incoming_dir, version_dir)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    content_dir = get_content_dir(content_hash)
+    old_version_dir = None
+    if os.path.islink(content_dir):
+        old_version_dir = os.path.realpath(content_dir)
+    elif os.path.isdir(content_dir):
+        # unversioned output of an older release
+        old_version_dir = os.path.join(versions_dir, f".legacy-{version}")
+        os.rename(content_dir, old_version_dir)
+
+    replace_symlink(content_dir, os.path.join("versions", version))
+
+    if old_version_dir == os.path.realpath(get_preview_dir(content_hash)):
+        shutil.rmtree(old_version_dir, ignore_errors=True)
+        old_version_dir = None
+    retire_version(old_version_dir)
+
+
+def copy_published_output(content_hash: str) -> str:
+    """
+    Stage a copy of the published output of a content for changes that
+    publish_output_dir swaps in afterwards. The copy is made of hard
+    links next to the versions, so it costs no disk space and can be
+    moved into place with a rename.
+    """
+    versions_dir = os.path.join(get_store_root(), "versions")
+    staging_dir = os.path.join(
+        versions_dir, f".incoming-{content_hash}.{uuid.uuid4().hex[:12]}"
+    )
+    shutil.copytree(
+        os.path.realpath(get_content_dir(content_hash)),
+        staging_dir,
+        copy_function=os.link,
+    )
+    return staging_dir
+
+
+def publish_preview_dir(content_hash: str) -> None:
+    """
+    Serve the preview of a running encode, unless finished output is
+    published already.
+    """
+    if has_content_output(content_hash):
+        return
+    open(os.path.join(get_preview_dir(content_hash), PARTIAL_MARKER), "w").close()
+    replace_symlink(
+        get_content_dir(content_hash),
+        os.path.join("versions", os.path.basename(get_preview_dir(content_hash))),
+    )
+
+
+def unpublish_preview_dir(content_hash: str) -> bool:
+    """
+    Remove the preview of an encode that failed for good. Returns True
+    if hls/store/<hash> served it; that link is removed as well.
+    """
+    content_dir = get_content_dir(content_hash)
+    preview_dir = get_preview_dir(content_hash)
+    served = os.path.realpath(content_dir) == os.path.realpath(preview_dir)
+    if served:
+        os.remove(content_dir)
+    shutil.rmtree(preview_dir, ignore_errors=True)
+    return served
+
+
+def publish_file(source_path: str, rel_path: str) -> None:
+    """
+    Copy a single finished file below MEDIA_ROOT and swap it in with an
+    atomic rename.
+    """
+    target = os.path.join(settings.MEDIA_ROOT, rel_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    tmp_target = f"{target}.tmp"
+    shutil.copyfile(source_path, tmp_target)
+    os.replace(tmp_target, target)
+
+
+def link_video_output(video_id: int, content_hash: str) -> None:
+    """
+    Point MEDIA_ROOT/hls/<id> at the content store. The symlink is
+    swapped in with os.replace, so readers never see a missing path.
+    """
+    link_path = get_video_hls_dir(video_id)
+    target = os.path.relpath(get_content_dir(content_hash), get_hls_root())
+
+    if os.path.isdir(link_path) and not os.path.islink(link_path):
+        # output of a pre-dedup encode
+        shutil.rmtree(link_path)
+
+    replace_symlink(link_path, target)
+
+
+def get_checkpoint_path(base_dir: str, stage: str) -> str:
+    return os.path.join(base_dir, ".checkpoints", stage)
+
+
+def is_done(base_dir: str, stage: str) -> bool:
+    """
+    True if `stage` (a rendition, the thumbnail, a chunk, ...) finished
+    in an earlier run of the same content.
+    """
+    return os.path.exists(get_checkpoint_path(base_dir, stage))
+
+
+def mark_done(base_dir: str, stage: str) -> None:
+    path = get_checkpoint_path(base_dir, stage)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "w").close()
@@ -1,100 +1,1871 @@
+import functools
+import hashlib
 import os
+import shutil
 import subprocess
+import tempfile
+import threading
+from collections import deque
+import django_rq
+from rq import Callback, Retry, get_current_job
+from rq.job import Job
 from django.conf import settings
 from django.core.files.storage import default_storage
-from video_app.models import Video
+from django.utils import timezone
+from video_app.complexity import (
+    build_analysis_command,
+    build_title_ladder,
+    get_proxy_size,
+    get_sample_windows,
+)
+from video_app.jobstats import (
+    measure_outputs,
+    record_child_usage,
+    track_stage,
+)
+from video_app.models import RenditionUsage, Video, VideoUpload
+from video_app.playlists import write_dash_manifest, write_master_playlist
+from video_app.poster import (
+    build_poster_command,
+    get_candidate_paths,
+    get_candidate_times,
+    score_candidates,
+)
+from video_app.preview_clip import (
+    build_preview_clip_command,
+    get_clip_size,
+    get_excerpt_windows,
+)
+from video_app.probe import probe_video
+from video_app.profiles import (
+    build_rendition_codec_args,
+    build_x264_args,
+    get_first_pass_profile,
+    get_profile,
+    resolve_profile_name,
+    resolve_rendition_options,
+)
+from video_app.progress import ProgressReporter, set_status
+from video_app.progressive import ProgressivePublisher
+from video_app.scheduler import cpu_slot_lease, cpu_slots
+from video_app.storage import (
+    copy_published_output,
+    get_output_profile,
+    get_scratch_dir,
+    get_preview_clip_path,
+    get_thumbnail_path,
+    get_video_hls_dir,
+    get_work_dir,
+    has_content_output,
+    has_preview_clip,
+    has_rendition,
+    has_thumbnail,
+    hash_file,
+    is_done,
+    link_video_output,
+    mark_done,
+    publish_file,
+    publish_output_dir,
+    unpublish_preview_dir,
+    write_output_profile,
+)
+from video_app.uploads import (
+    follow_upload,
+    get_upload_path,
+    is_streamable,
+    wait_for_bytes,
+)
+from video_app.trickplay import (
+    TRICKPLAY_DIR,
+    build_trickplay_filter,
+    build_trickplay_output_args,
+    write_trickplay_track,
+)
+
+# Rendition name -> short side in pixels.
+RESOLUTIONS = {
+    "480p": 480,
+    "720p": 720,
+    "1080p": 1080,
+}
+
+AUDIO_RENDITION = "audio"
+
+STDERR_TAIL_LINES = 50
+
+ACTIVE_JOB_STATUSES = ("queued", "started", "deferred", "scheduled")
+
+CHUNK_LIST = "chunks.csv"
+
+# Posters (and ingest, which triggers them) run ahead of every encode.
+POSTER_QUEUE = "high"
+ENCODE_QUEUES = ("short", "long")
+
+# Re-encodes of two-tier encoding; workers take them when idle.
+REENCODE_QUEUE = "low"
+REENCODE_TIMEOUT_FACTOR = 4
+
+# Bulk re-transcodes: video ids waiting for a slot, and the ids of their
+# queued or running jobs (on the REENCODE_QUEUE).
+RETRANSCODE_BACKLOG_KEY = "videoflix:retranscode:backlog"
+RETRANSCODE_IN_FLIGHT_KEY = "videoflix:retranscode:in-flight"
+
+# Bytes of a growing upload needed to detect its container and probe it.
+PIPE_PROBE_BYTES = 8 * 1024 * 1024
+
+SPRITE_PREFIX = "sprite"
+
+FMP4_MEDIA_FILE = "media.mp4"
 
 
 def debug(msg: str):
     print(f"[TASK DEBUG] {msg}", flush=True)
 
 
-def run_ffmpeg_command(command: list) -> None:
+def feed_stdin(process, blocks, errors: list) -> None:
+    """
+    Write `blocks` (an iterable of bytes) to ffmpeg's stdin and close it.
+    An exception of the producer is kept in `errors` for the caller.
+    """
+    try:
+        for block in blocks:
+            process.stdin.buffer.write(block)
+    except BrokenPipeError:
+        pass  # ffmpeg exited; its return code tells why
+    except Exception as exc:
+        errors.append(exc)
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def run_ffmpeg_command(
+    command: list, on_progress=None, stdin_blocks=None
+) -> None:
+    """
+    Run ffmpeg with -progress on stdout and read it line by line.
+
+    Every completed progress block is passed to `on_progress`. Only the
+    last STDERR_TAIL_LINES lines of the ffmpeg log are kept in memory
+    for the error report. With `stdin_blocks`, a thread streams those
+    bytes to ffmpeg's stdin (input "pipe:0").
+    """
+    command = [command[0], "-nostats", "-progress", "pipe:1", *command[1:]]
     debug(f"Running ffmpeg: {' '.join(command)}")
 
-    result = subprocess.run(
-        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE if stdin_blocks is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
     )
 
-    if result.returncode != 0:
-        error_text = result.stderr.decode()
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stderr_reader = threading.Thread(
+        target=stderr_tail.extend, args=(process.stderr,), daemon=True
+    )
+    stderr_reader.start()
+
+    stdin_errors = []
+    if stdin_blocks is not None:
+        threading.Thread(
+            target=feed_stdin,
+            args=(process, stdin_blocks, stdin_errors),
+            daemon=True,
+        ).start()
+
+    try:
+        values = {}
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            values[key] = value
+            if key == "progress":
+                if on_progress:
+                    on_progress(values)
+                values = {}
+
+        # wait4 instead of wait: the rusage of this process feeds the
+        # stage statistics (peak RSS)
+        _, wait_status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(wait_status)
+    except BaseException:
+        # Like subprocess.run: a failing callback or the job timeout
+        # must not leave ffmpeg running after its CPU slots are released
+        process.kill()
+        process.wait()
+        raise
+    record_child_usage(usage)
+    stderr_reader.join()
+
+    if stdin_errors:
+        raise stdin_errors[0]
+    if process.returncode != 0:
+        error_text = "".join(stderr_tail)
         debug(f"FFmpeg ERROR: {error_text}")
         raise RuntimeError(
             f"FFmpeg failed: {' '.join(command)}\nError: {error_text}"
         )
 
 
-def generate_thumbnail(video_id: int, input_path: str) -> str:
-    debug(f"Generating thumbnail for video {video_id}")
+def report_failures(job):
+    """
+    Mark the video as failed in the status record when a job raises.
+    The wrapped job must take the video id as first argument.
+    """
+    @functools.wraps(job)
+    def wrapper(video_id: int, *args, **kwargs):
+        try:
+            return job(video_id, *args, **kwargs)
+        except Exception as exc:
+            set_status(video_id, "failed", error=str(exc)[-1000:])
+            raise
+
+    return wrapper
 
-    thumbnail_rel = f"thumbnails/{video_id}.jpg"
-    thumbnail_abs = os.path.join(settings.MEDIA_ROOT, thumbnail_rel)
+
+def generate_thumbnail(
+    input_path: str, thumbnail_abs: str, duration: float = None
+) -> str:
+    """
+    Pick the poster among frames spread over the whole video: all
+    candidates are grabbed with input seeking in one ffmpeg run, then
+    black, flat and blurry frames lose against sharp, typical ones.
+    """
+    debug(f"Generating thumbnail for {input_path}")
 
     os.makedirs(os.path.dirname(thumbnail_abs), exist_ok=True)
+    if duration is None:
+        duration = probe_video(input_path)["duration"]
+    times = get_candidate_times(duration)
+
+    with tempfile.TemporaryDirectory(
+        dir=os.path.dirname(thumbnail_abs)
+    ) as work_dir:
+        run_ffmpeg_command(build_poster_command(input_path, work_dir, times))
+
+        candidates = []
+        for i, seconds in enumerate(times):
+            jpg_path, gray_path = get_candidate_paths(work_dir, i)
+            # a seek past the last frame writes no (or an empty) candidate
+            if (
+                os.path.exists(jpg_path)
+                and os.path.exists(gray_path)
+                and os.path.getsize(gray_path)
+            ):
+                with open(gray_path, "rb") as f:
+                    candidates.append((jpg_path, seconds, f.read()))
+        if not candidates:
+            raise RuntimeError(f"No poster frame could be read from {input_path}")
+
+        scores = score_candidates([frame for _, _, frame in candidates])
+        best = max(range(len(candidates)), key=lambda i: scores[i])
+        os.replace(candidates[best][0], thumbnail_abs)
+
+    debug(
+        f"Thumbnail generated at {thumbnail_abs} "
+        f"(frame at {candidates[best][1]}s, "
+        f"scores {[round(x, 1) for x in scores]})"
+    )
+    return thumbnail_abs
+
+
+def generate_preview_clip(
+    input_path: str, clip_abs: str, metadata: dict = None
+) -> str:
+    """
+    Encode the hover preview: a few seconds of excerpts from the whole
+    video, silent and small enough to load with the catalog grid.
+    """
+    debug(f"Generating preview clip for {input_path}")
+
+    os.makedirs(os.path.dirname(clip_abs), exist_ok=True)
+    if not metadata:
+        metadata = probe_video(input_path)
+
+    run_ffmpeg_command(
+        build_preview_clip_command(
+            input_path,
+            clip_abs,
+            get_excerpt_windows(metadata["duration"]),
+            get_clip_size(metadata["width"], metadata["height"]),
+        )
+    )
+
+    debug(
+        f"Preview clip generated at {clip_abs} "
+        f"({os.path.getsize(clip_abs) // 1024} KB)"
+    )
+    return clip_abs
+
+
+def make_even(value: float) -> int:
+    """
+    Round to the nearest even number; H.264 with yuv420p needs even sizes.
+    """
+    return max(2, int(round(value / 2)) * 2)
+
+
+def build_ladder(width: int, height: int) -> dict:
+    """
+    Build the rendition ladder for a source of the given display size.
+
+    Every rung is a 16:9 box (9:16 for portrait sources) the video is
+    fitted into with its aspect ratio kept, so a 1920x800 scope film
+    gets its full size as 1080p and 4:3 or square sources are limited
+    by their height. Rungs that would upscale are skipped. Sources
+    smaller than the lowest rung get a single rendition at their own
+    size.
+    """
+    short_side = min(width, height)
+    ladder = {}
+
+    for res_name, rung in RESOLUTIONS.items():
+        box_long, box_short = rung * 16 / 9, rung
+        if width >= height:
+            factor = min(box_long / width, box_short / height)
+        else:
+            factor = min(box_short / width, box_long / height)
+        if factor > 1:
+            continue
+        ladder[res_name] = f"{make_even(width * factor)}x{make_even(height * factor)}"
+
+    if not ladder:
+        ladder[f"{short_side}p"] = f"{make_even(width)}x{make_even(height)}"
+
+    return ladder
+
+
+def get_eager_renditions(renditions: dict) -> dict:
+    """
+    Renditions encoded together with the upload: all of them, or with
+    HLS_LAZY_RENDITIONS only the lowest rung. The others are encoded by
+    encode_rendition when they are first requested.
+    """
+    if not settings.HLS_LAZY_RENDITIONS:
+        return renditions
+    name = next(iter(renditions))
+    return {name: renditions[name]}
+
+
+def store_media_metadata(video_id: int, input_path: str) -> Video:
+    """
+    Probe stage: read the source once with ffprobe and keep the result on
+    the Video so later stages (and other code) do not touch the file.
+    """
+    metadata = probe_video(input_path)
+
+    video = Video.objects.get(id=video_id)
+    for field, value in metadata.items():
+        setattr(video, field, value)
+    video.save(update_fields=list(metadata))
+
+    debug(
+        f"Probed {video_id}: {video.width}x{video.height} "
+        f"@ {video.frame_rate} fps, {video.duration}s, "
+        f"{video.video_codec}/{video.audio_codec or 'no audio'}"
+    )
+    return video
+
+
+def get_trickplay_size(renditions: dict) -> str:
+    """
+    Tile size of the trickplay sprites: TRICKPLAY_WIDTH wide, with the
+    aspect ratio of the ladder.
+    """
+    width, height = (
+        int(v) for v in max(
+            renditions.values(), key=lambda size: int(size.split("x")[0])
+        ).split("x")
+    )
+    tile_width = settings.TRICKPLAY_WIDTH
+    return f"{tile_width}x{make_even(tile_width * height / width)}"
+
+
+def build_scale_filter(renditions: dict, tile_size: str = None) -> str:
+    """
+    Build a filter graph that splits the decoded video once and scales
+    one branch per rendition. Branch outputs are labelled [v<i>out] and
+    converted to yuv420p, the only chroma format browsers decode.
+
+    With a tile_size, one more branch renders trickplay sprite sheets
+    ([sprites]) from the same decoded frames.
+    """
+    count = len(renditions)
+    labels = [f"v{i}" for i in range(count)]
+    if tile_size:
+        labels.append("vt")
+
+    split_outputs = "".join(f"[{label}]" for label in labels)
+    filters = [f"[0:v]split={len(labels)}{split_outputs}"]
+    for i, res_size in enumerate(renditions.values()):
+        width, height = res_size.split("x")
+        filters.append(
+            f"[v{i}]scale={width}:{height},format=yuv420p[v{i}out]"
+        )
+    if tile_size:
+        filters.append(build_trickplay_filter("vt", tile_size))
+
+    return ";".join(filters)
+
+
+def build_hls_output_args(
+    output_dir: str, names: list, with_audio: bool, progressive: bool = False
+) -> list:
+    """
+    Build the HLS muxer arguments for already mapped streams: one video
+    stream per name, followed by one shared audio stream if with_audio.
+    With progressive the playlists are EVENT playlists, which can be
+    served while they grow.
+
+    Output layout: <output_dir>/<res_name>/index.m3u8 plus either
+    %04d.ts segments or, with HLS_SEGMENT_TYPE=fmp4, one media.mp4 per
+    rendition addressed through EXT-X-BYTERANGE.
+    """
+    stream_map = []
+    for i, res_name in enumerate(names):
+        entry = f"v:{i}"
+        if with_audio:
+            entry += f",agroup:{AUDIO_RENDITION}"
+        stream_map.append(f"{entry},name:{res_name}")
+
+    if with_audio:
+        stream_map.insert(
+            0, f"a:0,agroup:{AUDIO_RENDITION},name:{AUDIO_RENDITION}"
+        )
+
+    if progressive:
+        segment_args = ["-hls_playlist_type", "event"]
+    else:
+        segment_args = []
+
+    if settings.HLS_SEGMENT_TYPE == "fmp4":
+        segment_args += [
+            "-hls_segment_type", "fmp4",
+            "-hls_flags", "single_file",
+            "-hls_segment_filename",
+            os.path.join(output_dir, "%v", FMP4_MEDIA_FILE),
+        ]
+    else:
+        segment_args += [
+            "-hls_segment_filename",
+            os.path.join(output_dir, "%v", "%04d.ts"),
+        ]
+
+    return [
+        "-f", "hls",
+        "-hls_time", "4",
+        "-hls_list_size", "0",
+        *segment_args,
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(output_dir, "%v", "index.m3u8"),
+    ]
+
+
+def is_progressive() -> bool:
+    """
+    Progressive publishing (HLS_PROGRESSIVE_PUBLISH) needs one file per
+    segment; single-file fMP4 renditions are published when complete.
+    """
+    return settings.HLS_PROGRESSIVE_PUBLISH and settings.HLS_SEGMENT_TYPE == "mpegts"
+
+
+def build_hls_command(
+    input_path: str,
+    output_dir: str,
+    renditions: dict,
+    with_audio: bool,
+    tile_size: str = None,
+    profile: str = None,
+    threads: int = None,
+    overrides: dict = None,
+    progressive: bool = False,
+) -> list:
+    """
+    Build one ffmpeg command that decodes the source once and writes
+    all renditions via split/scale and -var_stream_map, each encoded
+    with the x264 settings of the named encoding profile and the
+    per-title `overrides` of the video.
+
+    Audio is encoded once into its own rendition; write_master_playlist
+    references it from every video variant through an EXT-X-MEDIA group.
+    With a tile_size the same pass also writes trickplay sprite sheets.
+    `threads` limits decoder, filters and encoders to a CPU allocation.
+    `progressive` is set when a ProgressivePublisher serves the output.
+    """
+    command = ["ffmpeg", "-y", *build_thread_args(threads), "-i", input_path]
+    if renditions:
+        command += [
+            "-filter_complex", build_scale_filter(renditions, tile_size)
+        ]
+
+    for i in range(len(renditions)):
+        command += ["-map", f"[v{i}out]"]
+    if with_audio:
+        command += ["-map", "0:a:0"]
+
+    command += build_rendition_codec_args(
+        list(renditions), profile, threads, overrides
+    )
+    command += ["-c:a", "aac"]
+    command += build_hls_output_args(
+        output_dir, list(renditions), with_audio, progressive
+    )
+    if renditions and tile_size:
+        command += build_trickplay_output_args(output_dir, SPRITE_PREFIX)
+    return command
+
+
+def build_thread_args(threads: int = None) -> list:
+    """
+    Global ffmpeg options for a thread allocation: decoder threads (an
+    input option, so it goes before -i) and filter graph threads.
+    """
+    if not threads:
+        return []
+    return [
+        "-threads", str(threads),
+        "-filter_complex_threads", str(threads),
+    ]
 
-    ffmpeg_thumb_cmd = [
+
+def build_split_command(input_path: str, chunk_dir: str) -> list:
+    """
+    Cut the video stream of the source into chunks of roughly
+    HLS_CHUNK_DURATION seconds. Stream copy only cuts on keyframes,
+    so every chunk can be decoded on its own. Start and end time of
+    every chunk are written to <chunk_dir>/chunks.csv.
+    """
+    return [
         "ffmpeg",
         "-y",
         "-i", input_path,
-        "-ss", "00:00:01.000",
-        "-vframes", "1",
-        thumbnail_abs,
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-f", "segment",
+        "-segment_time", str(settings.HLS_CHUNK_DURATION),
+        "-reset_timestamps", "1",
+        "-segment_list", os.path.join(chunk_dir, CHUNK_LIST),
+        "-segment_list_type", "csv",
+        os.path.join(chunk_dir, "%04d.mp4"),
     ]
 
-    run_ffmpeg_command(ffmpeg_thumb_cmd)
 
-    debug(f"Thumbnail generated at {thumbnail_rel}")
-    return thumbnail_rel
+def build_chunk_command(
+    chunk_path: str,
+    work_dir: str,
+    chunk_name: str,
+    renditions: dict,
+    tile_size: str = None,
+    profile: str = None,
+    threads: int = None,
+    overrides: dict = None,
+) -> list:
+    """
+    Encode one source chunk into every rendition in a single decode.
+    Output: <work_dir>/<res_name>/<chunk_name>, plus the chunk's sprite
+    sheets in <work_dir>/trickplay/ when a tile_size is given.
+    """
+    command = [
+        "ffmpeg",
+        "-y",
+        *build_thread_args(threads),
+        "-i", chunk_path,
+        "-filter_complex", build_scale_filter(renditions, tile_size),
+    ]
 
+    encoding_profile = get_profile(profile)
+    for i, res_name in enumerate(renditions):
+        options = resolve_rendition_options(
+            encoding_profile, res_name, overrides
+        )
+        if threads:
+            options["threads"] = max(1, threads // len(renditions))
+        command += ["-map", f"[v{i}out]"]
+        command += build_x264_args(options)
+        command.append(os.path.join(work_dir, res_name, chunk_name))
+    if tile_size:
+        command += build_trickplay_output_args(
+            work_dir, get_chunk_sprite_prefix(chunk_name)
+        )
+    return command
 
-def convert_video_to_hls(video_id: int, video_file_path: str) -> None:
-    debug(f"START HLS JOB for video {video_id}")
 
-    resolutions = {
-        "480p": "854x480",
-        "720p": "1280x720",
-        "1080p": "1920x1080",
+def get_chunk_sprite_prefix(chunk_name: str) -> str:
+    return f"{SPRITE_PREFIX}-{os.path.splitext(chunk_name)[0]}"
+
+
+def build_stitch_command(
+    concat_lists: dict, input_path: str, output_dir: str, with_audio: bool
+) -> list:
+    """
+    Concatenate the encoded chunks of every rendition (stream copy) and
+    package them as continuous HLS playlists. Audio is encoded once from
+    the original source.
+    """
+    command = ["ffmpeg", "-y"]
+    for list_path in concat_lists.values():
+        command += ["-f", "concat", "-safe", "0", "-i", list_path]
+    if with_audio:
+        command += ["-i", input_path]
+
+    for i in range(len(concat_lists)):
+        command += ["-map", f"{i}:v:0"]
+    if with_audio:
+        command += ["-map", f"{len(concat_lists)}:a:0"]
+
+    command += ["-c:v", "copy", "-c:a", "aac"]
+    command += build_hls_output_args(
+        output_dir, list(concat_lists), with_audio
+    )
+    return command
+
+
+def prepare_output_dirs(
+    output_dir: str, renditions: dict, with_audio: bool
+) -> list:
+    rendition_dirs = list(renditions)
+    if with_audio:
+        rendition_dirs.append(AUDIO_RENDITION)
+    for name in rendition_dirs:
+        os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+    return rendition_dirs
+
+
+def write_hls_master(
+    output_dir: str, renditions: dict, with_audio: bool
+) -> None:
+    """
+    Write master.m3u8 and, for fMP4 output, a DASH manifest describing
+    the same media files. Renditions of the ladder that are not encoded
+    (yet) are listed with an estimated bandwidth in the HLS playlist
+    only; the DASH manifest has no way to point at a later encode.
+    """
+    audio_name = AUDIO_RENDITION if with_audio else None
+    encoded = [
+        name for name in renditions
+        if os.path.exists(os.path.join(output_dir, name, "index.m3u8"))
+    ]
+    pending = {
+        name: size for name, size in renditions.items()
+        if name not in encoded
+    }
+
+    write_master_playlist(output_dir, encoded, audio_name, pending)
+    if settings.HLS_SEGMENT_TYPE == "fmp4":
+        write_dash_manifest(output_dir, encoded, audio_name)
+
+    debug(f"Manifests written for {output_dir}")
+
+
+def build_media_url(rel_path: str) -> str:
+    return f"{settings.BACKEND_PUBLIC_BASE}{settings.MEDIA_URL}{rel_path}"
+
+
+def publish_content(content_hash: str) -> None:
+    """
+    Link every video with this content hash to the encoded output and
+    thumbnail. Covers the video that triggered the encode as well as
+    duplicates uploaded (or coalesced) while it was running.
+    """
+    thumbnail_url = build_media_url(get_thumbnail_path(content_hash))
+    videos = Video.objects.filter(content_hash=content_hash)
+
+    for video_id in videos.values_list("id", flat=True):
+        link_video_output(video_id, content_hash)
+        set_status(video_id, "ready")
+
+    videos.update(thumbnail_url=thumbnail_url)
+    if has_preview_clip(content_hash):
+        videos.update(
+            preview_url=build_media_url(get_preview_clip_path(content_hash))
+        )
+    debug(f"Published {content_hash}, thumbnail URL: {thumbnail_url}")
+
+
+def publish_poster(
+    content_hash: str, input_path: str, duration: float = None,
+    video_id: int = None,
+) -> None:
+    """
+    Generate the thumbnail on local scratch space, swap it in below
+    MEDIA_ROOT and point every video with this content at it. The
+    stage statistics are recorded for `video_id`.
+    """
+    os.makedirs(settings.HLS_SCRATCH_ROOT, exist_ok=True)
+    fd, poster_path = tempfile.mkstemp(
+        prefix=f"{content_hash}.", suffix=".jpg", dir=settings.HLS_SCRATCH_ROOT
+    )
+    os.close(fd)
+
+    try:
+        with track_stage(
+            "thumbnail", video_id, content_hash, source_seconds=duration
+        ) as record:
+            generate_thumbnail(input_path, poster_path, duration)
+            record.output_bytes = os.path.getsize(poster_path)
+        publish_file(poster_path, get_thumbnail_path(content_hash))
+    finally:
+        os.remove(poster_path)
+
+    Video.objects.filter(content_hash=content_hash).update(
+        thumbnail_url=build_media_url(get_thumbnail_path(content_hash))
+    )
+
+
+def create_poster(video_id: int, video_file_path: str) -> None:
+    """
+    Fast lane job on the POSTER_QUEUE: the catalog gets a thumbnail
+    within seconds of the upload instead of after the last rendition.
+    """
+    video = Video.objects.get(id=video_id)
+
+    if has_thumbnail(video.content_hash):
+        Video.objects.filter(id=video_id).update(
+            thumbnail_url=build_media_url(
+                get_thumbnail_path(video.content_hash)
+            )
+        )
+        return
+
+    publish_poster(
+        video.content_hash,
+        os.path.join(settings.MEDIA_ROOT, video_file_path),
+        video.duration,
+        video_id=video_id,
+    )
+    debug(f"Poster of video {video_id} published")
+
+
+def publish_preview_clip(
+    content_hash: str, input_path: str, metadata: dict = None,
+    video_id: int = None,
+) -> None:
+    """
+    Encode the preview clip on local scratch space, swap it in below
+    MEDIA_ROOT and point every video with this content at it. The
+    stage statistics are recorded for `video_id`.
+    """
+    os.makedirs(settings.HLS_SCRATCH_ROOT, exist_ok=True)
+    fd, clip_path = tempfile.mkstemp(
+        prefix=f"{content_hash}.", suffix=".mp4", dir=settings.HLS_SCRATCH_ROOT
+    )
+    os.close(fd)
+
+    try:
+        with track_stage("preview_clip", video_id, content_hash) as record:
+            generate_preview_clip(input_path, clip_path, metadata)
+            record.output_bytes = os.path.getsize(clip_path)
+        publish_file(clip_path, get_preview_clip_path(content_hash))
+    finally:
+        os.remove(clip_path)
+
+    Video.objects.filter(content_hash=content_hash).update(
+        preview_url=build_media_url(get_preview_clip_path(content_hash))
+    )
+
+
+def create_preview_clip(video_id: int, video_file_path: str) -> None:
+    """
+    Job on the POSTER_QUEUE after the poster: it only decodes the
+    excerpts, so the catalog gets its hover preview long before the
+    renditions are done.
+    """
+    video = Video.objects.get(id=video_id)
+
+    if has_preview_clip(video.content_hash):
+        Video.objects.filter(id=video_id).update(
+            preview_url=build_media_url(
+                get_preview_clip_path(video.content_hash)
+            )
+        )
+        return
+
+    metadata = None
+    if video.width and video.height:
+        metadata = {
+            "width": video.width,
+            "height": video.height,
+            "duration": video.duration,
+        }
+    publish_preview_clip(
+        video.content_hash,
+        os.path.join(settings.MEDIA_ROOT, video_file_path),
+        metadata,
+        video_id=video_id,
+    )
+    debug(f"Preview clip of video {video_id} published")
+
+
+def finish_content(
+    content_hash: str, input_path: str, staging_dir: str
+) -> None:
+    """
+    Publish the whole output: HLS tree with one atomic switch, then the
+    links of all videos with this content. Thumbnail and preview clip
+    normally exist already (create_poster, create_preview_clip); they
+    are only generated here if those jobs failed or never ran (live
+    encodes).
+    """
+    video_id = (
+        Video.objects.filter(content_hash=content_hash)
+        .values_list("id", flat=True).first()
+    )
+    if not has_thumbnail(content_hash):
+        publish_poster(content_hash, input_path, video_id=video_id)
+    if not has_preview_clip(content_hash):
+        publish_preview_clip(content_hash, input_path, video_id=video_id)
+
+    publish_output_dir(staging_dir, content_hash)
+    publish_content(content_hash)
+    enqueue_reencode(content_hash)
+
+
+def get_job_timeout(duration: float) -> int:
+    """
+    RQ job timeout for encoding `duration` seconds of source material.
+    """
+    return int(max(
+        settings.HLS_JOB_TIMEOUT_MIN,
+        (duration or 0) * settings.HLS_JOB_TIMEOUT_FACTOR,
+    ))
+
+
+def get_encode_queue(duration: float) -> str:
+    """
+    Encode queue for a source of `duration` seconds. Long sources have
+    their own queue and workers, so they cannot hold up short clips.
+    """
+    if (duration or 0) >= settings.HLS_LONG_QUEUE_MIN_DURATION:
+        return "long"
+    return "short"
+
+
+def has_failed_dependency(job) -> bool:
+    """
+    A deferred job whose dependency failed for good (or expired) never
+    runs: RQ leaves it deferred forever.
+    """
+    if job.get_status() != "deferred":
+        return False
+    dependencies = Job.fetch_many(job.dependency_ids, connection=job.connection)
+    return any(
+        dependency is None
+        or dependency.get_status() in ("failed", "stopped", "canceled")
+        for dependency in dependencies
+    )
+
+
+def active_transcode_job(content_hash: str):
+    """
+    Return the queued or running encode for this content, if any. A
+    stitch job left behind by a chunk that ran out of retries is
+    deleted, so the content can be encoded again.
+    """
+    for queue_name in ENCODE_QUEUES:
+        queue = django_rq.get_queue(queue_name)
+        for job_id in (f"transcode-{content_hash}", f"stitch-{content_hash}"):
+            job = queue.fetch_job(job_id)
+            if job is None or job.get_status() not in ACTIVE_JOB_STATUSES:
+                continue
+            if has_failed_dependency(job):
+                debug(f"Deleting {job.id}: a chunk failed for good")
+                job.delete()
+                continue
+            return job
+    return None
+
+
+def enqueue_transcode(video: Video, video_file_path: str) -> None:
+    """
+    Enqueue the encode under a deterministic job id derived from the
+    content hash. If an encode of the same content is already queued or
+    running, the video just waits for it; publish_content links it.
+    """
+    queue = django_rq.get_queue(get_encode_queue(video.duration))
+    lock = queue.connection.lock(
+        f"videoflix:transcode-lock:{video.content_hash}", timeout=30
+    )
+
+    with lock:
+        job = active_transcode_job(video.content_hash)
+        if job is not None:
+            debug(f"Video {video.id} joins running job {job.id}")
+            set_status(video.id, "queued", stage=f"waiting for {job.id}")
+            return
+
+        # before the enqueue: a free worker may report progress at once
+        set_status(video.id, "queued", stage="transcode")
+        queue.enqueue(
+            convert_video_to_hls,
+            video.id,
+            video_file_path,
+            job_id=f"transcode-{video.content_hash}",
+            job_timeout=get_job_timeout(video.duration),
+            retry=Retry(max=settings.HLS_JOB_RETRIES),
+        )
+
+
+def analyze_complexity(video: Video, input_path: str) -> None:
+    """
+    Per-title encoding (HLS_PER_TITLE_ENCODING): encode a few windows of
+    the source as a low-resolution proxy at the target CRF and derive
+    CRF and bitrate cap of every rung from the bits per pixel it needs.
+    The ladder is stored on the video and reused by every later encode.
+    """
+    if not settings.HLS_PER_TITLE_ENCODING or video.encoding_ladder:
+        return
+
+    set_status(video.id, "processing", stage="analyzing")
+    proxy_size = get_proxy_size(video.width, video.height)
+    os.makedirs(settings.HLS_SCRATCH_ROOT, exist_ok=True)
+
+    bits = frames = 0
+    windows = get_sample_windows(video.duration)
+    with track_stage(
+        "analysis", video.id, video.content_hash,
+        source_seconds=sum(duration for _, duration in windows),
+    ) as record:
+        for start, duration in windows:
+            fd, sample_path = tempfile.mkstemp(
+                prefix=f"{video.content_hash}.", suffix=".h264",
+                dir=settings.HLS_SCRATCH_ROOT,
+            )
+            os.close(fd)
+            values = {}
+            try:
+                run_ffmpeg_command(
+                    build_analysis_command(
+                        input_path, sample_path, start, duration, proxy_size
+                    ),
+                    values.update,
+                )
+                bits += os.path.getsize(sample_path) * 8
+            finally:
+                os.remove(sample_path)
+            frames += int(values.get("frame", 0))
+        record.output_bytes = bits // 8
+
+    proxy_pixels = proxy_size[0] * proxy_size[1]
+    complexity = bits / (proxy_pixels * max(frames, 1))
+    video.encoding_ladder = {
+        "complexity": round(complexity, 5),
+        "renditions": build_title_ladder(
+            complexity, proxy_pixels,
+            build_ladder(video.width, video.height),
+            video.frame_rate,
+        ),
+    }
+    video.save(update_fields=["encoding_ladder"])
+    debug(f"Per-title ladder of {video.id}: {video.encoding_ladder}")
+
+
+def get_title_overrides(video: Video) -> dict | None:
+    """
+    Rate control of the per-title ladder, as profile overrides.
+    """
+    if not video.encoding_ladder:
+        return None
+    return {
+        name: {"crf": rung["crf"], "bitrate": rung["bitrate"]}
+        for name, rung in video.encoding_ladder["renditions"].items()
     }
 
+
+@report_failures
+def ingest_video(video_id: int, video_file_path: str) -> None:
+    """
+    Hash and probe a new upload. Content that was encoded before is
+    published immediately; everything else is handed to the encoder.
+    """
+    debug(f"INGEST video {video_id}")
+    set_status(video_id, "processing", stage="ingest")
+
     input_path = os.path.join(settings.MEDIA_ROOT, video_file_path)
 
     if not default_storage.exists(video_file_path):
         debug("ERROR: input file not found.")
         raise FileNotFoundError(f"Video file not found: {input_path}")
 
-    for res_name, res_size in resolutions.items():
-        debug(f"Converting {video_id} → {res_name}")
+    with track_stage("probe", video_id) as record:
+        video = store_media_metadata(video_id, input_path)
+        video.content_hash = hash_file(input_path)
+        video.save(update_fields=["content_hash"])
+        record.content_hash = video.content_hash
+        record.source_seconds = video.duration
+
+    if has_content_output(video.content_hash):
+        debug(f"Video {video_id} is a duplicate of {video.content_hash}")
+        publish_content(video.content_hash)
+        enqueue_reencode(video.content_hash)
+        return
 
-        output_dir = os.path.join(
-            settings.MEDIA_ROOT, "hls", str(video_id), res_name
+    if VideoUpload.objects.filter(
+        video_id=video_id, live_status="encoding"
+    ).exists():
+        # transcode_growing_upload publishes it (or falls back to us)
+        set_status(video_id, "processing", stage="live encode")
+        return
+
+    django_rq.get_queue(POSTER_QUEUE).enqueue(
+        create_poster, video_id, video_file_path, at_front=True
+    )
+    django_rq.get_queue(POSTER_QUEUE).enqueue(
+        create_preview_clip, video_id, video_file_path
+    )
+    enqueue_transcode(video, video_file_path)
+
+
+def combine_callbacks(*callbacks):
+    """
+    One on_progress callback calling every given callback (None skipped).
+    """
+    callbacks = [callback for callback in callbacks if callback]
+
+    def on_progress(values: dict) -> None:
+        for callback in callbacks:
+            callback(values)
+
+    return on_progress
+
+
+def publish_preview(content_hash: str) -> None:
+    """
+    on_playable of the ProgressivePublisher: link every video with this
+    content to the growing output, so players can start right away.
+    """
+    videos = Video.objects.filter(content_hash=content_hash)
+    for video_id in videos.values_list("id", flat=True):
+        link_video_output(video_id, content_hash)
+        set_status(
+            video_id, "processing", stage="encoding", parts=["encode"],
+            playable=True,
         )
-        os.makedirs(output_dir, exist_ok=True)
+    debug(f"Preview of {content_hash} published")
 
-        output_file = os.path.join(output_dir, "index.m3u8")
 
-        ffmpeg_cmd = [
-            "ffmpeg",
-            "-y",
-            "-i", input_path,
-            "-vf", f"scale={res_size}",
-            "-c:v", "h264",
-            "-c:a", "aac",
-            "-f", "hls",
-            "-hls_time", "4",
-            "-hls_list_size", "0",
-            "-hls_segment_filename",
-            os.path.join(output_dir, "%04d.ts"),
-            output_file,
-        ]
+def drop_preview(content_hash: str, error: str) -> None:
+    """
+    Undo publish_preview: unlink the videos from the removed preview, so
+    no player keeps waiting for the end of its EVENT playlists.
+    """
+    if not unpublish_preview_dir(content_hash):
+        return
+    videos = Video.objects.filter(content_hash=content_hash)
+    for video_id in videos.values_list("id", flat=True):
+        link_path = get_video_hls_dir(video_id)
+        if os.path.islink(link_path) and not os.path.exists(link_path):
+            os.remove(link_path)
+            set_status(video_id, "failed", error=error)
+    debug(f"Preview of {content_hash} removed")
 
-        run_ffmpeg_command(ffmpeg_cmd)
 
-    thumbnail_rel_path = generate_thumbnail(video_id, input_path)
+def drop_preview_on_failure(job):
+    """
+    Remove the preview of the content when the last attempt of the
+    wrapped job fails; earlier attempts keep it for the retry.
+    The wrapped job must take the video id as first argument.
+    """
+    @functools.wraps(job)
+    def wrapper(video_id: int, *args, **kwargs):
+        try:
+            return job(video_id, *args, **kwargs)
+        except Exception as exc:
+            current_job = get_current_job()
+            if current_job is None or not current_job.retries_left:
+                content_hash = Video.objects.get(id=video_id).content_hash
+                drop_preview(content_hash, str(exc)[-1000:])
+            raise
 
-    thumbnail_absolute_url = f"http://127.0.0.1:8000{settings.MEDIA_URL}{thumbnail_rel_path}"
+    return wrapper
+
+
+@report_failures
+@drop_preview_on_failure
+def convert_video_to_hls(video_id: int, video_file_path: str) -> None:
+    """
+    Encode all renditions of a video in one pass. Renditions with a
+    checkpoint from an earlier (failed or requeued) run are skipped.
+    """
+    debug(f"START HLS JOB for video {video_id}")
 
     video = Video.objects.get(id=video_id)
-    video.thumbnail_url = thumbnail_absolute_url
-    video.save(update_fields=["thumbnail_url"])
+    input_path = os.path.join(settings.MEDIA_ROOT, video_file_path)
+    renditions = build_ladder(video.width, video.height)
+
+    if has_content_output(video.content_hash):
+        debug(f"Output of {video.content_hash} already published")
+        publish_content(video.content_hash)
+        return
+
+    analyze_complexity(video, input_path)
+
+    if video.duration >= settings.HLS_SPLIT_MIN_DURATION:
+        split_video_for_hls(video, video_file_path)
+        return
+
+    output_dir = get_scratch_dir(video.content_hash)
+    tile_size = get_trickplay_size(renditions)
+    pending = {
+        name: size for name, size in get_eager_renditions(renditions).items()
+        if not is_done(output_dir, name)
+    }
+    pending_audio = video.has_audio and not is_done(output_dir, AUDIO_RENDITION)
+
+    if pending or pending_audio:
+        rendition_dirs = prepare_output_dirs(output_dir, pending, pending_audio)
+        if pending:
+            # sprites come from the same decode as the video renditions
+            rendition_dirs.append(TRICKPLAY_DIR)
+            os.makedirs(os.path.join(output_dir, TRICKPLAY_DIR), exist_ok=True)
+
+        debug(f"Converting {video_id} → {', '.join(rendition_dirs)}")
+
+        reporter = ProgressReporter(video_id, "encode", video.duration)
+        publisher = None
+        lowest = next(iter(renditions))
+        if is_progressive() and lowest in pending:
+            publisher = ProgressivePublisher(
+                video.content_hash, output_dir, lowest,
+                AUDIO_RENDITION if pending_audio else None,
+                functools.partial(publish_preview, video.content_hash),
+            )
+
+        with cpu_slots(functools.partial(
+            set_status, video_id, "queued", stage="waiting for CPU"
+        )) as threads:
+            set_status(
+                video_id, "processing", stage="encoding", parts=["encode"]
+            )
+            ffmpeg_cmd = build_hls_command(
+                input_path, output_dir, pending, pending_audio,
+                tile_size if pending else None,
+                get_first_pass_profile(video.encoding_profile),
+                threads,
+                get_title_overrides(video),
+                progressive=publisher is not None,
+            )
+            with track_stage(
+                "encode", video_id, video.content_hash,
+                part=", ".join(rendition_dirs),
+                source_seconds=video.duration,
+            ) as record:
+                run_ffmpeg_command(
+                    ffmpeg_cmd,
+                    combine_callbacks(reporter, publisher),
+                )
+                record.outputs = measure_outputs(output_dir, rendition_dirs)
+        if publisher and publisher.error:
+            debug(f"Progressive publishing stopped: {publisher.error}")
+        for name in rendition_dirs:
+            mark_done(output_dir, name)
+    else:
+        debug(f"All renditions of {video_id} already encoded")
+
+    write_output_profile(
+        output_dir, get_first_pass_profile(video.encoding_profile)
+    )
+    write_hls_master(output_dir, renditions, video.has_audio)
+    if is_done(output_dir, TRICKPLAY_DIR):
+        write_trickplay_track(
+            output_dir, [(SPRITE_PREFIX, 0, video.duration)], tile_size
+        )
+
+    set_status(video_id, "processing", stage="publishing")
+    finish_content(video.content_hash, input_path, output_dir)
+
+
+def read_chunk_list(chunk_dir: str) -> dict:
+    """
+    Return chunk file name -> duration from the split step's CSV list.
+    """
+    chunks = {}
+    with open(os.path.join(chunk_dir, CHUNK_LIST)) as f:
+        for line in f:
+            name, start, end = line.strip().split(",")
+            chunks[name] = float(end) - float(start)
+    return chunks
+
+
+def split_video_for_hls(video: Video, video_file_path: str) -> None:
+    """
+    Split mode for long sources: cut the source at keyframes, enqueue one
+    encode job per chunk and a stitch job that runs once all chunks are
+    done. Any idle worker can pick up a chunk. On a retry the existing
+    split is reused and finished chunks are not encoded again.
+    """
+    input_path = os.path.join(settings.MEDIA_ROOT, video_file_path)
+    work_dir = get_work_dir(video.content_hash)
+    chunk_dir = os.path.join(work_dir, "source")
+
+    if not is_done(work_dir, "split"):
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(chunk_dir)
+        renditions = build_ladder(video.width, video.height)
+        for res_name in get_eager_renditions(renditions):
+            os.makedirs(os.path.join(work_dir, res_name))
+        os.makedirs(os.path.join(work_dir, TRICKPLAY_DIR))
+
+        debug(f"Splitting {video.id} into chunks")
+        with track_stage(
+            "split", video.id, video.content_hash,
+            source_seconds=video.duration,
+        ):
+            run_ffmpeg_command(build_split_command(input_path, chunk_dir))
+        mark_done(work_dir, "split")
+
+    chunks = read_chunk_list(chunk_dir)
+    pending = {
+        name: duration for name, duration in chunks.items()
+        if not is_done(work_dir, f"chunk-{name}")
+    }
+    set_status(video.id, "processing", stage="encoding", parts=list(pending))
+
+    queue = django_rq.get_queue(get_encode_queue(video.duration))
+    chunk_jobs = [
+        queue.enqueue(
+            encode_hls_chunk,
+            video.id,
+            chunk_name,
+            chunk_duration,
+            job_timeout=get_job_timeout(chunk_duration),
+            retry=Retry(max=settings.HLS_JOB_RETRIES),
+        )
+        for chunk_name, chunk_duration in pending.items()
+    ]
+    queue.enqueue(
+        stitch_hls_chunks,
+        video.id,
+        video_file_path,
+        job_id=f"stitch-{video.content_hash}",
+        job_timeout=get_job_timeout(video.duration),
+        depends_on=chunk_jobs or None,
+    )
+
+    debug(
+        f"Queued {len(chunk_jobs)} of {len(chunks)} chunk jobs "
+        f"for video {video.id}"
+    )
+
+
+@report_failures
+def encode_hls_chunk(
+    video_id: int, chunk_name: str, chunk_duration: float
+) -> None:
+    debug(f"Encoding chunk {chunk_name} of video {video_id}")
+
+    video = Video.objects.get(id=video_id)
+    work_dir = get_work_dir(video.content_hash)
+    chunk_path = os.path.join(work_dir, "source", chunk_name)
+    renditions = build_ladder(video.width, video.height)
+
+    encoded = get_eager_renditions(renditions)
+
+    with cpu_slots() as threads, track_stage(
+        "chunk", video_id, video.content_hash,
+        part=chunk_name, source_seconds=chunk_duration,
+    ) as record:
+        run_ffmpeg_command(
+            build_chunk_command(
+                chunk_path, work_dir, chunk_name,
+                encoded,
+                get_trickplay_size(renditions),
+                get_first_pass_profile(video.encoding_profile),
+                threads,
+                get_title_overrides(video),
+            ),
+            ProgressReporter(video_id, chunk_name, chunk_duration),
+        )
+        record.outputs = {
+            name: os.path.getsize(os.path.join(work_dir, name, chunk_name))
+            for name in encoded
+            if os.path.exists(os.path.join(work_dir, name, chunk_name))
+        }
+    mark_done(work_dir, f"chunk-{chunk_name}")
+
+
+def write_concat_list(list_path: str, chunk_paths: list) -> None:
+    with open(list_path, "w") as f:
+        for chunk_path in chunk_paths:
+            f.write(f"file '{chunk_path}'\n")
+
+
+@report_failures
+def stitch_hls_chunks(video_id: int, video_file_path: str) -> None:
+    debug(f"Stitching chunks of video {video_id}")
+    set_status(video_id, "processing", stage="stitching")
+
+    video = Video.objects.get(id=video_id)
+    renditions = build_ladder(video.width, video.height)
+    input_path = os.path.join(settings.MEDIA_ROOT, video_file_path)
+    work_dir = get_work_dir(video.content_hash)
+    output_dir = get_scratch_dir(video.content_hash)
+
+    if has_content_output(video.content_hash):
+        publish_content(video.content_hash)
+        return
+
+    chunks = read_chunk_list(os.path.join(work_dir, "source"))
+    encoded = get_eager_renditions(renditions)
+
+    if not all(is_done(output_dir, name) for name in encoded):
+        chunk_names = list(chunks)
+
+        concat_lists = {}
+        for res_name in encoded:
+            list_path = os.path.join(work_dir, f"{res_name}.txt")
+            write_concat_list(list_path, [
+                os.path.join(work_dir, res_name, name)
+                for name in chunk_names
+            ])
+            concat_lists[res_name] = list_path
+
+        prepare_output_dirs(output_dir, encoded, video.has_audio)
+
+        with track_stage(
+            "stitch", video_id, video.content_hash,
+            source_seconds=video.duration,
+        ) as record:
+            run_ffmpeg_command(build_stitch_command(
+                concat_lists, input_path, output_dir, video.has_audio
+            ))
+            record.outputs = measure_outputs(
+                output_dir, [*encoded, AUDIO_RENDITION]
+            )
+        for name in encoded:
+            mark_done(output_dir, name)
+        if video.has_audio:
+            mark_done(output_dir, AUDIO_RENDITION)
+
+    if not is_done(output_dir, TRICKPLAY_DIR):
+        shutil.copytree(
+            os.path.join(work_dir, TRICKPLAY_DIR),
+            os.path.join(output_dir, TRICKPLAY_DIR),
+            dirs_exist_ok=True,
+        )
+        mark_done(output_dir, TRICKPLAY_DIR)
+
+    write_output_profile(
+        output_dir, get_first_pass_profile(video.encoding_profile)
+    )
+    write_hls_master(output_dir, renditions, video.has_audio)
+
+    sections = []
+    start = 0.0
+    for chunk_name, chunk_duration in chunks.items():
+        sections.append(
+            (get_chunk_sprite_prefix(chunk_name), start, chunk_duration)
+        )
+        start += chunk_duration
+    write_trickplay_track(
+        output_dir, sections, get_trickplay_size(renditions)
+    )
+
+    set_status(video_id, "processing", stage="publishing")
+    finish_content(video.content_hash, input_path, output_dir)
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def start_live_encode(upload_id) -> bool:
+    """
+    Switch an upload from pending to encoding, unless it has completed
+    already; then the regular ingest path is taking care of it.
+    """
+    return bool(
+        VideoUpload.objects.filter(
+            id=upload_id, live_status="pending", completed_at__isnull=True
+        ).update(live_status="encoding")
+    )
+
+
+def transcode_growing_upload(upload_id) -> None:
+    """
+    Pipe-through ingest: encode a resumable upload while its chunks are
+    still arriving. The bytes are read from the growing file as soon as
+    append_chunk committed them and streamed into ffmpeg's stdin, so the
+    encode finishes a few seconds after the last chunk. The content hash
+    is computed on the way.
+
+    Sources that cannot be decoded front to back (MP4 with the index at
+    the end) are left to the regular ingest once the upload completes.
+    """
+    upload = wait_for_bytes(upload_id, PIPE_PROBE_BYTES)
+    path = get_upload_path(upload)
+
+    with open(path, "rb") as f:
+        head = f.read(PIPE_PROBE_BYTES)
+    if not is_streamable(head) or not start_live_encode(upload_id):
+        VideoUpload.objects.filter(id=upload_id).update(live_status="")
+        debug(f"Upload {upload_id} is processed after completion")
+        return
+
+    output_dir = get_scratch_dir(f"upload-{upload.id.hex}")
+    try:
+        content_hash = encode_growing_upload(upload, path, output_dir)
+        finish_live_encode(upload_id, content_hash, path, output_dir)
+    except Exception:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        VideoUpload.objects.filter(id=upload_id).update(live_status="failed")
+        fall_back_to_ingest(upload_id)
+        raise
+
+
+def encode_growing_upload(upload, path: str, output_dir: str) -> str:
+    """
+    Run the single-pass HLS encode with the upload as stdin. Returns the
+    SHA-256 of the complete upload.
+    """
+    metadata = probe_video(path)
+    renditions = build_ladder(metadata["width"], metadata["height"])
+    encoded = get_eager_renditions(renditions)
+    with_audio = bool(metadata["audio_codec"])
+    tile_size = get_trickplay_size(renditions)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    prepare_output_dirs(output_dir, encoded, with_audio)
+    os.makedirs(os.path.join(output_dir, TRICKPLAY_DIR))
+
+    digest = hashlib.sha256()
+    # the slots are only held while upload bytes are there to encode,
+    # not while ffmpeg waits for the next chunk of a slow client
+    with cpu_slot_lease() as lease, track_stage(
+        "live_encode", upload.video_id, part=", ".join(encoded),
+    ) as record:
+        run_ffmpeg_command(
+            build_hls_command(
+                "pipe:0", output_dir, encoded, with_audio, tile_size,
+                get_first_pass_profile(),
+                lease.slots if lease else None,
+            ),
+            stdin_blocks=follow_upload(
+                upload.id, digest, lease.paused if lease else None
+            ),
+        )
+        record.content_hash = digest.hexdigest()
+        record.outputs = measure_outputs(
+            output_dir, [*encoded, AUDIO_RENDITION]
+        )
+
+    # the complete file has a reliable duration for the thumbnail track
+    metadata = probe_video(path)
+    write_output_profile(output_dir, get_first_pass_profile())
+    write_hls_master(output_dir, renditions, with_audio)
+    write_trickplay_track(
+        output_dir, [(SPRITE_PREFIX, 0, metadata["duration"])], tile_size
+    )
+    return digest.hexdigest()
+
+
+def finish_live_encode(
+    upload_id, content_hash: str, input_path: str, output_dir: str
+) -> None:
+    """
+    Publish a live encode under its content hash, like a regular encode.
+    The video created by complete_upload may not be linked yet; then
+    its ingest job finds the published output and links it.
+    """
+    upload = VideoUpload.objects.get(id=upload_id)
+    if upload.video_id:
+        Video.objects.filter(id=upload.video_id).update(
+            content_hash=content_hash
+        )
+
+    if has_content_output(content_hash):
+        shutil.rmtree(output_dir, ignore_errors=True)
+        publish_content(content_hash)
+    else:
+        finish_content(content_hash, input_path, output_dir)
+
+    VideoUpload.objects.filter(id=upload_id).update(live_status="done")
+
+
+def fall_back_to_ingest(upload_id) -> None:
+    """
+    A live encode failed. If the upload completed meanwhile, its ingest
+    may have deferred to the live encode, so run the regular path now.
+    """
+    upload = VideoUpload.objects.filter(id=upload_id).first()
+    if upload and upload.video_id:
+        django_rq.get_queue(POSTER_QUEUE).enqueue(
+            ingest_video, upload.video_id, upload.file_name,
+            job_id=f"ingest-{upload.video_id}",
+            job_timeout=settings.VIDEO_INGEST_TIMEOUT,
+        )
+
+
+def output_lock(content_hash: str):
+    """
+    Serializes changes to the published output of one content, so two
+    renditions finishing at once do not drop each other's files.
+    """
+    return django_rq.get_queue(POSTER_QUEUE).connection.lock(
+        f"videoflix:output-lock:{content_hash}", timeout=300
+    )
+
+
+def request_rendition(video: Video, res_name: str) -> bool:
+    """
+    Enqueue the just-in-time encode of one rendition unless it exists
+    or is queued already. Cheap enough to call from a request.
+    """
+    if has_rendition(video.content_hash, res_name):
+        return False
+
+    queue = django_rq.get_queue(get_encode_queue(video.duration))
+    job_id = f"rendition-{video.content_hash}-{res_name}"
+    job = queue.fetch_job(job_id)
+    if job is not None and job.get_status() in ACTIVE_JOB_STATUSES:
+        return False
+
+    queue.enqueue(
+        encode_rendition,
+        video.id,
+        video.video_file.name,
+        res_name,
+        job_id=job_id,
+        job_timeout=get_job_timeout(video.duration),
+    )
+    debug(f"Queued {res_name} of video {video.id}")
+    return True
+
+
+def request_missing_renditions(video: Video) -> None:
+    for res_name in build_ladder(video.width, video.height):
+        request_rendition(video, res_name)
+
+
+def encode_rendition(video_id: int, video_file_path: str, res_name: str) -> None:
+    """
+    Encode one rendition of an already published video and add it to
+    the published output. Not wrapped in report_failures: the video
+    stays playable in its other renditions if this fails.
+    """
+    video = Video.objects.get(id=video_id)
+    renditions = build_ladder(video.width, video.height)
+
+    if has_rendition(video.content_hash, res_name):
+        return
+
+    input_path = os.path.join(settings.MEDIA_ROOT, video_file_path)
+    staging_dir = get_scratch_dir(f"{video.content_hash}.{res_name}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    rendition = {res_name: renditions[res_name]}
+    prepare_output_dirs(staging_dir, rendition, False)
+
+    with cpu_slots() as threads, track_stage(
+        "rendition", video_id, video.content_hash,
+        part=res_name, source_seconds=video.duration,
+    ) as record:
+        run_ffmpeg_command(build_hls_command(
+            input_path, staging_dir, rendition, False,
+            profile=video.encoding_profile,
+            threads=threads,
+            overrides=get_title_overrides(video),
+        ))
+        record.outputs = measure_outputs(staging_dir, rendition)
+
+    with output_lock(video.content_hash):
+        output_dir = copy_published_output(video.content_hash)
+        shutil.move(
+            os.path.join(staging_dir, res_name),
+            os.path.join(output_dir, res_name),
+        )
+        write_hls_master(output_dir, renditions, video.has_audio)
+        publish_output_dir(output_dir, video.content_hash)
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    RenditionUsage.objects.update_or_create(
+        content_hash=video.content_hash,
+        name=res_name,
+        defaults={"last_used_at": timezone.now()},
+    )
+    debug(f"Published {res_name} of {video.content_hash}")
+
+
+def evict_rendition(video: Video, res_name: str) -> None:
+    """
+    Remove a just-in-time rendition from the published output. The
+    master playlist lists it as pending again, so the next request
+    encodes it anew.
+    """
+    renditions = build_ladder(video.width, video.height)
+
+    with output_lock(video.content_hash):
+        output_dir = copy_published_output(video.content_hash)
+        shutil.rmtree(os.path.join(output_dir, res_name))
+        write_hls_master(output_dir, renditions, video.has_audio)
+        publish_output_dir(output_dir, video.content_hash)
+
+    RenditionUsage.objects.filter(
+        content_hash=video.content_hash, name=res_name
+    ).delete()
+    debug(f"Evicted {res_name} of {video.content_hash}")
+
+
+def enqueue_reencode(content_hash: str) -> None:
+    """
+    Two-tier encoding: queue the long-term encode of content whose
+    published output was made with another profile than the video's own
+    (the fast first pass). Outputs without a recorded profile are left
+    alone.
+    """
+    output_profile = get_output_profile(content_hash)
+    video = Video.objects.filter(content_hash=content_hash).first()
+    if video is None or output_profile in (
+        None, resolve_profile_name(video.encoding_profile)
+    ):
+        return
+
+    queue = django_rq.get_queue(REENCODE_QUEUE)
+    job = queue.fetch_job(f"reencode-{content_hash}")
+    if job is not None and job.get_status() in ACTIVE_JOB_STATUSES:
+        return
+
+    queue.enqueue(
+        reencode_video,
+        video.id,
+        video.video_file.name,
+        job_id=f"reencode-{content_hash}",
+        job_timeout=get_job_timeout(video.duration) * REENCODE_TIMEOUT_FACTOR,
+    )
+    debug(f"Queued re-encode of {content_hash} ({output_profile} → "
+          f"{resolve_profile_name(video.encoding_profile)})")
+
+
+def reencode_video(video_id: int, video_file_path: str) -> None:
+    """
+    Encode the published video renditions again with the video's own
+    (slow, compact) profile and swap them in atomically. Audio, poster
+    and trickplay of the first pass are kept. On failure the first pass
+    simply stays published.
+    """
+    video = Video.objects.get(id=video_id)
+    profile = resolve_profile_name(video.encoding_profile)
+    if get_output_profile(video.content_hash) == profile:
+        return
+
+    renditions = {
+        name: size
+        for name, size in build_ladder(video.width, video.height).items()
+        if has_rendition(video.content_hash, name)
+    }
+    input_path = os.path.join(settings.MEDIA_ROOT, video_file_path)
+    analyze_complexity(video, input_path)
+    staging_dir = get_scratch_dir(f"{video.content_hash}.reencode")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    prepare_output_dirs(staging_dir, renditions, False)
+
+    debug(f"Re-encoding {video.content_hash} with {profile}")
+    with cpu_slots() as threads, track_stage(
+        "reencode", video_id, video.content_hash,
+        part=", ".join(renditions), source_seconds=video.duration,
+    ) as record:
+        run_ffmpeg_command(build_hls_command(
+            input_path, staging_dir, renditions, False,
+            profile=profile,
+            threads=threads,
+            overrides=get_title_overrides(video),
+        ))
+        record.outputs = measure_outputs(staging_dir, renditions)
+
+    with output_lock(video.content_hash):
+        output_dir = copy_published_output(video.content_hash)
+        for name in renditions:
+            shutil.rmtree(os.path.join(output_dir, name), ignore_errors=True)
+            shutil.move(
+                os.path.join(staging_dir, name),
+                os.path.join(output_dir, name),
+            )
+        write_output_profile(output_dir, profile)
+        write_hls_master(
+            output_dir,
+            build_ladder(video.width, video.height),
+            video.has_audio,
+        )
+        publish_output_dir(output_dir, video.content_hash)
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    debug(f"Re-encode of {video.content_hash} published")
+
+
+def request_retranscode(video_ids) -> int:
+    """
+    Add videos to the re-transcode backlog and start as many of them as
+    RETRANSCODE_MAX_IN_FLIGHT allows. The rest are started one by one as
+    the running jobs finish.
+    """
+    video_ids = list(video_ids)
+    if video_ids:
+        connection = django_rq.get_queue(REENCODE_QUEUE).connection
+        connection.rpush(RETRANSCODE_BACKLOG_KEY, *video_ids)
+    feed_retranscodes()
+    return len(video_ids)
+
+
+def get_retranscode_backlog() -> tuple:
+    """
+    (waiting, in flight) re-transcodes.
+    """
+    connection = django_rq.get_queue(REENCODE_QUEUE).connection
+    return (
+        connection.llen(RETRANSCODE_BACKLOG_KEY),
+        connection.scard(RETRANSCODE_IN_FLIGHT_KEY),
+    )
+
+
+def clear_retranscode_backlog() -> int:
+    """
+    Drop the videos still waiting; jobs in flight finish normally.
+    """
+    connection = django_rq.get_queue(REENCODE_QUEUE).connection
+    waiting = connection.llen(RETRANSCODE_BACKLOG_KEY)
+    connection.delete(RETRANSCODE_BACKLOG_KEY)
+    return waiting
+
+
+def feed_retranscodes() -> int:
+    """
+    Top the in-flight set up to RETRANSCODE_MAX_IN_FLIGHT from the
+    backlog. Jobs that are gone or no longer active (a killed worker,
+    an expired result) are dropped from the set first, so a lost
+    callback cannot block the backlog. Returns the number of jobs
+    started.
+    """
+    queue = django_rq.get_queue(REENCODE_QUEUE)
+    connection = queue.connection
+    started = 0
+
+    with connection.lock("videoflix:retranscode-lock", timeout=60):
+        for job_id in connection.smembers(RETRANSCODE_IN_FLIGHT_KEY):
+            job = queue.fetch_job(job_id.decode())
+            if job is None or job.get_status() not in ACTIVE_JOB_STATUSES:
+                connection.srem(RETRANSCODE_IN_FLIGHT_KEY, job_id)
+
+        while (
+            connection.scard(RETRANSCODE_IN_FLIGHT_KEY)
+            < settings.RETRANSCODE_MAX_IN_FLIGHT
+        ):
+            video_id = connection.lpop(RETRANSCODE_BACKLOG_KEY)
+            if video_id is None:
+                break
+            job = start_retranscode(int(video_id))
+            if job is not None:
+                connection.sadd(RETRANSCODE_IN_FLIGHT_KEY, job.id)
+                started += 1
+
+    return started
+
+
+def release_retranscode(job, connection, *args) -> None:
+    """
+    Success and failure callback of re-transcode jobs: free the slot
+    and start the next video of the backlog.
+    """
+    connection.srem(RETRANSCODE_IN_FLIGHT_KEY, job.id)
+    feed_retranscodes()
+
+
+def start_retranscode(video_id: int):
+    """
+    Enqueue the re-transcode of one video on the REENCODE_QUEUE, so new
+    uploads always go first. Videos without a published output take the
+    regular ingest path. Returns the job, or None if there is nothing to
+    do or the content is being encoded already.
+    """
+    video = Video.objects.filter(id=video_id).first()
+    if video is None or not video.video_file:
+        return None
+
+    queue = django_rq.get_queue(REENCODE_QUEUE)
+    callbacks = {
+        "on_success": Callback(release_retranscode),
+        "on_failure": Callback(release_retranscode),
+    }
+
+    if not video.content_hash or not has_content_output(video.content_hash):
+        set_status(video.id, "queued", stage="re-transcode")
+        return queue.enqueue(
+            ingest_video,
+            video.id,
+            video.video_file.name,
+            job_id=f"ingest-{video.id}",
+            job_timeout=settings.VIDEO_INGEST_TIMEOUT,
+            **callbacks,
+        )
+
+    job_id = f"retranscode-{video.content_hash}"
+    job = queue.fetch_job(job_id)
+    if (
+        (job is not None and job.get_status() in ACTIVE_JOB_STATUSES)
+        or active_transcode_job(video.content_hash) is not None
+    ):
+        return None
+
+    return queue.enqueue(
+        retranscode_video,
+        video.id,
+        video.video_file.name,
+        job_id=job_id,
+        job_timeout=get_job_timeout(video.duration) * REENCODE_TIMEOUT_FACTOR,
+        **callbacks,
+    )
+
+
+def retranscode_video(video_id: int, video_file_path: str) -> None:
+    """
+    Run the whole processing again for published content, e.g. after a
+    ladder or profile change: probe, per-title analysis, all eager
+    renditions with the video's own profile, trickplay, poster and
+    preview clip. The new output replaces the old one atomically; until
+    then the old one stays online.
+    """
+    input_path = os.path.join(settings.MEDIA_ROOT, video_file_path)
+    video = store_media_metadata(video_id, input_path)
+    video.encoding_ladder = None
+    video.save(update_fields=["encoding_ladder"])
+    analyze_complexity(video, input_path)
+
+    renditions = build_ladder(video.width, video.height)
+    encoded = get_eager_renditions(renditions)
+    tile_size = get_trickplay_size(renditions)
+    profile = resolve_profile_name(video.encoding_profile)
+    staging_dir = get_scratch_dir(f"{video.content_hash}.retranscode")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    prepare_output_dirs(staging_dir, encoded, video.has_audio)
+    os.makedirs(os.path.join(staging_dir, TRICKPLAY_DIR))
+
+    debug(f"Re-transcoding {video.content_hash} with {profile}")
+    try:
+        with cpu_slots() as threads, track_stage(
+            "retranscode", video_id, video.content_hash,
+            part=", ".join(encoded), source_seconds=video.duration,
+        ) as record:
+            run_ffmpeg_command(build_hls_command(
+                input_path, staging_dir, encoded, video.has_audio, tile_size,
+                profile, threads, get_title_overrides(video),
+            ))
+            record.outputs = measure_outputs(
+                staging_dir, [*encoded, AUDIO_RENDITION]
+            )
+
+        write_output_profile(staging_dir, profile)
+        write_hls_master(staging_dir, renditions, video.has_audio)
+        write_trickplay_track(
+            staging_dir, [(SPRITE_PREFIX, 0, video.duration)], tile_size
+        )
+        publish_poster(
+            video.content_hash, input_path, video.duration, video_id=video_id
+        )
+        publish_preview_clip(video.content_hash, input_path, video_id=video_id)
+
+        with output_lock(video.content_hash):
+            publish_output_dir(staging_dir, video.content_hash)
+        publish_content(video.content_hash)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
 
-    debug(f"Thumbnail URL saved: {video.thumbnail_url}")
+    debug(f"Re-transcode of {video.content_hash} published")
@@ -0,0 +1,197 @@
+import contextlib
+import hashlib
+import os
+import time
+import pytest
+from video_app import storage, tasks
+from video_app.models import Video
+from video_app.progress import get_status, set_status
+from video_app.storage import (
+    get_content_dir,
+    get_scratch_dir,
+    get_store_root,
+    get_video_hls_dir,
+    hash_file,
+    link_video_output,
+    publish_output_dir,
+)
+
+
+class FakeJob:
+    def __init__(self, job_id, status):
+        self.id = job_id
+        self.status = status
+
+    def get_status(self):
+        return self.status
+
+
+class FakeConnection:
+    def lock(self, name, timeout):
+        return contextlib.nullcontext()
+
+
+class FakeQueue:
+    connection = FakeConnection()
+
+    def __init__(self, jobs=None):
+        self.jobs = jobs or {}
+        self.enqueued = []
+
+    def fetch_job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def enqueue(self, func, *args, **kwargs):
+        self.enqueued.append((func, args, kwargs))
+
+
+class TestContentStore:
+
+    def test_hash_file(self, tmp_path):
+        path = tmp_path / "source.mp4"
+        path.write_bytes(b"video" * 1000)
+
+        assert hash_file(path) == hashlib.sha256(b"video" * 1000).hexdigest()
+
+    def test_link_replaces_old_output(self, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        os.makedirs(os.path.join(get_content_dir("abc"), "480p"))
+        os.makedirs(os.path.join(get_video_hls_dir(1), "480p"))
+
+        link_video_output(1, "abc")
+
+        assert os.path.islink(get_video_hls_dir(1))
+        assert os.path.realpath(get_video_hls_dir(1)) == os.path.realpath(
+            get_content_dir("abc")
+        )
+
+
+@pytest.mark.django_db
+class TestTranscodeCoalescing:
+
+    def make_video(self):
+        return Video.objects.create(
+            title="T", description="D", category="c", content_hash="abc"
+        )
+
+    def test_first_upload_enqueues_with_content_job_id(self, monkeypatch):
+        queue = FakeQueue()
+        monkeypatch.setattr(tasks.django_rq, "get_queue", lambda name: queue)
+
+        tasks.enqueue_transcode(self.make_video(), "videos/a.mp4")
+
+        assert len(queue.enqueued) == 1
+        assert queue.enqueued[0][2]["job_id"] == "transcode-abc"
+
+    def test_fast_worker_status_is_not_overwritten(self, monkeypatch):
+        video = self.make_video()
+
+        class SyncQueue(FakeQueue):
+            def enqueue(self, func, *args, **kwargs):
+                super().enqueue(func, *args, **kwargs)
+                set_status(video.id, "ready")
+
+        queue = SyncQueue()
+        monkeypatch.setattr(tasks.django_rq, "get_queue", lambda name: queue)
+
+        tasks.enqueue_transcode(video, "videos/a.mp4")
+
+        assert get_status(video.id)["status"] == "ready"
+
+    def test_duplicate_joins_running_job(self, monkeypatch):
+        queue = FakeQueue({"transcode-abc": FakeJob("transcode-abc", "started")})
+        monkeypatch.setattr(tasks.django_rq, "get_queue", lambda name: queue)
+
+        tasks.enqueue_transcode(self.make_video(), "videos/b.mp4")
+
+        assert queue.enqueued == []
+
+    def stitch_job(self, queue, monkeypatch, chunk_status):
+        stitch = FakeJob("stitch-abc", "deferred")
+        stitch.dependency_ids = ["chunk-1"]
+        stitch.connection = queue.connection
+        stitch.delete = lambda: queue.jobs.pop("stitch-abc")
+        queue.jobs["stitch-abc"] = stitch
+        monkeypatch.setattr(
+            tasks.Job, "fetch_many",
+            lambda ids, connection: [FakeJob("chunk-1", chunk_status)],
+        )
+        monkeypatch.setattr(tasks.django_rq, "get_queue", lambda name: queue)
+
+    def test_waiting_stitch_job_is_joined(self, monkeypatch):
+        queue = FakeQueue()
+        self.stitch_job(queue, monkeypatch, "started")
+
+        tasks.enqueue_transcode(self.make_video(), "videos/b.mp4")
+
+        assert queue.enqueued == []
+
+    def test_stitch_job_of_a_failed_chunk_does_not_block(self, monkeypatch):
+        queue = FakeQueue()
+        self.stitch_job(queue, monkeypatch, "failed")
+
+        tasks.enqueue_transcode(self.make_video(), "videos/b.mp4")
+
+        assert queue.enqueued[0][2]["job_id"] == "transcode-abc"
+        assert "stitch-abc" not in queue.jobs
+
+    def test_finished_job_does_not_block(self, monkeypatch):
+        queue = FakeQueue({"transcode-abc": FakeJob("transcode-abc", "failed")})
+        monkeypatch.setattr(tasks.django_rq, "get_queue", lambda name: queue)
+
+        tasks.enqueue_transcode(self.make_video(), "videos/b.mp4")
+
+        assert len(queue.enqueued) == 1
+
+
+class TestAtomicPublish:
+
+    def make_tree(self, base, content):
+        os.makedirs(os.path.join(base, "480p"))
+        with open(os.path.join(base, "master.m3u8"), "w") as f:
+            f.write(content)
+
+    def test_publish_and_replace(self, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path / "media"
+        settings.HLS_SCRATCH_ROOT = tmp_path / "scratch"
+        os.makedirs(settings.MEDIA_ROOT)
+
+        self.make_tree(get_scratch_dir("abc"), "first")
+        publish_output_dir(get_scratch_dir("abc"), "abc")
+        first_version = os.path.realpath(get_content_dir("abc"))
+
+        self.make_tree(get_scratch_dir("abc"), "second")
+        publish_output_dir(get_scratch_dir("abc"), "abc")
+
+        assert os.path.islink(get_content_dir("abc"))
+        with open(os.path.join(get_content_dir("abc"), "master.m3u8")) as f:
+            assert f.read() == "second"
+        assert not os.path.exists(first_version)
+        assert not os.path.exists(get_scratch_dir("abc"))
+
+    def test_replaced_version_is_kept_for_the_grace_period(
+        self, settings, tmp_path, monkeypatch
+    ):
+        settings.MEDIA_ROOT = tmp_path / "media"
+        settings.HLS_SCRATCH_ROOT = tmp_path / "scratch"
+        settings.HLS_VERSION_GRACE_PERIOD = 60
+        os.makedirs(settings.MEDIA_ROOT)
+        self.make_tree(get_scratch_dir("abc"), "first")
+        publish_output_dir(get_scratch_dir("abc"), "abc")
+        first_version = os.path.basename(os.path.realpath(get_content_dir("abc")))
+        retired = os.path.join(
+            get_store_root(), "versions", ".retired", first_version
+        )
+
+        self.make_tree(get_scratch_dir("abc"), "second")
+        publish_output_dir(get_scratch_dir("abc"), "abc")
+
+        with open(os.path.join(retired, "master.m3u8")) as f:
+            assert f.read() == "first"
+
+        now = time.time()
+        monkeypatch.setattr(storage.time, "time", lambda: now + 61)
+        self.make_tree(get_scratch_dir("abc"), "third")
+        publish_output_dir(get_scratch_dir("abc"), "abc")
+
+        assert not os.path.exists(retired)
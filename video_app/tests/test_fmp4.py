@@ -0,0 +1,165 @@
+import os
+import pytest
+from video_app import playlists
+from video_app.storage import (
+    get_content_dir,
+    link_video_output,
+    publish_output_dir,
+)
+from video_app.tasks import build_hls_command, build_ladder
+
+FMP4_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:7
+#EXT-X-TARGETDURATION:4
+#EXT-X-MAP:URI="media.mp4",BYTERANGE="800@0"
+#EXTINF:4.000000,
+#EXT-X-BYTERANGE:400000@800
+media.mp4
+#EXTINF:2.000000,
+#EXT-X-BYTERANGE:100000
+media.mp4
+#EXT-X-ENDLIST
+"""
+
+
+def fake_ffprobe(path):
+    return {"streams": [{
+        "codec_type": "video",
+        "profile": "High",
+        "level": 31,
+        "width": 1280,
+        "height": 720,
+        "avg_frame_rate": "25/1",
+    }]}
+
+
+class TestFmp4Output:
+
+    def test_single_file_fmp4_command(self, settings):
+        settings.HLS_SEGMENT_TYPE = "fmp4"
+        command = build_hls_command(
+            "/in/source.mp4", "/out", build_ladder(1280, 720), with_audio=True
+        )
+
+        assert command[command.index("-hls_segment_type") + 1] == "fmp4"
+        assert command[command.index("-hls_flags") + 1] == "single_file"
+        assert "/out/%v/media.mp4" in command
+
+    def test_byterange_playlist(self, tmp_path):
+        path = tmp_path / "index.m3u8"
+        path.write_text(FMP4_PLAYLIST)
+
+        playlist = playlists.read_media_playlist(path)
+
+        assert playlist["init"] == {"uri": "media.mp4", "offset": 0, "length": 800}
+        assert playlist["segments"][1] == {
+            "duration": 2.0, "uri": "media.mp4",
+            "offset": 400_800, "length": 100_000,
+        }
+
+    def test_dash_manifest_uses_hls_byte_ranges(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(playlists, "run_ffprobe", fake_ffprobe)
+        os.makedirs(tmp_path / "720p")
+        (tmp_path / "720p" / "index.m3u8").write_text(FMP4_PLAYLIST)
+
+        master = playlists.write_master_playlist(tmp_path, ["720p"])
+        manifest = playlists.write_dash_manifest(tmp_path, ["720p"])
+
+        with open(master) as f:
+            assert "#EXT-X-VERSION:7" in f.read()
+        with open(manifest) as f:
+            content = f.read()
+        assert 'mediaPresentationDuration="PT6.000S"' in content
+        assert "<BaseURL>720p/media.mp4</BaseURL>" in content
+        assert '<Initialization range="0-799" />' in content
+        assert '<S d="4000" t="0" />' in content
+        assert '<SegmentURL mediaRange="800-400799" />' in content
+        assert 'codecs="avc1.64001f"' in content
+
+
+@pytest.mark.django_db
+class TestByteRangeServing:
+
+    def make_media(self, tmp_path):
+        base = os.path.join(tmp_path, "hls", "1", "720p")
+        os.makedirs(base)
+        with open(os.path.join(base, "media.mp4"), "wb") as f:
+            f.write(bytes(range(100)))
+
+    def test_full_file(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        self.make_media(tmp_path)
+
+        response = client.get("/api/video/1/720p/media.mp4")
+
+        assert response.status_code == 200
+        assert response["Accept-Ranges"] == "bytes"
+
+    def test_partial_content(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        self.make_media(tmp_path)
+
+        response = client.get(
+            "/api/video/1/720p/media.mp4", HTTP_RANGE="bytes=10-19"
+        )
+
+        assert response.status_code == 206
+        assert response["Content-Range"] == "bytes 10-19/100"
+        assert b"".join(response.streaming_content) == bytes(range(10, 20))
+
+    def test_suffix_range(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        self.make_media(tmp_path)
+
+        response = client.get(
+            "/api/video/1/720p/media.mp4", HTTP_RANGE="bytes=-5"
+        )
+
+        assert response["Content-Range"] == "bytes 95-99/100"
+
+    def test_unsatisfiable_range(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        self.make_media(tmp_path)
+
+        response = client.get(
+            "/api/video/1/720p/media.mp4", HTTP_RANGE="bytes=200-"
+        )
+
+        assert response.status_code == 416
+        assert response["Content-Range"] == "bytes */100"
+
+
+@pytest.mark.django_db
+class TestVersionedMedia:
+
+    def publish(self, tmp_path, content):
+        staging_dir = tmp_path / "scratch" / "abc"
+        os.makedirs(staging_dir / "720p")
+        (staging_dir / "720p" / "index.m3u8").write_text(FMP4_PLAYLIST)
+        (staging_dir / "720p" / "media.mp4").write_bytes(content)
+        publish_output_dir(str(staging_dir), "abc")
+        with open(os.path.join(get_content_dir("abc"), "720p", "index.m3u8")) as f:
+            return f.read()
+
+    def test_replaced_media_stays_reachable(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path / "media"
+        os.makedirs(settings.MEDIA_ROOT)
+        first_playlist = self.publish(tmp_path, b"first pass")
+        link_video_output(1, "abc")
+        second_playlist = self.publish(tmp_path, b"re-encode")
+
+        old_uri = first_playlist.splitlines()[-2]
+        new_uri = second_playlist.splitlines()[-2]
+        assert old_uri.startswith("media.mp4?v=") and old_uri != new_uri
+        assert 'URI="media.mp4?v=' in second_playlist
+
+        old = client.get(f"/api/video/1/720p/{old_uri}")
+        new = client.get(f"/api/video/1/720p/{new_uri}")
+        gone = client.get("/api/video/1/720p/media.mp4?v=000000000000")
+
+        assert b"".join(old.streaming_content) == b"first pass"
+        assert b"".join(new.streaming_content) == b"re-encode"
+        assert gone.status_code == 404
+        assert playlists.read_segments(
+            os.path.join(get_content_dir("abc"), "720p", "index.m3u8")
+        )[0]["uri"] == "media.mp4"
@@ -0,0 +1,65 @@
+from video_app.tasks import (
+    build_chunk_command,
+    build_hls_command,
+    build_ladder,
+    build_stitch_command,
+)
+
+RENDITIONS = build_ladder(1920, 1080)
+
+
+class TestBuildHLSCommand:
+
+    def test_single_ffmpeg_run_for_all_renditions(self):
+        command = build_hls_command(
+            "/in/source.mp4", "/out/hls/1", RENDITIONS, with_audio=True
+        )
+
+        assert command.count("-i") == 1
+        graph = command[command.index("-filter_complex") + 1]
+        assert graph.startswith("[0:v]split=3[v0][v1][v2]")
+        assert "[v2]scale=1920:1080,format=yuv420p[v2out]" in graph
+
+        stream_map = command[command.index("-var_stream_map") + 1]
+        assert stream_map == (
+            "a:0,agroup:audio,name:audio "
+            "v:0,agroup:audio,name:480p "
+            "v:1,agroup:audio,name:720p "
+            "v:2,agroup:audio,name:1080p"
+        )
+        assert command.count("0:a:0") == 1
+        assert command[-1] == "/out/hls/1/%v/index.m3u8"
+
+    def test_without_audio(self):
+        command = build_hls_command(
+            "/in/source.mp4", "/out/hls/1", RENDITIONS, with_audio=False
+        )
+
+        assert "0:a:0" not in command
+        stream_map = command[command.index("-var_stream_map") + 1]
+        assert "agroup" not in stream_map
+
+
+class TestSplitTranscodeCommands:
+
+    def test_chunk_is_encoded_into_every_rendition(self):
+        command = build_chunk_command(
+            "/work/source/0003.mp4", "/work", "0003.mp4", RENDITIONS
+        )
+
+        assert command.count("-i") == 1
+        assert "/work/480p/0003.mp4" in command
+        assert "/work/1080p/0003.mp4" in command
+
+    def test_stitch_copies_video_and_encodes_audio_once(self):
+        concat_lists = {
+            res_name: f"/work/{res_name}.txt" for res_name in RENDITIONS
+        }
+        command = build_stitch_command(
+            concat_lists, "/in/source.mp4", "/out/hls/1", with_audio=True
+        )
+
+        assert command.count("concat") == 3
+        assert command[command.index("-c:v") + 1] == "copy"
+        assert "3:a:0" in command
+        assert command[-1] == "/out/hls/1/%v/index.m3u8"
@@ -0,0 +1,98 @@
+import os
+import pytest
+from django.core.management import call_command
+from video_app.management.commands import ingest_videos
+from video_app.models import Video
+from video_app.progress import get_status
+from video_app.tests.test_dedup import FakeQueue
+
+
+class BulkQueue(FakeQueue):
+
+    def enqueue_many(self, job_datas):
+        self.enqueued += [data.job_id for data in job_datas]
+        self.jobs.update({data.job_id: object() for data in job_datas})
+
+
+@pytest.mark.django_db
+class TestIngestVideosCommand:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = self.media_root = tmp_path / "media"
+        self.library = tmp_path / "library"
+        os.makedirs(self.library / "season1")
+        for name in ("intro_clip.mp4", "season1/e01.mkv", "cover.jpg"):
+            (self.library / name).write_bytes(b"video")
+
+        self.queue = BulkQueue()
+        monkeypatch.setattr(
+            ingest_videos.django_rq, "get_queue", lambda name: self.queue
+        )
+        monkeypatch.setattr(
+            ingest_videos.Job, "fetch_many",
+            lambda job_ids, connection: [self.queue.jobs.get(j) for j in job_ids],
+        )
+
+    def test_directory_import(self):
+        call_command("ingest_videos", str(self.library), "--rate", "0")
+
+        videos = Video.objects.order_by("video_file")
+        assert [v.video_file.name for v in videos] == [
+            "videos/intro_clip.mp4", "videos/season1/e01.mkv",
+        ]
+        assert videos[0].title == "Intro Clip"
+        assert sorted(self.queue.enqueued) == [
+            f"ingest-{v.id}" for v in Video.objects.order_by("id")
+        ]
+        assert get_status(videos[0].id)["status"] == "queued"
+
+    def test_manifest_import(self):
+        manifest = self.library / "manifest.csv"
+        manifest.write_text(
+            "file,title,category\nintro_clip.mp4,Welcome,trailer\n"
+        )
+
+        call_command("ingest_videos", str(manifest), "--rate", "0")
+
+        video = Video.objects.get()
+        assert (video.title, video.category) == ("Welcome", "trailer")
+
+    def test_same_named_files_of_different_folders(self):
+        os.makedirs(self.library / "season2")
+        (self.library / "season2" / "e01.mkv").write_bytes(b"other")
+
+        call_command("ingest_videos", str(self.library), "--rate", "0")
+
+        assert sorted(
+            Video.objects.values_list("video_file", flat=True)
+        ) == [
+            "videos/intro_clip.mp4",
+            "videos/season1/e01.mkv",
+            "videos/season2/e01.mkv",
+        ]
+        stored = self.media_root / "videos" / "season2" / "e01.mkv"
+        assert stored.read_bytes() == b"other"
+
+    def test_manifest_duplicates_are_reported(self, tmp_path, capsys):
+        other = tmp_path / "other"
+        os.makedirs(other)
+        (other / "intro_clip.mp4").write_bytes(b"video")
+        manifest = self.library / "manifest.csv"
+        manifest.write_text(f"file\nintro_clip.mp4\n{other}/intro_clip.mp4\n")
+
+        call_command("ingest_videos", str(manifest), "--rate", "0")
+
+        assert Video.objects.count() == 1
+        assert f"Skipped {other}/intro_clip.mp4" in capsys.readouterr().err
+
+    def test_rerun_skips_imported_and_resumes_unqueued(self):
+        call_command("ingest_videos", str(self.library), "--rate", "0")
+        lost = Video.objects.first()
+        del self.queue.jobs[f"ingest-{lost.id}"]
+        self.queue.enqueued = []
+
+        call_command("ingest_videos", str(self.library), "--rate", "0")
+
+        assert Video.objects.count() == 2
+        assert self.queue.enqueued == [f"ingest-{lost.id}"]
@@ -0,0 +1,90 @@
+import types
+import pytest
+from video_app.jobstats import (
+    record_child_usage,
+    summarize_renditions,
+    summarize_stages,
+    track_stage,
+)
+from video_app.models import TranscodeJob
+
+
+def make_job(stage, status="succeeded", **fields):
+    return TranscodeJob.objects.create(
+        stage=stage, status=status, content_hash="abc", **fields
+    )
+
+
+@pytest.mark.django_db
+class TestStageTracking:
+
+    def test_successful_stage_is_recorded(self):
+        with track_stage(
+            "encode", content_hash="abc", source_seconds=60
+        ) as record:
+            record_child_usage(types.SimpleNamespace(ru_maxrss=2048))
+            record.outputs = {"480p": 1000, "720p": 3000}
+
+        job = TranscodeJob.objects.get()
+        assert job.status == "succeeded"
+        assert job.peak_rss_kb == 2048
+        assert job.output_bytes == 4000
+        assert job.wall_seconds >= 0 and job.cpu_seconds >= 0
+        assert job.finished_at is not None
+
+    def test_failed_stage_keeps_the_error_tail(self):
+        with pytest.raises(RuntimeError):
+            with track_stage("thumbnail", content_hash="abc"):
+                raise RuntimeError("FFmpeg failed\n" + "x" * 5000 + "end")
+
+        job = TranscodeJob.objects.get()
+        assert job.status == "failed"
+        assert job.error.endswith("end")
+        assert len(job.error) == 4000
+
+
+@pytest.mark.django_db
+class TestTranscodeAnalytics:
+
+    def test_stage_throughput_and_failure_rate(self):
+        make_job("encode", source_seconds=120, wall_seconds=60, cpu_seconds=240)
+        make_job("encode", source_seconds=60, wall_seconds=30, cpu_seconds=120)
+        make_job("encode", status="failed", wall_seconds=10, cpu_seconds=40)
+        make_job("encode", status="running")
+
+        row = summarize_stages(TranscodeJob.objects.all())[0]
+
+        assert (row["count"], row["failed"], row["failure_rate"]) == (3, 1, 33.3)
+        assert row["seconds_per_minute"] == 30.0
+        assert row["cores"] == 4.0
+
+    def test_rendition_bitrate_and_cost(self):
+        make_job("encode", source_seconds=100, outputs={"480p": 10_000_000})
+        make_job(
+            "rendition", part="1080p", source_seconds=60, wall_seconds=90,
+            outputs={"1080p": 30_000_000},
+        )
+
+        rows = {
+            row["rendition"]: row
+            for row in summarize_renditions(TranscodeJob.objects.all())
+        }
+
+        assert rows["480p"] == {
+            "rendition": "480p", "kbps": 800, "seconds_per_minute": None,
+        }
+        assert rows["1080p"]["kbps"] == 4000
+        assert rows["1080p"]["seconds_per_minute"] == 90.0
+
+    def test_admin_view(self, admin_client):
+        make_job("encode", source_seconds=60, wall_seconds=30, node="node-1")
+
+        changelist = admin_client.get("/admin/video_app/transcodejob/")
+        response = admin_client.get(
+            "/admin/video_app/transcodejob/analytics/?days=30"
+        )
+
+        assert b"analytics/" in changelist.content
+        assert response.status_code == 200
+        assert b"node-1" in response.content
+        assert response.context["stages"][0]["stage"] == "encode"
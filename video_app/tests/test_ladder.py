@@ -0,0 +1,67 @@
+from video_app import probe
+from video_app.tasks import build_ladder
+
+
+class TestBuildLadder:
+
+    def test_full_hd_source_gets_all_renditions(self):
+        assert build_ladder(1920, 1080) == {
+            "480p": "854x480",
+            "720p": "1280x720",
+            "1080p": "1920x1080",
+        }
+
+    def test_never_upscales(self):
+        assert list(build_ladder(1280, 720)) == ["480p", "720p"]
+
+    def test_portrait_keeps_aspect_ratio(self):
+        assert build_ladder(1080, 1920) == {
+            "480p": "480x854",
+            "720p": "720x1280",
+            "1080p": "1080x1920",
+        }
+
+    def test_scope_film_gets_its_full_size(self):
+        assert build_ladder(1920, 800) == {
+            "480p": "854x356",
+            "720p": "1280x534",
+            "1080p": "1920x800",
+        }
+        assert build_ladder(3840, 1600)["1080p"] == "1920x800"
+
+    def test_narrow_sources_are_limited_by_height(self):
+        assert build_ladder(1440, 1080) == {
+            "480p": "640x480",
+            "720p": "960x720",
+            "1080p": "1440x1080",
+        }
+
+    def test_small_source_gets_single_rendition(self):
+        assert build_ladder(640, 360) == {"360p": "640x360"}
+
+
+class TestProbeVideo:
+
+    def test_rotated_phone_clip(self, monkeypatch):
+        monkeypatch.setattr(probe, "run_ffprobe", lambda path: {
+            "format": {"duration": "12.5"},
+            "streams": [
+                {
+                    "codec_type": "video",
+                    "codec_name": "h264",
+                    "width": 1920,
+                    "height": 1080,
+                    "avg_frame_rate": "30000/1001",
+                    "side_data_list": [{"rotation": -90}],
+                },
+            ],
+        })
+
+        assert probe.probe_video("clip.mp4") == {
+            "width": 1080,
+            "height": 1920,
+            "frame_rate": 29.97,
+            "duration": 12.5,
+            "video_codec": "h264",
+            "audio_codec": "",
+        }
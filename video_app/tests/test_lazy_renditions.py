@@ -0,0 +1,150 @@
+import os
+from datetime import timedelta
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from video_app import tasks
+from video_app.models import RenditionUsage, Video
+from video_app.playlists import estimate_variant
+from video_app.storage import (
+    get_content_dir,
+    has_rendition,
+    link_video_output,
+    publish_output_dir,
+)
+from video_app.tests.test_dedup import FakeQueue
+
+
+def write_master(output_dir, *args):
+    os.makedirs(output_dir, exist_ok=True)
+    open(os.path.join(output_dir, "master.m3u8"), "w").close()
+
+
+def write_rendition(output_dir, name):
+    os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+    with open(os.path.join(output_dir, name, "index.m3u8"), "w") as f:
+        f.write(f"#EXTM3U\n{name}\n")
+
+
+@pytest.mark.django_db
+class TestLazyRenditions:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path / "media"
+        settings.HLS_SCRATCH_ROOT = tmp_path / "scratch"
+        settings.HLS_LAZY_RENDITIONS = True
+        settings.FFMPEG_SLOTS_PER_JOB = 0
+        self.tmp_path = tmp_path
+        self.queue = FakeQueue()
+        monkeypatch.setattr(
+            tasks.django_rq, "get_queue", lambda name: self.queue
+        )
+        monkeypatch.setattr(tasks, "write_hls_master", write_master)
+        self.video = Video.objects.create(
+            title="T", description="D", category="c",
+            video_file="videos/a.mp4", width=1920, height=1080, duration=60,
+            video_codec="h264", content_hash="abc",
+        )
+
+    def publish(self, *names):
+        staging_dir = os.path.join(self.tmp_path, "staging")
+        write_master(staging_dir)
+        for name in names:
+            write_rendition(staging_dir, name)
+        publish_output_dir(staging_dir, "abc")
+        link_video_output(self.video.id, "abc")
+
+    def test_upload_encodes_only_the_lowest_rendition(self, monkeypatch):
+        commands = []
+        monkeypatch.setattr(
+            tasks, "run_ffmpeg_command",
+            lambda command, on_progress=None: commands.append(command),
+        )
+        monkeypatch.setattr(tasks, "finish_content", lambda *args: None)
+
+        tasks.convert_video_to_hls(self.video.id, "videos/a.mp4")
+
+        stream_map = commands[0][commands[0].index("-var_stream_map") + 1]
+        assert stream_map == "v:0,name:480p"
+
+    def test_pending_rendition_bandwidth_is_estimated(self):
+        reference = {
+            "name": "480p", "resolution": "854x480", "codecs": "avc1.64001f",
+            "bandwidth": 1_000_000, "average_bandwidth": 800_000,
+        }
+
+        variant = estimate_variant(reference, "960p", "1708x960")
+
+        assert variant["name"] == "960p"
+        assert variant["bandwidth"] == 4_000_000
+        assert variant["average_bandwidth"] == 3_200_000
+        assert variant["codecs"] == "avc1.640028"
+
+    def test_pending_rendition_gets_the_level_of_its_size(self):
+        reference = {
+            "name": "480p", "resolution": "854x480", "codecs": "avc1.64001e",
+            "frame_rate": 25.0, "bandwidth": 1_000_000,
+            "average_bandwidth": 800_000,
+        }
+
+        assert estimate_variant(
+            reference, "720p", "1280x720"
+        )["codecs"] == "avc1.64001f"
+        assert estimate_variant(
+            reference, "1080p", "1920x1080"
+        )["codecs"] == "avc1.640028"
+
+    def test_missing_playlist_redirects_to_lowest(self, client):
+        self.publish("480p")
+
+        response = client.get(f"/api/video/{self.video.id}/1080p/index.m3u8")
+
+        assert response.status_code == 302
+        assert response["Location"] == f"/api/video/{self.video.id}/480p/index.m3u8"
+        assert self.queue.enqueued[0][2]["job_id"] == "rendition-abc-1080p"
+
+    def test_view_threshold_requests_every_rendition(self, client, settings):
+        settings.HLS_LAZY_VIEW_THRESHOLD = 2
+        self.publish("480p")
+
+        for _ in range(3):
+            client.get(f"/api/video/{self.video.id}/master.m3u8")
+
+        job_ids = [kwargs["job_id"] for _, _, kwargs in self.queue.enqueued]
+        assert job_ids == ["rendition-abc-720p", "rendition-abc-1080p"]
+
+    def test_rendition_is_added_to_published_output(self, monkeypatch):
+        self.publish("480p")
+        old_version = os.path.realpath(get_content_dir("abc"))
+        monkeypatch.setattr(
+            tasks, "run_ffmpeg_command",
+            lambda command: write_rendition(
+                os.path.dirname(os.path.dirname(command[-1])), "720p"
+            ),
+        )
+
+        tasks.encode_rendition(self.video.id, "videos/a.mp4", "720p")
+
+        assert has_rendition("abc", "480p")
+        assert has_rendition("abc", "720p")
+        assert not os.path.exists(old_version)
+        assert RenditionUsage.objects.filter(name="720p").exists()
+
+    def test_unused_renditions_are_evicted(self):
+        self.publish("480p", "720p", "1080p")
+        RenditionUsage.objects.create(
+            content_hash="abc", name="720p",
+            last_used_at=timezone.now() - timedelta(days=90),
+        )
+        RenditionUsage.objects.create(
+            content_hash="abc", name="1080p", last_used_at=timezone.now(),
+        )
+
+        call_command("evict_renditions", "--days", "30")
+
+        assert not has_rendition("abc", "720p")
+        assert has_rendition("abc", "1080p")
+        assert list(RenditionUsage.objects.values_list("name", flat=True)) == [
+            "1080p"
+        ]
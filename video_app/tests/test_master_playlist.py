@@ -0,0 +1,82 @@
+import os
+import pytest
+from video_app import playlists
+
+
+@pytest.mark.django_db
+class TestMasterPlaylistEndpoint:
+
+    def test_master_not_found(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        response = client.get("/api/video/1/master.m3u8")
+        assert response.status_code == 404
+
+    def test_master_success(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        base = os.path.join(tmp_path, "hls", "1")
+        os.makedirs(base)
+        with open(os.path.join(base, "master.m3u8"), "w") as f:
+            f.write("#EXTM3U\n#EXT-X-MEDIA:TYPE=AUDIO\n")
+
+        response = client.get("/api/video/1/master.m3u8")
+
+        assert response.status_code == 200
+        assert b"#EXT-X-MEDIA" in b"".join(response.streaming_content)
+
+    def test_audio_rendition_playlist(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        base = os.path.join(tmp_path, "hls", "1", "audio")
+        os.makedirs(base)
+        with open(os.path.join(base, "index.m3u8"), "w") as f:
+            f.write("#EXTM3U")
+
+        response = client.get("/api/video/1/audio/index.m3u8")
+
+        assert response.status_code == 200
+
+
+class TestWriteMasterPlaylist:
+
+    def make_rendition(self, base, name, segment_sizes):
+        rendition_dir = os.path.join(base, name)
+        os.makedirs(rendition_dir)
+        lines = ["#EXTM3U", "#EXT-X-TARGETDURATION:4"]
+        for i, size in enumerate(segment_sizes):
+            with open(os.path.join(rendition_dir, f"{i:04d}.ts"), "wb") as f:
+                f.write(b"\0" * size)
+            lines += ["#EXTINF:4.000000,", f"{i:04d}.ts"]
+        lines.append("#EXT-X-ENDLIST")
+        with open(os.path.join(rendition_dir, "index.m3u8"), "w") as f:
+            f.write("\n".join(lines))
+
+    def fake_ffprobe(self, path):
+        if "/audio/" in path:
+            return {"streams": [
+                {"codec_type": "audio", "codec_name": "aac", "profile": "LC"},
+            ]}
+        return {"streams": [{
+            "codec_type": "video",
+            "codec_name": "h264",
+            "profile": "High",
+            "level": 31,
+            "width": 1280,
+            "height": 720,
+            "avg_frame_rate": "25/1",
+        }]}
+
+    def test_measured_values(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(playlists, "run_ffprobe", self.fake_ffprobe)
+        self.make_rendition(tmp_path, "720p", [200_000, 400_000])
+        self.make_rendition(tmp_path, "audio", [50_000, 50_000])
+
+        path = playlists.write_master_playlist(tmp_path, ["720p"], "audio")
+
+        with open(path) as f:
+            content = f.read()
+        assert '#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio"' in content
+        assert (
+            "#EXT-X-STREAM-INF:BANDWIDTH=900000,AVERAGE-BANDWIDTH=700000,"
+            "RESOLUTION=1280x720,FRAME-RATE=25.000,"
+            'CODECS="avc1.64001f,mp4a.40.2",AUDIO="audio"'
+        ) in content
+        assert content.rstrip().endswith("720p/index.m3u8")
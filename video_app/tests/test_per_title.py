@@ -0,0 +1,86 @@
+import pytest
+from video_app import tasks
+from video_app.complexity import build_title_ladder, get_sample_windows
+from video_app.models import Video
+from video_app.profiles import get_profile, resolve_rendition_options
+
+LADDER = {"480p": "854x480", "720p": "1280x720"}
+PROXY_PIXELS = 426 * 240
+
+
+class TestTitleLadder:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings):
+        settings.HLS_PER_TITLE_CRF = 23
+        settings.HLS_PER_TITLE_MAX_CRF = 28
+
+    def test_samples_spread_over_long_sources(self):
+        assert get_sample_windows(12) == [(0.0, 12)]
+        assert [start for start, _ in get_sample_windows(100)] == [
+            8.0, 28.0, 48.0, 68.0, 88.0,
+        ]
+
+    def test_simple_content_gets_a_low_cap(self):
+        ladder = build_title_ladder(0.02, PROXY_PIXELS, LADDER, 25)
+
+        assert ladder["480p"]["crf"] == 23
+        assert ladder["480p"]["bitrate"] < 300
+        assert ladder["480p"]["bitrate"] < ladder["720p"]["bitrate"]
+
+    def test_complex_content_is_capped_with_higher_crf(self):
+        ladder = build_title_ladder(0.5, PROXY_PIXELS, LADDER, 25)
+
+        assert ladder["720p"]["bitrate"] == 2800
+        assert 23 < ladder["720p"]["crf"] <= 28
+
+    def test_overrides_replace_profile_rate_control(self):
+        options = resolve_rendition_options(
+            get_profile("capped"), "720p", {"720p": {"crf": 26, "bitrate": 900}}
+        )
+
+        assert (options["crf"], options["bitrate"]) == (26, 900)
+        assert options["preset"] == "medium"
+
+
+@pytest.mark.django_db
+class TestComplexityAnalysis:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.HLS_SCRATCH_ROOT = tmp_path / "scratch"
+        settings.HLS_PER_TITLE_ENCODING = True
+        self.commands = []
+        monkeypatch.setattr(tasks, "run_ffmpeg_command", self.fake_analysis)
+        self.video = Video.objects.create(
+            title="T", description="D", category="c",
+            width=1280, height=720, frame_rate=25, duration=10,
+            content_hash="abc",
+        )
+
+    def fake_analysis(self, command, on_progress=None):
+        self.commands.append(command)
+        with open(command[-1], "wb") as f:
+            f.write(b"\0" * 6000)
+        on_progress({"frame": "250", "progress": "end"})
+
+    def test_ladder_is_recorded_on_the_video(self):
+        tasks.analyze_complexity(self.video, "/videos/a.mp4")
+
+        self.video.refresh_from_db()
+        ladder = self.video.encoding_ladder
+        assert self.commands[0][self.commands[0].index("-vf") + 1] == (
+            "scale=426:240,format=yuv420p"
+        )
+        assert ladder["complexity"] == round(48000 / (PROXY_PIXELS * 250), 5)
+        assert set(ladder["renditions"]) == {"480p", "720p"}
+        assert tasks.get_title_overrides(self.video)["480p"] == {
+            "crf": 23, "bitrate": ladder["renditions"]["480p"]["bitrate"],
+        }
+
+    def test_recorded_ladder_is_reused(self):
+        self.video.encoding_ladder = {"complexity": 0.1, "renditions": {}}
+
+        tasks.analyze_complexity(self.video, "/videos/a.mp4")
+
+        assert self.commands == []
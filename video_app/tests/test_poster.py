@@ -0,0 +1,81 @@
+import os
+from video_app import tasks
+from video_app.poster import (
+    SCORE_SIZE,
+    build_poster_command,
+    get_candidate_paths,
+    get_candidate_times,
+    score_candidates,
+)
+
+WIDTH, HEIGHT = SCORE_SIZE
+
+
+def make_frame(pixel):
+    return bytes(pixel(x, y) for y in range(HEIGHT) for x in range(WIDTH))
+
+
+BLACK = make_frame(lambda x, y: 4)
+GRAY = make_frame(lambda x, y: 128)
+GRADIENT = make_frame(lambda x, y: 40 + x)
+DETAILED = make_frame(lambda x, y: 40 + x + (40 if (x // 4 + y // 4) % 2 else 0))
+
+
+class TestPosterSelection:
+
+    def test_candidates_skip_start_and_end(self):
+        assert get_candidate_times(100) == [10.0, 26.0, 42.0, 58.0, 74.0, 90.0]
+        assert get_candidate_times(None) == [0.0]
+
+    def test_every_candidate_is_input_seeked(self):
+        command = build_poster_command("/in.mp4", "/work", [1.0, 2.0])
+
+        assert command[2:10] == [
+            "-ss", "1.0", "-i", "/in.mp4", "-ss", "2.0", "-i", "/in.mp4",
+        ]
+
+    def test_black_and_flat_frames_lose(self):
+        scores = score_candidates([BLACK, GRAY, GRADIENT, DETAILED])
+
+        assert scores[0] == scores[1] == 0
+        assert scores[3] > scores[2] > 0
+
+    def test_best_candidate_becomes_the_poster(self, tmp_path, monkeypatch):
+        frames = [BLACK, DETAILED, GRADIENT]
+
+        def fake_grab(command):
+            work_dir = os.path.dirname(command[-1])
+            for i, frame in enumerate(frames):
+                jpg_path, gray_path = get_candidate_paths(work_dir, i)
+                with open(jpg_path, "w") as f:
+                    f.write(f"frame {i}")
+                with open(gray_path, "wb") as f:
+                    f.write(frame)
+
+        monkeypatch.setattr(tasks, "run_ffmpeg_command", fake_grab)
+        monkeypatch.setattr(tasks, "get_candidate_times", lambda d: [1, 2, 3])
+        poster = tmp_path / "poster.jpg"
+
+        tasks.generate_thumbnail("/in.mp4", str(poster), 30)
+
+        assert poster.read_text() == "frame 1"
+        assert os.listdir(tmp_path) == ["poster.jpg"]
+
+    def test_candidates_without_a_frame_are_skipped(self, tmp_path, monkeypatch):
+        def fake_grab(command):
+            work_dir = os.path.dirname(command[-1])
+            jpg_path, gray_path = get_candidate_paths(work_dir, 0)
+            with open(jpg_path, "w") as f:
+                f.write("frame 0")
+            with open(gray_path, "wb") as f:
+                f.write(DETAILED)
+            # the seek of candidate 1 hit the end: a JPEG but no gray frame
+            open(get_candidate_paths(work_dir, 1)[0], "w").close()
+
+        monkeypatch.setattr(tasks, "run_ffmpeg_command", fake_grab)
+        monkeypatch.setattr(tasks, "get_candidate_times", lambda d: [1, 2])
+        poster = tmp_path / "poster.jpg"
+
+        tasks.generate_thumbnail("/in.mp4", str(poster), 30)
+
+        assert poster.read_text() == "frame 0"
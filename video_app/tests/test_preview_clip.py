@@ -0,0 +1,88 @@
+import os
+import pytest
+from video_app import tasks
+from video_app.models import TranscodeJob, Video
+from video_app.preview_clip import (
+    build_preview_clip_command,
+    get_clip_size,
+    get_excerpt_windows,
+)
+
+
+class TestPreviewClipCommand:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings):
+        settings.PREVIEW_CLIP_DURATION = 8
+        settings.PREVIEW_CLIP_EXCERPTS = 4
+        settings.PREVIEW_CLIP_SHORT_SIDE = 240
+        settings.PREVIEW_CLIP_BITRATE = 300
+
+    def test_excerpts_spread_over_the_video(self):
+        assert get_excerpt_windows(6) == [(0.0, 6)]
+        assert get_excerpt_windows(100) == [
+            (10.0, 2.0), (36.0, 2.0), (62.0, 2.0), (88.0, 2.0),
+        ]
+
+    def test_clip_keeps_the_aspect_ratio(self):
+        assert get_clip_size(1920, 1080) == (426, 240)
+        assert get_clip_size(1080, 1920) == (240, 426)
+        assert get_clip_size(320, 180) == (320, 180)
+
+    def test_excerpts_are_input_seeked_and_concatenated(self):
+        command = build_preview_clip_command(
+            "/in.mp4", "/out.mp4", [(10.0, 2.0), (36.0, 2.0)], (426, 240)
+        )
+
+        assert command[2:8] == ["-ss", "10.0", "-t", "2.0", "-i", "/in.mp4"]
+        assert command[command.index("-filter_complex") + 1].endswith(
+            "[v0][v1]concat=n=2:v=1:a=0[clip]"
+        )
+        assert "-an" in command
+        assert command[command.index("-maxrate") + 1] == "300k"
+        assert command[command.index("-movflags") + 1] == "+faststart"
+
+
+@pytest.mark.django_db
+class TestPreviewClipJob:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path
+        settings.HLS_SCRATCH_ROOT = os.path.join(tmp_path, "scratch")
+        self.previews_dir = os.path.join(tmp_path, "previews")
+        self.commands = []
+        monkeypatch.setattr(tasks, "run_ffmpeg_command", self.fake_encode)
+        self.video = Video.objects.create(
+            title="T", description="D", category="c", content_hash="abc",
+            width=1920, height=1080, duration=100,
+        )
+
+    def fake_encode(self, command):
+        self.commands.append(command)
+        with open(command[-1], "wb") as f:
+            f.write(b"mp4")
+
+    def test_clip_is_published_for_the_catalog(self):
+        tasks.create_preview_clip(self.video.id, "videos/a.mp4")
+
+        self.video.refresh_from_db()
+        assert self.video.preview_url.endswith("/media/previews/abc.mp4")
+        assert os.path.exists(os.path.join(self.previews_dir, "abc.mp4"))
+        assert os.listdir(os.path.dirname(self.commands[0][-1])) == []
+        assert "scale=426:240" in self.commands[0][
+            self.commands[0].index("-filter_complex") + 1
+        ]
+        assert TranscodeJob.objects.get(stage="preview_clip").video_id == (
+            self.video.id
+        )
+
+    def test_existing_clip_is_reused(self):
+        os.makedirs(self.previews_dir)
+        open(os.path.join(self.previews_dir, "abc.mp4"), "w").close()
+
+        tasks.create_preview_clip(self.video.id, "videos/a.mp4")
+
+        self.video.refresh_from_db()
+        assert self.video.preview_url.endswith("/media/previews/abc.mp4")
+        assert self.commands == []
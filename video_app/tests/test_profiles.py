@@ -0,0 +1,70 @@
+import pytest
+from video_app.profiles import (
+    build_rendition_codec_args,
+    build_x264_args,
+    get_profile,
+    resolve_rendition_options,
+)
+from video_app.tasks import build_chunk_command, build_hls_command, build_ladder
+
+RENDITIONS = build_ladder(1920, 1080)
+
+
+class TestEncodingProfiles:
+
+    def test_default_profile_from_settings(self, settings):
+        settings.HLS_ENCODING_PROFILE = "fast"
+        assert get_profile("")["preset"] == "veryfast"
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            get_profile("nope")
+
+    def test_rendition_override(self):
+        options = resolve_rendition_options(get_profile("capped"), "1080p")
+        assert options["bitrate"] == 5000
+        assert options["crf"] == 23
+
+    def test_capped_crf(self):
+        args = build_x264_args(
+            {"preset": "medium", "crf": 23, "bitrate": 5000,
+             "gop": 2, "threads": 4}
+        )
+
+        assert args[args.index("-crf") + 1] == "23"
+        assert args[args.index("-maxrate") + 1] == "5000k"
+        assert "-b" not in args
+        assert args[args.index("-force_key_frames") + 1] == (
+            "expr:gte(t,n_forced*2)"
+        )
+        assert args[args.index("-threads") + 1] == "4"
+
+    def test_average_bitrate(self):
+        args = build_x264_args(
+            {"preset": "fast", "bitrate": 1400, "gop": 2, "threads": 0},
+            ":v:0",
+        )
+        assert args[args.index("-b:v:0") + 1] == "1400k"
+        assert "-crf:v:0" not in args
+
+    def test_options_per_output_stream(self):
+        args = build_rendition_codec_args(["480p", "1080p"], "quality")
+        assert args[args.index("-crf:v:0") + 1] == "22"
+        assert args[args.index("-crf:v:1") + 1] == "20"
+
+
+class TestProfileCommands:
+
+    def test_hls_command_uses_profile(self):
+        command = build_hls_command(
+            "/in/source.mp4", "/out", RENDITIONS, with_audio=True,
+            profile="fast",
+        )
+        assert command[command.index("-preset:v:2") + 1] == "veryfast"
+
+    def test_chunk_command_uses_profile(self):
+        command = build_chunk_command(
+            "/work/source/0000.mp4", "/work", "0000.mp4", RENDITIONS,
+            profile="capped",
+        )
+        assert command.count("-maxrate") == 3
@@ -0,0 +1,167 @@
+import os
+import pytest
+from video_app import playlists, progressive, tasks
+from video_app.models import Video
+from video_app.progress import get_status
+from video_app.storage import (
+    get_content_dir,
+    get_preview_dir,
+    get_video_hls_dir,
+    has_content_output,
+    publish_output_dir,
+)
+
+
+def write_playlist(output_dir, name, segment_count):
+    rendition_dir = os.path.join(output_dir, name)
+    os.makedirs(rendition_dir, exist_ok=True)
+    lines = ["#EXTM3U", "#EXT-X-PLAYLIST-TYPE:EVENT"]
+    for i in range(segment_count):
+        with open(os.path.join(rendition_dir, f"{i:04d}.ts"), "wb") as f:
+            f.write(b"ts")
+        lines += ["#EXTINF:4.000000,", f"{i:04d}.ts"]
+    with open(os.path.join(rendition_dir, "index.m3u8"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_master(output_dir, *args):
+    open(os.path.join(output_dir, "master.m3u8"), "w").close()
+
+
+class TestProgressivePublisher:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path / "media"
+        self.output_dir = str(tmp_path / "scratch")
+        monkeypatch.setattr(progressive, "write_master_playlist", write_master)
+        self.playable = []
+        self.publisher = progressive.ProgressivePublisher(
+            "abc", self.output_dir, "480p", "audio",
+            lambda: self.playable.append(True),
+        )
+
+    def test_waits_for_the_first_segments(self):
+        write_playlist(self.output_dir, "480p", 1)
+        write_playlist(self.output_dir, "audio", 0)
+
+        self.publisher({})
+
+        assert self.playable == []
+        assert not os.path.lexists(get_content_dir("abc"))
+
+    def test_preview_grows_with_the_encode(self):
+        write_playlist(self.output_dir, "480p", 1)
+        write_playlist(self.output_dir, "audio", 1)
+        self.publisher({})
+
+        assert self.playable == [True]
+        assert os.path.realpath(get_content_dir("abc")) == get_preview_dir("abc")
+        assert not has_content_output("abc")
+
+        write_playlist(self.output_dir, "480p", 3)
+        self.publisher({})
+
+        playlist = os.path.join(get_content_dir("abc"), "480p", "index.m3u8")
+        assert open(playlist).read().count("#EXTINF") == 3
+        assert os.path.exists(os.path.join(get_content_dir("abc"), "480p", "0002.ts"))
+        assert self.playable == [True]
+
+    def test_probe_errors_are_retried(self, monkeypatch):
+        def probe_partial_segment(rendition_dir):
+            raise RuntimeError("FFprobe failed: 0000.ts")
+
+        write_playlist(self.output_dir, "480p", 1)
+        write_playlist(self.output_dir, "audio", 1)
+        monkeypatch.setattr(playlists, "probe_rendition", probe_partial_segment)
+        monkeypatch.setattr(
+            progressive, "write_master_playlist",
+            playlists.write_master_playlist,
+        )
+        self.publisher({})
+
+        assert self.playable == []
+        assert self.publisher.error is None
+
+        monkeypatch.setattr(progressive, "write_master_playlist", write_master)
+        self.publisher({})
+
+        assert self.playable == [True]
+
+    def test_final_output_replaces_the_preview(self):
+        write_playlist(self.output_dir, "480p", 1)
+        write_playlist(self.output_dir, "audio", 1)
+        self.publisher({})
+        write_master(self.output_dir)
+
+        publish_output_dir(self.output_dir, "abc")
+
+        assert has_content_output("abc")
+        assert not os.path.exists(get_preview_dir("abc"))
+
+
+@pytest.mark.django_db
+class TestFailedPreview:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path / "media"
+        monkeypatch.setattr(progressive, "write_master_playlist", write_master)
+        self.video = Video.objects.create(
+            title="T", description="D", category="c", content_hash="abc"
+        )
+        output_dir = str(tmp_path / "scratch")
+        write_playlist(output_dir, "480p", 1)
+        write_playlist(output_dir, "audio", 1)
+        progressive.ProgressivePublisher(
+            "abc", output_dir, "480p", "audio",
+            lambda: tasks.publish_preview("abc"),
+        )({})
+
+    def run_failing_encode(self, monkeypatch, job):
+        def encode(video_id):
+            raise RuntimeError("FFmpeg failed")
+
+        monkeypatch.setattr(tasks, "get_current_job", lambda: job)
+        with pytest.raises(RuntimeError):
+            tasks.drop_preview_on_failure(encode)(self.video.id)
+
+    def test_preview_is_kept_for_a_retry(self, monkeypatch):
+        job = type("Job", (), {"retries_left": 1})()
+
+        self.run_failing_encode(monkeypatch, job)
+
+        assert os.path.exists(get_video_hls_dir(self.video.id))
+        assert get_status(self.video.id)["playable"]
+
+    def test_last_failure_removes_the_preview(self, monkeypatch):
+        self.run_failing_encode(monkeypatch, None)
+
+        assert not os.path.lexists(get_video_hls_dir(self.video.id))
+        assert not os.path.lexists(get_content_dir("abc"))
+        assert not os.path.exists(get_preview_dir("abc"))
+        status = get_status(self.video.id)
+        assert status["status"] == "failed"
+        assert "playable" not in status
+
+
+class TestEventPlaylists:
+
+    def test_progressive_output_uses_event_playlists(self):
+        args = tasks.build_hls_output_args("/out", ["480p"], True, True)
+
+        assert args[args.index("-hls_playlist_type") + 1] == "event"
+
+    def test_other_encodes_are_not_event_playlists(self, settings):
+        settings.HLS_PROGRESSIVE_PUBLISH = True
+        settings.HLS_SEGMENT_TYPE = "mpegts"
+
+        assert "-hls_playlist_type" not in tasks.build_hls_command(
+            "/in.mp4", "/out", {"480p": "854x480"}, True
+        )
+
+    def test_single_file_fmp4_is_not_progressive(self, settings):
+        settings.HLS_PROGRESSIVE_PUBLISH = True
+        settings.HLS_SEGMENT_TYPE = "fmp4"
+
+        assert not tasks.is_progressive()
@@ -0,0 +1,91 @@
+import os
+import pytest
+from video_app import tasks
+from video_app.models import TranscodeJob, Video
+from video_app.tests.test_dedup import FakeQueue
+
+
+class TestQueueSelection:
+
+    def test_short_and_long_sources(self, settings):
+        settings.HLS_LONG_QUEUE_MIN_DURATION = 300
+
+        assert tasks.get_encode_queue(30) == "short"
+        assert tasks.get_encode_queue(None) == "short"
+        assert tasks.get_encode_queue(5400) == "long"
+
+
+@pytest.mark.django_db
+class TestPosterFastLane:
+
+    def make_video(self, **fields):
+        return Video.objects.create(
+            title="T", description="D", category="c", content_hash="abc",
+            **fields
+        )
+
+    def fake_thumbnail(self, input_path, thumbnail_abs, duration=None):
+        with open(thumbnail_abs, "wb") as f:
+            f.write(b"jpg")
+        return thumbnail_abs
+
+    def test_ingest_timeout_covers_hashing_large_uploads(
+        self, monkeypatch, settings, tmp_path
+    ):
+        settings.MEDIA_ROOT = tmp_path
+        settings.VIDEO_INGEST_TIMEOUT = 1324
+        (tmp_path / "videos").mkdir()
+        (tmp_path / "videos" / "a.mp4").write_bytes(b"video")
+        queue = FakeQueue()
+        monkeypatch.setattr(
+            "video_app.signals.django_rq.get_queue", lambda name: queue
+        )
+
+        self.make_video(video_file="videos/a.mp4")
+
+        _, _, kwargs = queue.enqueued[0]
+        assert kwargs["job_timeout"] == 1324
+
+    def test_encode_goes_to_queue_by_duration(self, monkeypatch, settings):
+        settings.HLS_LONG_QUEUE_MIN_DURATION = 300
+        queues = {}
+        monkeypatch.setattr(
+            tasks.django_rq, "get_queue",
+            lambda name: queues.setdefault(name, FakeQueue()),
+        )
+
+        tasks.enqueue_transcode(self.make_video(duration=7200), "videos/a.mp4")
+
+        assert len(queues["long"].enqueued) == 1
+        assert queues["short"].enqueued == []
+
+    def test_poster_is_published_before_the_encode(
+        self, monkeypatch, settings, tmp_path
+    ):
+        settings.MEDIA_ROOT = tmp_path
+        settings.HLS_SCRATCH_ROOT = os.path.join(tmp_path, "scratch")
+        monkeypatch.setattr(tasks, "generate_thumbnail", self.fake_thumbnail)
+        video = self.make_video()
+
+        tasks.create_poster(video.id, "videos/a.mp4")
+
+        video.refresh_from_db()
+        assert video.thumbnail_url.endswith("/media/thumbnails/abc.jpg")
+        assert os.path.exists(os.path.join(tmp_path, "thumbnails", "abc.jpg"))
+        assert os.listdir(settings.HLS_SCRATCH_ROOT) == []
+        assert TranscodeJob.objects.get(stage="thumbnail").video_id == video.id
+
+    def test_existing_poster_is_reused(self, monkeypatch, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        os.makedirs(os.path.join(tmp_path, "thumbnails"))
+        open(os.path.join(tmp_path, "thumbnails", "abc.jpg"), "w").close()
+        monkeypatch.setattr(
+            tasks, "generate_thumbnail",
+            lambda *args: pytest.fail("poster generated twice"),
+        )
+        video = self.make_video()
+
+        tasks.create_poster(video.id, "videos/a.mp4")
+
+        video.refresh_from_db()
+        assert video.thumbnail_url.endswith("/media/thumbnails/abc.jpg")
@@ -0,0 +1,62 @@
+import pytest
+from video_app import tasks
+from video_app.models import Video
+from video_app.storage import get_scratch_dir, is_done, mark_done
+
+
+@pytest.mark.django_db
+class TestResumableTranscode:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path / "media"
+        settings.HLS_SCRATCH_ROOT = tmp_path / "scratch"
+        settings.FFMPEG_SLOTS_PER_JOB = 0
+        self.commands = []
+        monkeypatch.setattr(
+            tasks, "run_ffmpeg_command",
+            lambda command, on_progress=None: self.commands.append(command),
+        )
+        monkeypatch.setattr(tasks, "write_hls_master", lambda *args: None)
+        monkeypatch.setattr(tasks, "finish_content", lambda *args: None)
+        self.video = Video.objects.create(
+            title="T", description="D", category="c",
+            width=1920, height=1080, duration=60,
+            video_codec="h264", audio_codec="aac", content_hash="abc",
+        )
+        self.output_dir = get_scratch_dir("abc")
+
+    def test_only_missing_renditions_are_encoded(self):
+        mark_done(self.output_dir, "480p")
+        mark_done(self.output_dir, "720p")
+
+        tasks.convert_video_to_hls(self.video.id, "videos/a.mp4")
+
+        assert len(self.commands) == 1
+        stream_map = self.commands[0][self.commands[0].index("-var_stream_map") + 1]
+        assert stream_map == (
+            "a:0,agroup:audio,name:audio v:0,agroup:audio,name:1080p"
+        )
+        assert is_done(self.output_dir, "1080p")
+        assert is_done(self.output_dir, "audio")
+
+    def test_completed_run_skips_encoding(self):
+        for stage in ("480p", "720p", "1080p", "audio"):
+            mark_done(self.output_dir, stage)
+
+        tasks.convert_video_to_hls(self.video.id, "videos/a.mp4")
+
+        assert self.commands == []
+
+
+class TestJobTimeout:
+
+    def test_short_sources_use_minimum(self, settings):
+        settings.HLS_JOB_TIMEOUT_MIN = 900
+        settings.HLS_JOB_TIMEOUT_FACTOR = 4
+        assert tasks.get_job_timeout(30) == 900
+
+    def test_long_sources_scale_with_duration(self, settings):
+        settings.HLS_JOB_TIMEOUT_MIN = 900
+        settings.HLS_JOB_TIMEOUT_FACTOR = 4
+        assert tasks.get_job_timeout(7200) == 28800
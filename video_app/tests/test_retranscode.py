@@ -0,0 +1,222 @@
+import contextlib
+import os
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from video_app import signals, tasks
+from video_app.models import Video
+from video_app.storage import (
+    get_content_dir,
+    get_output_profile,
+    get_scratch_dir,
+)
+from video_app.tests.test_dedup import FakeJob, FakeQueue
+from video_app.tests.test_two_tier import write_master
+
+
+class FakeRedis:
+    """
+    The list, set and lock calls of the re-transcode backlog, with
+    bytes values like redis-py.
+    """
+
+    def __init__(self):
+        self.lists = {}
+        self.sets = {}
+
+    def lock(self, name, timeout):
+        return contextlib.nullcontext()
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(str(v).encode() for v in values)
+
+    def lpop(self, key):
+        values = self.lists.get(key)
+        return values.pop(0) if values else None
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def delete(self, key):
+        self.lists.pop(key, None)
+
+    def sadd(self, key, value):
+        self.sets.setdefault(key, set()).add(value.encode())
+
+    def srem(self, key, value):
+        if isinstance(value, str):
+            value = value.encode()
+        self.sets.get(key, set()).discard(value)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def scard(self, key):
+        return len(self.sets.get(key, set()))
+
+
+class RetranscodeQueue(FakeQueue):
+
+    def __init__(self, connection):
+        super().__init__()
+        self.connection = connection
+
+    def enqueue(self, func, *args, **kwargs):
+        super().enqueue(func, *args, **kwargs)
+        job = FakeJob(kwargs["job_id"], "queued")
+        self.jobs[job.id] = job
+        return job
+
+
+@pytest.mark.django_db
+class TestRetranscodeBacklog:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, monkeypatch):
+        settings.RETRANSCODE_MAX_IN_FLIGHT = 2
+        self.redis = FakeRedis()
+        self.queues = {}
+        monkeypatch.setattr(
+            tasks.django_rq, "get_queue",
+            lambda name: self.queues.setdefault(
+                name, RetranscodeQueue(self.redis)
+            ),
+        )
+        monkeypatch.setattr(tasks, "has_content_output", lambda h: h != "")
+
+    def make_video(self, content_hash):
+        return Video.objects.create(
+            title="T", description="D", category="c", duration=60,
+            video_file="videos/a.mp4", content_hash=content_hash,
+        )
+
+    def started(self):
+        return [kwargs["job_id"] for _, _, kwargs in self.queues["low"].enqueued]
+
+    def test_jobs_in_flight_are_capped(self):
+        videos = [self.make_video(h) for h in ("a", "b", "c")]
+
+        tasks.request_retranscode([v.id for v in videos])
+
+        assert self.started() == ["retranscode-a", "retranscode-b"]
+        assert tasks.get_retranscode_backlog() == (1, 2)
+
+    def test_finished_job_starts_the_next_video(self):
+        videos = [self.make_video(h) for h in ("a", "b", "c")]
+        tasks.request_retranscode([v.id for v in videos])
+        job = self.queues["low"].jobs["retranscode-a"]
+        job.status = "finished"
+
+        tasks.release_retranscode(job, self.redis)
+
+        assert self.started()[-1] == "retranscode-c"
+        assert tasks.get_retranscode_backlog() == (0, 2)
+
+    def test_lost_jobs_do_not_block_the_backlog(self):
+        videos = [self.make_video(h) for h in ("a", "b", "c")]
+        tasks.request_retranscode([v.id for v in videos])
+        del self.queues["low"].jobs["retranscode-b"]
+
+        assert tasks.feed_retranscodes() == 1
+        assert self.started()[-1] == "retranscode-c"
+
+    def test_duplicates_and_unprocessed_videos(self, settings):
+        settings.RETRANSCODE_MAX_IN_FLIGHT = 3
+        first, duplicate = self.make_video("a"), self.make_video("a")
+        unprocessed = self.make_video("")
+
+        tasks.request_retranscode([first.id, duplicate.id, unprocessed.id])
+
+        assert self.started() == ["retranscode-a", f"ingest-{unprocessed.id}"]
+
+    def test_command_requires_a_selection(self):
+        with pytest.raises(CommandError):
+            call_command("retranscode_videos")
+
+        call_command("retranscode_videos", "--all", "--dry-run")
+        assert "low" not in self.queues
+
+
+@pytest.mark.django_db
+class TestRetranscodeJob:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path / "media"
+        settings.HLS_SCRATCH_ROOT = tmp_path / "scratch"
+        settings.HLS_ENCODING_PROFILE = "efficient"
+        settings.FFMPEG_SLOTS_PER_JOB = 0
+        self.video = Video.objects.create(
+            title="T", description="D", category="c",
+            video_file="videos/a.mp4", width=1280, height=720, duration=60,
+            video_codec="h264", audio_codec="aac", content_hash="abc",
+            encoding_ladder={"complexity": 0.1, "renditions": {}},
+        )
+        self.commands = []
+        monkeypatch.setattr(
+            tasks, "store_media_metadata", lambda video_id, path: self.video
+        )
+        monkeypatch.setattr(tasks, "run_ffmpeg_command", self.fake_encode)
+        monkeypatch.setattr(
+            tasks.django_rq, "get_queue", lambda name: FakeQueue()
+        )
+        monkeypatch.setattr(tasks, "write_hls_master", write_master)
+        monkeypatch.setattr(tasks, "write_trickplay_track", lambda *args: None)
+        monkeypatch.setattr(
+            tasks, "publish_poster", lambda *args, **kwargs: None
+        )
+        monkeypatch.setattr(
+            tasks, "publish_preview_clip", lambda *args, **kwargs: None
+        )
+
+    def fake_encode(self, command):
+        self.commands.append(command)
+        staging_dir = get_scratch_dir("abc.retranscode")
+        for name in ("480p", "720p", "audio"):
+            with open(os.path.join(staging_dir, name, "index.m3u8"), "w") as f:
+                f.write("#EXTM3U\n")
+
+    def test_whole_output_is_replaced(self):
+        tasks.retranscode_video(self.video.id, "videos/a.mp4")
+
+        content_dir = get_content_dir("abc")
+        assert os.path.exists(os.path.join(content_dir, "master.m3u8"))
+        assert os.path.exists(os.path.join(content_dir, "720p", "index.m3u8"))
+        assert get_output_profile("abc") == "efficient"
+        command = self.commands[0]
+        assert command[command.index("-preset:v:0") + 1] == "slower"
+        self.video.refresh_from_db()
+        assert self.video.encoding_ladder is None
+
+
+@pytest.mark.django_db
+class TestVideoFileChange:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path
+        os.makedirs(tmp_path / "videos")
+        for name in ("a.mp4", "b.mp4"):
+            (tmp_path / "videos" / name).write_bytes(b"video")
+        self.queue = FakeQueue()
+        monkeypatch.setattr(
+            signals.django_rq, "get_queue", lambda name: self.queue
+        )
+
+    def test_new_file_is_processed_again(self):
+        video = Video.objects.create(
+            title="T", description="D", category="c",
+            video_file="videos/a.mp4", encoding_ladder={"renditions": {}},
+        )
+        video.title = "Renamed"
+        video.save()
+        assert len(self.queue.enqueued) == 1
+
+        video.video_file = "videos/b.mp4"
+        video.save()
+
+        _, args, _ = self.queue.enqueued[-1]
+        assert len(self.queue.enqueued) == 2
+        assert args == (video.id, "videos/b.mp4")
+        video.refresh_from_db()
+        assert video.encoding_ladder is None
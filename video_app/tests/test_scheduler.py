@@ -0,0 +1,118 @@
+import contextlib
+import pytest
+from video_app import scheduler
+from video_app.tasks import build_hls_command, build_ladder
+
+
+class FakeRedis:
+    """
+    The hash, sorted set and lock calls CpuSlotLease uses.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.zsets = {}
+
+    def lock(self, name, timeout):
+        return contextlib.nullcontext()
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value)
+
+    def hvals(self, key):
+        return list(self.hashes.get(key, {}).values())
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def zadd(self, key, mapping, xx=False):
+        zset = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            if not xx or member in zset:
+                zset[member] = score
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+
+    def zrangebyscore(self, key, low, high):
+        return [m for m, s in self.zsets.get(key, {}).items() if s <= high]
+
+
+class TestCpuBudget:
+
+    def test_explicit_budget(self, settings):
+        settings.FFMPEG_CPU_BUDGET = 6
+        assert scheduler.get_cpu_budget() == 6
+
+    def test_cgroup_limit_caps_cores(self, settings, monkeypatch):
+        settings.FFMPEG_CPU_BUDGET = 0
+        monkeypatch.setattr(scheduler.os, "sched_getaffinity", lambda pid: range(16))
+        monkeypatch.setattr(scheduler, "read_cgroup_quota", lambda: 2.5)
+
+        assert scheduler.get_cpu_budget() == 2
+
+
+class TestCpuSlotLease:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, monkeypatch):
+        settings.FFMPEG_SCHEDULER_NODE = "node"
+        self.redis = FakeRedis()
+        monkeypatch.setattr(
+            scheduler.django_rq, "get_connection", lambda name: self.redis
+        )
+
+    def test_budget_is_not_oversubscribed(self):
+        first = scheduler.CpuSlotLease(4, budget=8)
+        second = scheduler.CpuSlotLease(4, budget=8)
+        third = scheduler.CpuSlotLease(4, budget=8)
+
+        assert first.try_acquire()
+        assert second.try_acquire()
+        assert not third.try_acquire()
+
+        first.release()
+        assert third.try_acquire()
+
+    def test_expired_leases_are_reclaimed(self, monkeypatch):
+        crashed = scheduler.CpuSlotLease(8, budget=8)
+        assert crashed.try_acquire()
+
+        now = scheduler.time.time()
+        monkeypatch.setattr(
+            scheduler.time, "time", lambda: now + scheduler.LEASE_TTL + 1
+        )
+
+        assert scheduler.CpuSlotLease(8, budget=8).try_acquire()
+
+    def test_paused_lease_frees_its_slots(self):
+        live = scheduler.CpuSlotLease(8, budget=8)
+        assert live.try_acquire()
+
+        with live.paused():
+            other = scheduler.CpuSlotLease(8, budget=8)
+            assert other.try_acquire()
+            other.release()
+
+        assert not scheduler.CpuSlotLease(8, budget=8).try_acquire()
+
+    def test_disabled_scheduler_yields_none(self, settings):
+        settings.FFMPEG_SLOTS_PER_JOB = 0
+        with scheduler.cpu_slots() as threads:
+            assert threads is None
+
+
+class TestThreadAllocation:
+
+    def test_threads_are_shared_between_renditions(self):
+        command = build_hls_command(
+            "/in/source.mp4", "/out", build_ladder(1920, 1080),
+            with_audio=False, threads=6,
+        )
+
+        assert command[command.index("-threads") + 1] == "6"
+        assert command.index("-threads") < command.index("-i")
+        assert command[command.index("-filter_complex_threads") + 1] == "6"
+        assert command[command.index("-threads:v:0") + 1] == "2"
@@ -0,0 +1,99 @@
+import os
+import pytest
+from django.core.cache import cache
+from video_app import tasks
+from video_app.models import Video
+from video_app.progress import (
+    ProgressReporter,
+    get_status,
+    progress_key,
+    set_status,
+)
+
+
+@pytest.mark.django_db
+class TestVideoStatusEndpoint:
+
+    def setup_method(self):
+        cache.clear()
+
+    def test_status_video_not_found(self, client):
+        response = client.get("/api/video/999/status/")
+        assert response.status_code == 404
+
+    def test_status_unknown_without_record(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        video = Video.objects.create(title="T", description="D", category="c")
+
+        response = client.get(f"/api/video/{video.id}/status/")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "unknown"
+
+    def test_status_aggregates_running_parts(self, client):
+        video = Video.objects.create(title="T", description="D", category="c")
+        set_status(video.id, "processing", stage="encoding",
+                   parts=["0000.mp4", "0001.mp4"])
+        cache.set(progress_key(video.id, "0000.mp4"),
+                  {"percent": 100.0, "fps": 0.0, "eta": 0})
+        cache.set(progress_key(video.id, "0001.mp4"),
+                  {"percent": 50.0, "fps": 48.0, "eta": 30})
+
+        data = client.get(f"/api/video/{video.id}/status/").json()
+
+        assert data["status"] == "processing"
+        assert data["percent"] == 75.0
+        assert data["fps"] == 48.0
+        assert data["eta"] == 30
+
+
+class TestProgressReporter:
+
+    def setup_method(self):
+        cache.clear()
+
+    def test_reports_percent_fps_and_eta(self):
+        set_status(1, "processing", parts=["encode"])
+        reporter = ProgressReporter(1, "encode", duration=100)
+
+        reporter({
+            "out_time_us": "25000000",
+            "fps": "50.0",
+            "speed": "2.5x",
+            "progress": "continue",
+        })
+
+        status = get_status(1)
+        assert status["percent"] == 25.0
+        assert status["fps"] == 50.0
+        assert status["eta"] == 30
+
+    def test_end_block_is_always_reported(self):
+        set_status(1, "processing", parts=["encode"])
+        reporter = ProgressReporter(1, "encode", duration=100)
+        reporter({"out_time_us": "1000000", "progress": "continue"})
+
+        reporter({"out_time_us": "N/A", "progress": "end"})
+
+        assert get_status(1)["percent"] == 100.0
+
+
+class TestFfmpegRunner:
+
+    def test_ffmpeg_is_killed_when_the_progress_handler_fails(self, tmp_path):
+        pid_file = tmp_path / "pid"
+        ffmpeg = tmp_path / "ffmpeg"
+        ffmpeg.write_text(
+            f"#!/bin/sh\necho $$ > {pid_file}\n"
+            "echo progress=continue\nexec sleep 60\n"
+        )
+        ffmpeg.chmod(0o755)
+
+        def on_progress(values):
+            raise RuntimeError("progress handler failed")
+
+        with pytest.raises(RuntimeError):
+            tasks.run_ffmpeg_command([str(ffmpeg)], on_progress=on_progress)
+
+        with pytest.raises(ProcessLookupError):
+            os.kill(int(pid_file.read_text()), 0)
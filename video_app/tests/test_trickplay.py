@@ -0,0 +1,94 @@
+import os
+import pytest
+from video_app.tasks import (
+    build_chunk_command,
+    build_hls_command,
+    build_ladder,
+    get_trickplay_size,
+)
+from video_app.trickplay import build_trickplay_track
+
+RENDITIONS = build_ladder(1920, 1080)
+
+
+class TestTrickplayCommands:
+
+    def test_sprites_come_from_the_same_decode(self):
+        command = build_hls_command(
+            "/in/source.mp4", "/out", RENDITIONS, with_audio=True,
+            tile_size="160x90",
+        )
+
+        assert command.count("-i") == 1
+        graph = command[command.index("-filter_complex") + 1]
+        assert graph.startswith("[0:v]split=4[v0][v1][v2][vt]")
+        assert "scale=160:90,tile=5x5[sprites]" in graph
+        assert command[-1] == "/out/trickplay/sprite-%03d.jpg"
+
+    def test_chunk_sprites_are_prefixed_with_the_chunk(self):
+        command = build_chunk_command(
+            "/work/source/0003.mp4", "/work", "0003.mp4", RENDITIONS,
+            tile_size="160x90",
+        )
+
+        assert command[-1] == "/work/trickplay/sprite-0003-%03d.jpg"
+
+    def test_tile_size_keeps_the_aspect_ratio(self):
+        assert get_trickplay_size(build_ladder(1080, 1920)) == "160x284"
+
+
+class TestTrickplayTrack:
+
+    def test_cues_address_tiles_on_the_sheets(self, settings):
+        settings.TRICKPLAY_INTERVAL = 10
+        settings.TRICKPLAY_COLUMNS = 2
+        settings.TRICKPLAY_ROWS = 2
+
+        track = build_trickplay_track([("sprite", 0, 45)], "160x90")
+
+        assert track.startswith("WEBVTT\n")
+        assert (
+            "00:00:10.000 --> 00:00:20.000\n"
+            "trickplay/sprite-001.jpg#xywh=160,0,160,90"
+        ) in track
+        assert (
+            "00:00:40.000 --> 00:00:45.000\n"
+            "trickplay/sprite-002.jpg#xywh=0,0,160,90"
+        ) in track
+
+    def test_chunk_sections_continue_the_timeline(self, settings):
+        settings.TRICKPLAY_INTERVAL = 10
+
+        track = build_trickplay_track(
+            [("sprite-0000", 0, 120), ("sprite-0001", 120, 60)], "160x90"
+        )
+
+        assert (
+            "00:02:00.000 --> 00:02:10.000\n"
+            "trickplay/sprite-0001-001.jpg#xywh=0,0,160,90"
+        ) in track
+
+
+@pytest.mark.django_db
+class TestTrickplayEndpoints:
+
+    def test_track_and_sprite(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        base = os.path.join(tmp_path, "hls", "1")
+        os.makedirs(os.path.join(base, "trickplay"))
+        with open(os.path.join(base, "thumbnails.vtt"), "w") as f:
+            f.write("WEBVTT\n")
+        with open(os.path.join(base, "trickplay", "sprite-001.jpg"), "wb") as f:
+            f.write(b"jpg")
+
+        track = client.get("/api/video/1/thumbnails.vtt")
+        sprite = client.get("/api/video/1/trickplay/sprite-001.jpg")
+
+        assert track.status_code == 200
+        assert track["Content-Type"] == "text/vtt"
+        assert sprite.status_code == 200
+
+    def test_missing_track(self, client, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        response = client.get("/api/video/1/thumbnails.vtt")
+        assert response.status_code == 404
@@ -0,0 +1,111 @@
+import os
+import pytest
+from video_app import tasks
+from video_app.models import Video
+from video_app.storage import (
+    copy_published_output,
+    get_content_dir,
+    get_output_profile,
+    publish_output_dir,
+    write_output_profile,
+)
+from video_app.tests.test_dedup import FakeQueue
+
+
+def write_master(output_dir, *args):
+    open(os.path.join(output_dir, "master.m3u8"), "w").close()
+
+
+def write_rendition(output_dir, name, text):
+    os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+    with open(os.path.join(output_dir, name, "index.m3u8"), "w") as f:
+        f.write(text)
+
+
+@pytest.mark.django_db
+class TestTwoTierEncoding:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path / "media"
+        settings.HLS_SCRATCH_ROOT = tmp_path / "scratch"
+        settings.HLS_ENCODING_PROFILE = "efficient"
+        settings.HLS_FIRST_PASS_PROFILE = "ultrafast"
+        settings.FFMPEG_SLOTS_PER_JOB = 0
+        self.tmp_path = tmp_path
+        self.queues = {}
+        monkeypatch.setattr(
+            tasks.django_rq, "get_queue",
+            lambda name: self.queues.setdefault(name, FakeQueue()),
+        )
+        monkeypatch.setattr(tasks, "write_hls_master", write_master)
+        self.video = Video.objects.create(
+            title="T", description="D", category="c",
+            video_file="videos/a.mp4", width=1280, height=720, duration=60,
+            video_codec="h264", audio_codec="aac", content_hash="abc",
+        )
+
+    def publish(self, profile):
+        staging_dir = os.path.join(self.tmp_path, "staging")
+        os.makedirs(staging_dir)
+        write_master(staging_dir)
+        for name in ("480p", "720p", "audio"):
+            write_rendition(staging_dir, name, "first pass")
+        write_output_profile(staging_dir, profile)
+        publish_output_dir(staging_dir, "abc")
+
+    def test_first_pass_uses_the_fast_profile(self, monkeypatch):
+        commands = []
+        monkeypatch.setattr(
+            tasks, "run_ffmpeg_command",
+            lambda command, on_progress=None: commands.append(command),
+        )
+        monkeypatch.setattr(tasks, "finish_content", lambda *args: None)
+
+        tasks.convert_video_to_hls(self.video.id, "videos/a.mp4")
+
+        assert commands[0][commands[0].index("-preset:v:0") + 1] == "ultrafast"
+
+    def test_fast_output_queues_the_long_term_encode(self):
+        self.publish("ultrafast")
+
+        tasks.enqueue_reencode("abc")
+
+        func, args, kwargs = self.queues["low"].enqueued[0]
+        assert func is tasks.reencode_video
+        assert kwargs["job_id"] == "reencode-abc"
+
+    def test_final_or_unknown_output_is_not_reencoded(self):
+        self.publish("efficient")
+        tasks.enqueue_reencode("abc")
+        os.remove(os.path.join(get_content_dir("abc"), ".profile"))
+        tasks.enqueue_reencode("abc")
+
+        assert "low" not in self.queues
+
+    def test_reencode_replaces_video_renditions(self, monkeypatch):
+        self.publish("ultrafast")
+        commands = []
+
+        def fake_encode(command):
+            commands.append(command)
+            output_dir = os.path.dirname(os.path.dirname(command[-1]))
+            for name in ("480p", "720p"):
+                write_rendition(output_dir, name, "efficient")
+
+        monkeypatch.setattr(tasks, "run_ffmpeg_command", fake_encode)
+
+        tasks.reencode_video(self.video.id, "videos/a.mp4")
+
+        content_dir = get_content_dir("abc")
+        assert commands[0][commands[0].index("-preset:v:1") + 1] == "slower"
+        assert open(os.path.join(content_dir, "720p", "index.m3u8")).read() == "efficient"
+        assert open(os.path.join(content_dir, "audio", "index.m3u8")).read() == "first pass"
+        assert get_output_profile("abc") == "efficient"
+
+    def test_profile_of_a_linked_copy_is_written_separately(self):
+        self.publish("ultrafast")
+
+        write_output_profile(copy_published_output("abc"), "efficient")
+
+        assert get_output_profile("abc") == "ultrafast"
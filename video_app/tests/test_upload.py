@@ -0,0 +1,180 @@
+import contextlib
+import hashlib
+import io
+import os
+import pytest
+from django.utils import timezone
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from video_app import tasks
+from video_app.models import Video, VideoUpload
+from video_app.progress import get_status
+from video_app.tests.test_dedup import FakeQueue
+from video_app.uploads import (
+    append_chunk,
+    create_upload,
+    follow_upload,
+    is_streamable,
+)
+
+CONTENT = b"0123456789" * 100
+
+
+@pytest.mark.django_db
+class TestResumableUpload:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path
+        settings.VIDEO_UPLOAD_PIPE_THROUGH = False
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user("admin", password="x", is_staff=True)
+        )
+        self.queue = FakeQueue()
+        monkeypatch.setattr(
+            "video_app.signals.django_rq.get_queue", lambda name: self.queue
+        )
+
+    def start(self, length=len(CONTENT)):
+        return self.client.post(
+            "/api/video/uploads/",
+            {"title": "Film", "category": "drama", "filename": "film.mp4"},
+            format="json",
+            HTTP_UPLOAD_LENGTH=str(length),
+        )
+
+    def send(self, url, offset, data):
+        return self.client.generic(
+            "PATCH", url, data,
+            content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_upload_in_chunks_creates_the_video(self, tmp_path):
+        url = self.start()["Location"]
+
+        first = self.send(url, 0, CONTENT[:400])
+        assert first.status_code == 204
+        assert first["Upload-Offset"] == "400"
+        assert not Video.objects.exists()
+
+        head = self.client.head(url)
+        assert head["Upload-Offset"] == "400"
+
+        last = self.send(url, 400, CONTENT[400:])
+        assert last.status_code == 204
+
+        upload = VideoUpload.objects.get()
+        video = Video.objects.get()
+        assert upload.video == video
+        assert video.video_file.name == upload.file_name
+        assert self.queue.enqueued[0][1] == (video.id, upload.file_name)
+        with open(os.path.join(tmp_path, upload.file_name), "rb") as f:
+            assert f.read() == CONTENT
+
+    def test_wrong_offset_is_rejected(self):
+        url = self.start()["Location"]
+        self.send(url, 0, CONTENT[:100])
+
+        response = self.send(url, 0, CONTENT[:100])
+
+        assert response.status_code == 409
+        assert response["Upload-Offset"] == "100"
+
+    def test_chunk_past_the_length_is_rejected(self):
+        url = self.start(length=10)["Location"]
+
+        response = self.send(url, 0, CONTENT[:20])
+
+        assert response.status_code == 413
+        assert VideoUpload.objects.get().offset == 0
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(
+            User.objects.create_user("viewer", password="x")
+        )
+        assert self.start().status_code == 403
+
+
+@pytest.mark.django_db
+class TestPipeThroughIngest:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = tmp_path
+        settings.VIDEO_UPLOAD_PIPE_THROUGH = True
+        self.queue = FakeQueue()
+        monkeypatch.setattr(
+            "video_app.uploads.django_rq.get_queue", lambda name: self.queue
+        )
+        self.user = User.objects.create_user("admin", is_staff=True)
+
+    def test_streamable_containers(self):
+        ftyp = (16).to_bytes(4, "big") + b"ftypisom" + b"\0" * 4
+        moov = (8).to_bytes(4, "big") + b"moov"
+        mdat = (8).to_bytes(4, "big") + b"mdat"
+
+        assert is_streamable(ftyp + moov + mdat)
+        assert not is_streamable(ftyp + mdat + moov)
+        assert is_streamable(b"\x1a\x45\xdf\xa3" + b"\0" * 60)
+        assert is_streamable((b"\x47" + b"\0" * 187) * 2)
+
+    def test_upload_start_enqueues_live_encode(self):
+        upload = create_upload(self.user, "film.mp4", 100, "Film", "", "drama")
+
+        assert upload.live_status == "pending"
+        assert self.queue.enqueued[0][2]["job_id"] == f"live-{upload.id}"
+
+    def test_follow_upload_yields_committed_bytes(self):
+        upload = create_upload(self.user, "film.mp4", 1000, "Film", "", "drama")
+        append_chunk(upload.id, io.BytesIO(CONTENT[:600]), 0)
+        append_chunk(upload.id, io.BytesIO(CONTENT[600:]), 600)
+        digest = hashlib.sha256()
+
+        data = b"".join(follow_upload(upload.id, digest))
+
+        assert data == CONTENT
+        assert digest.hexdigest() == hashlib.sha256(CONTENT).hexdigest()
+
+    def test_follow_upload_pauses_only_while_waiting(self):
+        upload = create_upload(self.user, "film.mp4", 1000, "Film", "", "drama")
+        append_chunk(upload.id, io.BytesIO(CONTENT[:600]), 0)
+        waits = []
+
+        @contextlib.contextmanager
+        def while_waiting():
+            waits.append(True)
+            append_chunk(upload.id, io.BytesIO(CONTENT[600:]), 600)
+            yield
+
+        data = b"".join(follow_upload(upload.id, while_waiting=while_waiting))
+
+        assert data == CONTENT
+        assert waits == [True]
+
+    def test_completed_upload_is_not_taken_over(self):
+        upload = create_upload(self.user, "film.mp4", 1000, "Film", "", "drama")
+        VideoUpload.objects.filter(id=upload.id).update(
+            completed_at=timezone.now()
+        )
+
+        assert not tasks.start_live_encode(upload.id)
+
+    def test_ingest_defers_to_running_live_encode(self, monkeypatch, tmp_path):
+        video = Video.objects.create(title="T", description="D", category="c")
+        VideoUpload.objects.create(
+            title="T", category="c", file_name="videos/a.mp4", length=1,
+            offset=1, video=video, live_status="encoding",
+        )
+        (tmp_path / "videos").mkdir()
+        (tmp_path / "videos" / "a.mp4").write_bytes(b"x")
+        monkeypatch.setattr(tasks, "store_media_metadata", lambda *a: video)
+        monkeypatch.setattr(
+            tasks, "enqueue_transcode",
+            lambda *a: pytest.fail("encoded twice"),
+        )
+
+        tasks.ingest_video(video.id, "videos/a.mp4")
+
+        assert get_status(video.id)["stage"] == "live encode"
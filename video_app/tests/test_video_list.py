@@ -26,3 +26,15 @@ class TestVideoListEndpoint:
         assert data[0]["title"] == "Test"
         assert data[0]["description"] == "Desc"
         assert data[0]["category"] == "test"
+
+    def test_video_list_exposes_preview_clip(self, client):
+        Video.objects.create(
+            title="Test", description="Desc", category="test",
+            preview_url="http://localhost:8000/media/previews/abc.mp4",
+        )
+        Video.objects.create(title="New", description="Desc", category="test")
+
+        data = {v["title"]: v for v in client.get("/api/video/").json()}
+
+        assert data["Test"]["preview_url"].endswith("/media/previews/abc.mp4")
+        assert data["New"]["preview_url"] is None
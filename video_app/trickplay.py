@@ -0,0 +1,95 @@
+import math
+import os
+from django.conf import settings
+
+TRICKPLAY_DIR = "trickplay"
+TRICKPLAY_TRACK = "thumbnails.vtt"
+
+
+def build_trickplay_filter(input_label: str, tile_size: str) -> str:
+    """
+    Filter branch that samples one frame every TRICKPLAY_INTERVAL seconds,
+    scales it to tile_size ('WxH') and packs the tiles into sprite sheets
+    of TRICKPLAY_COLUMNS x TRICKPLAY_ROWS. Output label: [sprites].
+
+    select keeps the first frame and then the first one at least an
+    interval later; unlike the fps filter it does not drop the last
+    tile at the end of the input.
+    """
+    width, height = tile_size.split("x")
+    interval = settings.TRICKPLAY_INTERVAL
+    return (
+        f"[{input_label}]select='isnan(prev_selected_t)"
+        f"+gte(t-prev_selected_t,{interval})',"
+        f"scale={width}:{height},"
+        f"tile={settings.TRICKPLAY_COLUMNS}x{settings.TRICKPLAY_ROWS}"
+        f"[sprites]"
+    )
+
+
+def build_trickplay_output_args(output_dir: str, prefix: str) -> list:
+    """
+    Second ffmpeg output for the [sprites] branch:
+    <output_dir>/trickplay/<prefix>-001.jpg, -002.jpg, ...
+    """
+    return [
+        "-map", "[sprites]",
+        "-c:v", "mjpeg",
+        "-q:v", "5",
+        "-f", "image2",
+        os.path.join(output_dir, TRICKPLAY_DIR, f"{prefix}-%03d.jpg"),
+    ]
+
+
+def format_timestamp(seconds: float) -> str:
+    milliseconds = round(seconds * 1000)
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+
+def build_trickplay_track(sections: list, tile_size: str) -> str:
+    """
+    Render a WebVTT thumbnail track. `sections` lists
+    (prefix, start, duration) for every ffmpeg run that wrote sprite
+    sheets: one for a single-pass encode, one per chunk in split mode.
+    Each cue points at its tile with a #xywh= media fragment.
+    """
+    width, height = (int(v) for v in tile_size.split("x"))
+    interval = settings.TRICKPLAY_INTERVAL
+    columns = settings.TRICKPLAY_COLUMNS
+    per_sheet = columns * settings.TRICKPLAY_ROWS
+
+    lines = ["WEBVTT", ""]
+    for prefix, start, duration in sections:
+        for index in range(math.ceil(duration / interval)):
+            sheet, position = divmod(index, per_sheet)
+            x = position % columns * width
+            y = position // columns * height
+            cue_start = start + index * interval
+            cue_end = min(cue_start + interval, start + duration)
+
+            lines.append(
+                f"{format_timestamp(cue_start)} --> "
+                f"{format_timestamp(cue_end)}"
+            )
+            lines.append(
+                f"{TRICKPLAY_DIR}/{prefix}-{sheet + 1:03d}.jpg"
+                f"#xywh={x},{y},{width},{height}"
+            )
+            lines.append("")
+
+    return "\n".join(lines)
+
+
+def write_trickplay_track(
+    output_dir: str, sections: list, tile_size: str
+) -> str:
+    """
+    Write thumbnails.vtt next to master.m3u8. Returns its path.
+    """
+    track_path = os.path.join(output_dir, TRICKPLAY_TRACK)
+    with open(track_path, "w") as f:
+        f.write(build_trickplay_track(sections, tile_size))
+    return track_path
@@ -0,0 +1,199 @@
+import contextlib
+import os
+import time
+import django_rq
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from video_app.models import Video, VideoUpload
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+FOLLOW_INTERVAL = 0.5
+
+# Containers ffmpeg can demux from a pipe without seeking.
+MATROSKA_MAGIC = b"\x1a\x45\xdf\xa3"
+MPEGTS_SYNC = 0x47
+
+
+class UploadOffsetMismatch(Exception):
+    """
+    The client sent a chunk for a different offset than the server has.
+    """
+
+
+class UploadTooLarge(Exception):
+    """
+    The chunk would write past the announced upload length.
+    """
+
+
+class UploadStalled(Exception):
+    """
+    No bytes arrived for VIDEO_UPLOAD_STALL_TIMEOUT seconds.
+    """
+
+
+def get_upload_path(upload: VideoUpload) -> str:
+    return os.path.join(settings.MEDIA_ROOT, upload.file_name)
+
+
+def create_upload(
+    user, filename: str, length: int, title: str, description: str,
+    category: str,
+) -> VideoUpload:
+    """
+    Register an upload and create its (empty) target file, so every
+    chunk can be appended in place without a temp file.
+    """
+    upload = VideoUpload(
+        title=title,
+        description=description,
+        category=category,
+        length=length,
+        created_by=user if user.is_authenticated else None,
+    )
+    upload.file_name = (
+        f"videos/{upload.id.hex}_{get_valid_filename(filename)}"
+    )
+
+    path = get_upload_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+    if settings.VIDEO_UPLOAD_PIPE_THROUGH:
+        upload.live_status = "pending"
+    upload.save()
+
+    if upload.live_status:
+        django_rq.get_queue("live").enqueue(
+            "video_app.tasks.transcode_growing_upload",
+            upload.id,
+            job_id=f"live-{upload.id}",
+            job_timeout=settings.VIDEO_UPLOAD_PIPE_TIMEOUT,
+        )
+    return upload
+
+
+def append_chunk(upload_id, stream, offset: int) -> VideoUpload:
+    """
+    Write a request body (`stream`, read in UPLOAD_BLOCK_SIZE blocks) at
+    `offset` of the upload file. The row is locked while writing, so two
+    clients cannot append to the same upload at once. The new offset is
+    only stored after the data is flushed to disk.
+    """
+    with transaction.atomic():
+        upload = VideoUpload.objects.select_for_update().get(id=upload_id)
+
+        if upload.is_complete or offset != upload.offset:
+            raise UploadOffsetMismatch(upload.offset)
+
+        remaining = upload.length - upload.offset
+        with open(get_upload_path(upload), "r+b") as f:
+            f.seek(upload.offset)
+            # drop what an interrupted request left behind
+            f.truncate()
+
+            written = 0
+            while True:
+                block = stream.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                written += len(block)
+                if written > remaining:
+                    f.truncate(upload.offset)
+                    raise UploadTooLarge(upload.length)
+                f.write(block)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        upload.offset += written
+        upload.save(update_fields=["offset"])
+
+    if upload.is_complete:
+        complete_upload(upload)
+    return upload
+
+
+def complete_upload(upload: VideoUpload) -> Video:
+    """
+    Create the Video for a finished upload. Its post_save handler
+    enqueues the processing pipeline.
+    """
+    video = Video.objects.create(
+        title=upload.title,
+        description=upload.description,
+        category=upload.category,
+        video_file=upload.file_name,
+    )
+    upload.video = video
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=["video", "completed_at"])
+    return video
+
+
+def is_streamable(head: bytes) -> bool:
+    """
+    True if a source starting with `head` can be decoded front to back:
+    MPEG-TS, Matroska/WebM, or MP4 with the moov box before the media
+    data (fragmented or faststart). A classic MP4 keeps its index at
+    the end and has to be complete first.
+    """
+    if head.startswith(MATROSKA_MAGIC):
+        return True
+    if len(head) > 188 and head[0] == MPEGTS_SYNC and head[188] == MPEGTS_SYNC:
+        return True
+
+    position = 0
+    while position + 8 <= len(head):
+        size = int.from_bytes(head[position:position + 4], "big")
+        box_type = head[position + 4:position + 8]
+        if box_type == b"moov":
+            return True
+        if box_type == b"mdat" or size < 8:
+            return False
+        position += size
+    return False
+
+
+def wait_for_bytes(upload_id, count: int) -> VideoUpload:
+    """
+    Block until the upload has `count` bytes (or is complete).
+    """
+    last_offset, last_change = -1, time.monotonic()
+    while True:
+        upload = VideoUpload.objects.get(id=upload_id)
+        if upload.offset >= min(count, upload.length):
+            return upload
+        if upload.offset != last_offset:
+            last_offset, last_change = upload.offset, time.monotonic()
+        elif time.monotonic() - last_change > settings.VIDEO_UPLOAD_STALL_TIMEOUT:
+            raise UploadStalled(upload.offset)
+        time.sleep(FOLLOW_INTERVAL)
+
+
+def follow_upload(upload_id, digest=None, while_waiting=None):
+    """
+    Yield the bytes of an upload in order while it is being written,
+    until the last byte arrived. Only data below the stored offset is
+    read, which append_chunk has already fsynced. `digest` (a hashlib
+    object) is fed along the way, so the content hash is known as soon
+    as the upload ends. `while_waiting` (a context manager factory) is
+    entered while no new bytes are there.
+    """
+    upload = VideoUpload.objects.get(id=upload_id)
+    position = 0
+
+    with open(get_upload_path(upload), "rb") as f:
+        while position < upload.length:
+            upload = VideoUpload.objects.get(id=upload_id)
+            if upload.offset <= position:
+                with (while_waiting or contextlib.nullcontext)():
+                    upload = wait_for_bytes(upload_id, position + 1)
+            while position < upload.offset:
+                block = f.read(min(UPLOAD_BLOCK_SIZE, upload.offset - position))
+                position += len(block)
+                if digest is not None:
+                    digest.update(block)
+                yield block